@@ -0,0 +1,2 @@
+# Общие фикстуры тестов всех пакетов
+pytest_plugins = ["database.testing"]
@@ -1,16 +1,32 @@
 """
 Пакет работы с базой данных.
 """
-from .engine import engine, get_engine
-from .session import SessionLocal, get_db, session_scope
+from .engine import async_engine, engine, get_async_engine, get_engine
+from .session import (
+    AsyncSessionLocal,
+    SessionLocal,
+    async_session_scope,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    get_read_db,
+    session_scope,
+)
 from .base import Base, BaseModel
 
 __all__ = [
     "engine",
+    "async_engine",
     "get_engine",
+    "get_async_engine",
     "SessionLocal",
+    "AsyncSessionLocal",
     "get_db",
+    "get_async_db",
+    "get_read_db",
+    "get_async_read_db",
     "session_scope",
+    "async_session_scope",
     "Base",
     "BaseModel",
 ]
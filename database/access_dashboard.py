@@ -0,0 +1,136 @@
+"""
+Инкрементальное обновление read model списков доступов (page_access_dashboard).
+
+Списки /access/my и /access/granted раньше на каждый запрос соединяли
+page_access_control, pages, agents и users. Теперь они читают одну таблицу,
+а соединение выполняется при записи:
+  - доступ создан, изменён или отозван - refresh_grants пересобирает
+    строки этих доступов (DELETE + INSERT ... SELECT, один набор на вызов),
+    истёкшие доступы чистильщика убирает remove_grants;
+  - у страницы сменилась видимость или она удалена - update_pages_async /
+    delete_pages_async (сервис Memory);
+  - у агента сменились имя или is_human, или он удалён - update_agent_async /
+    delete_agent_async;
+  - пользователь сменил username или full_name в профиле - update_user
+    (сервис Auth, PUT /users/me) правит его имя во всех строках, где он
+    получатель или грантор.
+Функции не делают commit: изменения read model попадают в транзакцию
+вызывающего кода вместе с самой записью.
+"""
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import aliased
+
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.models.auth import User
+from database.models.memory import AgentBD, PageBD
+
+Recipient = aliased(User)
+Grantor = aliased(User)
+
+COLUMNS = [
+    PageAccessDashboard.id_access, PageAccessDashboard.user_id, PageAccessDashboard.granted_by,
+    PageAccessDashboard.page_id, PageAccessDashboard.agent_id, PageAccessDashboard.agent_full_name,
+    PageAccessDashboard.is_human, PageAccessDashboard.is_public, PageAccessDashboard.is_draft,
+    PageAccessDashboard.recipient_full_name, PageAccessDashboard.recipient_username,
+    PageAccessDashboard.grantor_full_name, PageAccessDashboard.grantor_username,
+    PageAccessDashboard.can_view, PageAccessDashboard.can_edit,
+    PageAccessDashboard.granted_at, PageAccessDashboard.expires_at,
+]
+
+
+def _active_grants(condition=None):
+    """SELECT строк read model из исходных таблиц (в порядке COLUMNS)"""
+    query = (
+        select(
+            PageAccessControl.id_access, PageAccessControl.user_id, PageAccessControl.granted_by,
+            PageBD.id_page, AgentBD.id_agent, AgentBD.full_name,
+            AgentBD.is_human, PageBD.is_public, PageBD.is_draft,
+            Recipient.full_name, Recipient.username,
+            Grantor.full_name, Grantor.username,
+            PageAccessControl.can_view, PageAccessControl.can_edit,
+            PageAccessControl.granted_at, PageAccessControl.expires_at,
+        )
+        .join(PageBD, PageAccessControl.page_id == PageBD.id_page)
+        .join(AgentBD, PageBD.agent_id == AgentBD.id_agent)
+        .outerjoin(Recipient, PageAccessControl.user_id == Recipient.id_user)
+        .outerjoin(Grantor, PageAccessControl.granted_by == Grantor.id_user)
+        .where(PageAccessControl.is_active == True)
+    )
+    return query if condition is None else query.where(condition)
+
+
+def _refresh_statements(access_ids: Iterable):
+    access_ids = list(access_ids)
+    if not access_ids:
+        return []
+    return [
+        delete(PageAccessDashboard).where(PageAccessDashboard.id_access.in_(access_ids)),
+        insert(PageAccessDashboard).from_select(
+            COLUMNS, _active_grants(PageAccessControl.id_access.in_(access_ids))
+        ),
+    ]
+
+
+def refresh_grants(db, access_ids: Iterable) -> None:
+    """Пересобирает строки доступов access_ids (неактивные и удалённые - убирает)"""
+    for statement in _refresh_statements(access_ids):
+        db.execute(statement)
+
+
+def remove_grants(db, access_ids: Iterable) -> None:
+    """Убирает строки доступов, которые точно неактивны (отзыв, истечение срока)"""
+    access_ids = list(access_ids)
+    if access_ids:
+        db.execute(delete(PageAccessDashboard).where(PageAccessDashboard.id_access.in_(access_ids)))
+
+
+def rebuild(db) -> None:
+    """Полная пересборка (первичное заполнение, восстановление после сбоя)"""
+    db.execute(delete(PageAccessDashboard))
+    db.execute(insert(PageAccessDashboard).from_select(COLUMNS, _active_grants()))
+
+
+def update_user(db, user_id: Any, full_name: Optional[str] = None,
+                username: Optional[str] = None) -> None:
+    """Новые имя и username пользователя в строках, где он получатель или грантор"""
+    for owner_column, prefix in ((PageAccessDashboard.user_id, "recipient"),
+                                 (PageAccessDashboard.granted_by, "grantor")):
+        values = {f"{prefix}_full_name": full_name, f"{prefix}_username": username}
+        values = {key: value for key, value in values.items() if value is not None}
+        if values:
+            db.execute(update(PageAccessDashboard).where(owner_column == user_id).values(**values))
+
+
+async def update_pages_async(db, page_ids: Iterable, is_public: Optional[bool] = None,
+                             is_draft: Optional[bool] = None) -> None:
+    """Новая видимость страниц page_ids"""
+    page_ids = list(page_ids)
+    values = {"is_public": is_public, "is_draft": is_draft}
+    values = {key: value for key, value in values.items() if value is not None}
+    if page_ids and values:
+        await db.execute(
+            update(PageAccessDashboard).where(PageAccessDashboard.page_id.in_(page_ids)).values(**values)
+        )
+
+
+async def delete_pages_async(db, page_ids: Iterable) -> None:
+    page_ids = list(page_ids)
+    if page_ids:
+        await db.execute(delete(PageAccessDashboard).where(PageAccessDashboard.page_id.in_(page_ids)))
+
+
+async def update_agent_async(db, agent_id: Any, full_name: Optional[str] = None,
+                             is_human: Optional[bool] = None) -> None:
+    """Новые имя и is_human агента в строках его страниц"""
+    values = {"agent_full_name": full_name, "is_human": is_human}
+    values = {key: value for key, value in values.items() if value is not None}
+    if values:
+        await db.execute(
+            update(PageAccessDashboard).where(PageAccessDashboard.agent_id == agent_id).values(**values)
+        )
+
+
+async def delete_agent_async(db, agent_id: Any) -> None:
+    await db.execute(delete(PageAccessDashboard).where(PageAccessDashboard.agent_id == agent_id))
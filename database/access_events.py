@@ -0,0 +1,135 @@
+"""
+Оповещения об изменении прав доступа к страницам.
+
+Кэш прав сервиса доступа (services/Acces_Memory/permissions.py) живёт в
+памяти каждого воркера, а видимость страниц меняет сервис Memory. Изменения
+рассылаются через PostgreSQL LISTEN/NOTIFY: pg_notify выполняется в той же
+транзакции, что и запись, и доставляется слушателям только после COMMIT
+(откаченная транзакция никого не оповещает).
+
+Полезная нагрузка - ключи через запятую: "page_id" (права всех пользователей
+на страницу) или "page_id:user_id". На других СУБД оповещения не
+отправляются: там устаревание кэша ограничено его TTL.
+"""
+import logging
+import select
+import threading
+import uuid
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "page_access_changed"
+# Лимит NOTIFY - 8000 байт на сообщение
+MAX_PAYLOAD = 7900
+
+NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+
+
+def access_change_key(page_id, user_id=None) -> str:
+    """Ключ изменения: вся страница или пара (страница, пользователь)"""
+    return str(page_id) if user_id is None else f"{page_id}:{user_id}"
+
+
+def parse_access_changes(payload: str) -> List[Tuple[uuid.UUID, Optional[uuid.UUID]]]:
+    """Полезная нагрузка -> [(page_id, user_id или None)]; мусор пропускается"""
+    changes = []
+    for key in filter(None, payload.split(",")):
+        page_id, _, user_id = key.partition(":")
+        try:
+            changes.append((uuid.UUID(page_id), uuid.UUID(user_id) if user_id else None))
+        except ValueError:
+            logger.warning("Bad access change key %r", key)
+    return changes
+
+
+def _payloads(keys: Iterable[str]) -> List[str]:
+    payloads, current = [], ""
+    for key in keys:
+        if current and len(current) + len(key) + 1 > MAX_PAYLOAD:
+            payloads.append(current)
+            current = ""
+        current = f"{current},{key}" if current else key
+    if current:
+        payloads.append(current)
+    return payloads
+
+
+def _notify_parameters(db, keys: Iterable[str]) -> List[dict]:
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    return [{"channel": CHANNEL, "payload": payload} for payload in _payloads(keys)]
+
+
+def publish_access_changes(db, keys: Iterable[str]) -> None:
+    """Ставит оповещение в текущую транзакцию db; уйдёт после commit"""
+    for parameters in _notify_parameters(db, keys):
+        db.execute(NOTIFY, parameters)
+
+
+async def publish_access_changes_async(db, keys: Iterable[str]) -> None:
+    """Асинхронный вариант publish_access_changes"""
+    for parameters in _notify_parameters(db, keys):
+        await db.execute(NOTIFY, parameters)
+
+
+class AccessChangeListener(threading.Thread):
+    """
+    Фоновый поток с отдельным (вне пула) соединением в режиме LISTEN.
+
+    on_change(page_id, user_id) вызывается на каждый ключ. После
+    (пере)подключения вызывается on_reset: пока соединения не было,
+    оповещения могли потеряться, и кэш нужно сбросить целиком.
+    """
+
+    def __init__(self, engine, on_change: Callable, on_reset: Callable,
+                 poll_interval: float = 1.0, retry_interval: float = 5.0):
+        super().__init__(name="access-change-listener", daemon=True)
+        self.engine = engine
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _connect(self):
+        dialect = self.engine.dialect
+        args, kwargs = dialect.create_connect_args(self.engine.url)
+        connection = dialect.dbapi.connect(*args, **kwargs)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def _listen(self, connection):
+        while not self._stopped.is_set():
+            if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                continue
+            connection.poll()
+            while connection.notifies:
+                notification = connection.notifies.pop(0)
+                for page_id, user_id in parse_access_changes(notification.payload):
+                    self.on_change(page_id, user_id)
+
+    def run(self):
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                self.on_reset()
+                self._listen(connection)
+            except Exception as e:
+                logger.warning("Access change listener failed: %s", e)
+                self.on_reset()
+                self._stopped.wait(self.retry_interval)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
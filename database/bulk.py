@@ -0,0 +1,40 @@
+"""
+Пакетная вставка: INSERT ... VALUES (...), (...), ... RETURNING.
+
+Одна вставка на пачку строк вместо add() + commit() + refresh() на каждую:
+на 1000 строк это один-два запроса к БД вместо двух-трёх тысяч. Пачки
+ограничены числом параметров (у PostgreSQL предел - 32767 на запрос).
+"""
+from typing import Any, Dict, Iterator, List, Sequence
+
+from sqlalchemy import insert
+
+MAX_BIND_PARAMS = 30000
+
+
+def _chunks(rows: Sequence[Dict[str, Any]]) -> Iterator[Sequence[Dict[str, Any]]]:
+    if not rows:
+        return
+    size = max(1, MAX_BIND_PARAMS // max(len(rows[0]), 1))
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _statement(model, chunk):
+    return insert(model).values(list(chunk)).returning(model)
+
+
+def insert_returning(db, model, rows: Sequence[Dict[str, Any]]) -> List[Any]:
+    """Вставляет rows (одинаковый набор ключей) и возвращает созданные ORM-объекты; без commit"""
+    created: List[Any] = []
+    for chunk in _chunks(rows):
+        created.extend(db.scalars(_statement(model, chunk)).all())
+    return created
+
+
+async def insert_returning_async(db, model, rows: Sequence[Dict[str, Any]]) -> List[Any]:
+    """Асинхронный вариант insert_returning"""
+    created: List[Any] = []
+    for chunk in _chunks(rows):
+        created.extend((await db.scalars(_statement(model, chunk))).all())
+    return created
@@ -1,10 +1,19 @@
 """
 Подключение к PostgreSQL.
+
+Параметры пулов - на сервис (DB_SERVICE задаёт config.py каждого сервиса),
+см. database/pool.py.
 """
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
 
+from .pool import PoolSettings, attach_telemetry, pool_status
+from .query_stats import instrument_queries
+from .replicas import REPLICA_URLS, ReplicaSet
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -13,15 +22,83 @@ DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL не задан")
 
-def get_engine():
-    return create_engine(
-        DATABASE_URL,
+DB_SERVICE = os.getenv("DB_SERVICE")
+pool_settings = PoolSettings.from_env(DB_SERVICE)
+
+def get_engine(settings: PoolSettings = pool_settings, url: str = DATABASE_URL):
+    engine = create_engine(
+        url,
         echo=DEBUG,
-        pool_size=10,
-        max_overflow=20,
-        pool_timeout=30,
-        pool_pre_ping=True,
         future=True,
+        **settings.engine_kwargs(),
     )
+    attach_telemetry(engine, settings)
+    instrument_queries(engine)
+    return engine
+
+# Асинхронные драйверы для того же DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """postgresql[+psycopg2]://... -> postgresql+asyncpg://... (ASYNC_DATABASE_URL имеет приоритет)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"Нет асинхронного драйвера для {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+
+def get_async_engine(settings: PoolSettings = pool_settings, url: str = ASYNC_DATABASE_URL):
+    """
+    Асинхронный engine для async-эндпоинтов: запросы не блокируют event loop.
+    Пул отдельный от синхронного engine, настройки те же.
+    """
+    engine = create_async_engine(
+        url,
+        echo=DEBUG,
+        **settings.engine_kwargs(is_async=True),
+    )
+    attach_telemetry(engine, settings)
+    instrument_queries(engine)
+    return engine
 
 engine = get_engine()
+async_engine = get_async_engine()
+
+# Реплики для чтения (database/replicas.py)
+replica_engines = [get_engine(url=url) for url in REPLICA_URLS]
+async_replica_engines = [get_async_engine(url=to_async_url(url)) for url in REPLICA_URLS]
+replica_set = ReplicaSet(REPLICA_URLS, replica_engines)
+
+
+def all_engines():
+    """Все engine процесса: primary и реплики, синхронные и асинхронные"""
+    return [engine, async_engine, *replica_engines, *async_replica_engines]
+
+
+def engines_status():
+    """Состояние пулов текущего процесса (для /health/db сервисов)"""
+    return {
+        "service": DB_SERVICE,
+        "settings": {
+            "pool_size": pool_settings.pool_size,
+            "max_overflow": pool_settings.max_overflow,
+            "pool_recycle": pool_settings.pool_recycle,
+            "pre_ping": pool_settings.pre_ping,
+            "pgbouncer": pool_settings.pgbouncer,
+        },
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine),
+        "replicas": {
+            **replica_set.to_dict(),
+            "sync": [pool_status(e) for e in replica_engines],
+            "async": [pool_status(e) for e in async_replica_engines],
+        },
+    }
@@ -0,0 +1,52 @@
+"""
+Окружение Alembic: DATABASE_URL из .env, метаданные всех моделей.
+"""
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+
+load_dotenv()  # до импорта моделей: пакет database читает DATABASE_URL при импорте
+
+import database.models.auth  # noqa: F401
+import database.models.memory  # noqa: F401
+import database.models.media  # noqa: F401
+import database.models.access  # noqa: F401
+import database.models.family  # noqa: F401
+from database.base import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    url = os.getenv("DATABASE_URL") or config.get_main_option("sqlalchemy.url")
+    if not url:
+        raise RuntimeError("DATABASE_URL не задан")
+    return url
+
+
+def run_migrations_offline():
+    """SQL-скрипт без подключения к БД: alembic upgrade head --sql"""
+    context.configure(url=get_url(), target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(get_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,72 @@
+"""Составные и частичные индексы для горячих запросов
+
+Индексы под предикаты CRUD сервисов и под keyset-пагинацию списков.
+На PostgreSQL создаются CONCURRENTLY (без блокировки записи в таблицу)
+и с IF NOT EXISTS, поэтому миграцию можно применять к базе, где часть
+индексов уже создана через create_all.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    # pages
+    ("ix_pages_agent_draft", "pages", ["agent_id", "is_draft"], None),
+    ("ix_pages_public_draft_updated", "pages", ["is_public", "is_draft", "updated_at"], None),
+    ("ix_pages_public_updated", "pages", ["updated_at", "id_page"], "is_public"),
+    # page_access_control
+    ("ix_page_access_page_user_active", "page_access_control", ["page_id", "user_id"], "is_active"),
+    ("ix_page_access_user_granted", "page_access_control", ["user_id", "granted_at", "id_access"], "is_active"),
+    ("ix_page_access_grantor_granted", "page_access_control", ["granted_by", "granted_at", "id_access"], "is_active"),
+    # media
+    ("ix_media_user_updated", "media", ["user_id", "updated_at", "id_media"], None),
+    ("ix_media_page_temp_sort", "media", ["page_id", "is_temp", "sort_order"], None),
+    ("ix_media_temp_created", "media", ["created_at"], "is_temp"),
+    # family_tree
+    ("ix_family_tree_user_updated", "family_tree", ["user_id", "updated_at", "id_family_tree"], None),
+    ("ix_family_tree_public_updated", "family_tree", ["updated_at", "id_family_tree"], "is_public AND NOT is_draft"),
+    ("ix_family_tree_agents_tree", "family_tree_agents", ["family_tree_id"], None),
+    ("ix_relationships_agents_tree", "relationships_agents", ["family_tree_id"], None),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade():
+    if _is_postgresql():
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns, where in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True,
+                    postgresql_where=sa.text(where) if where else None,
+                    if_not_exists=True,
+                )
+    else:
+        # частичные индексы - только PostgreSQL, как в моделях
+        for name, table, columns, _ in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,55 @@
+"""Частичный индекс истекающих доступов
+
+Под фоновое снятие истёкших доступов (services/Acces_Memory/expiry.py):
+активные записи page_access_control со сроком действия, по expires_at.
+Как и 0001, на PostgreSQL создаётся CONCURRENTLY и с IF NOT EXISTS.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    ("ix_page_access_expires_active", "page_access_control", ["expires_at"], "is_active AND expires_at IS NOT NULL"),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade():
+    if _is_postgresql():
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns, where in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True,
+                    postgresql_where=sa.text(where) if where else None,
+                    if_not_exists=True,
+                )
+    else:
+        # частичные индексы - только PostgreSQL, как в моделях
+        for name, table, columns, _ in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,80 @@
+"""Read model списков доступов page_access_dashboard
+
+Строка на активный доступ со страницей, агентом, получателем и выдавшим
+(database/access_dashboard.py). Таблица заполняется из текущих активных
+доступов тем же INSERT ... SELECT, что и access_dashboard.rebuild.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    ("ix_access_dashboard_user_granted", "page_access_dashboard", ["user_id", "granted_at", "id_access"], None),
+    ("ix_access_dashboard_grantor_granted", "page_access_dashboard", ["granted_by", "granted_at", "id_access"], None),
+    ("ix_access_dashboard_page", "page_access_dashboard", ["page_id"], None),
+    ("ix_access_dashboard_agent", "page_access_dashboard", ["agent_id"], None),
+]
+
+BACKFILL = """
+    INSERT INTO page_access_dashboard (
+        id_access, user_id, granted_by, page_id, agent_id, agent_full_name,
+        is_human, is_public, is_draft, recipient_full_name, recipient_username,
+        grantor_full_name, grantor_username, can_view, can_edit, granted_at, expires_at
+    )
+    SELECT
+        pa.id_access, pa.user_id, pa.granted_by, p.id_page, a.id_agent, a.full_name,
+        a.is_human, p.is_public, p.is_draft, u.full_name, u.username,
+        g.full_name, g.username, pa.can_view, pa.can_edit, pa.granted_at, pa.expires_at
+    FROM page_access_control AS pa
+    JOIN pages AS p ON pa.page_id = p.id_page
+    JOIN agents AS a ON p.agent_id = a.id_agent
+    LEFT JOIN users AS u ON pa.user_id = u.id_user
+    LEFT JOIN users AS g ON pa.granted_by = g.id_user
+    WHERE pa.is_active = TRUE
+"""
+
+
+def upgrade():
+    op.create_table(
+        "page_access_dashboard",
+        sa.Column("id_access", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("granted_by", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("page_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("agent_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("agent_full_name", sa.String(255)),
+        sa.Column("is_human", sa.Boolean()),
+        sa.Column("is_public", sa.Boolean()),
+        sa.Column("is_draft", sa.Boolean()),
+        sa.Column("recipient_full_name", sa.String()),
+        sa.Column("recipient_username", sa.String()),
+        sa.Column("grantor_full_name", sa.String()),
+        sa.Column("grantor_username", sa.String()),
+        sa.Column("can_view", sa.Boolean()),
+        sa.Column("can_edit", sa.Boolean()),
+        sa.Column("granted_at", sa.DateTime(timezone=True)),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+    )
+    # Таблица новая и пока никем не читается: индексы строятся обычным
+    # CREATE INDEX после заполнения, без CONCURRENTLY
+    op.execute(BACKFILL)
+    for name, table, columns, _ in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    op.drop_table("page_access_dashboard")
@@ -0,0 +1,55 @@
+"""Индекс агентов пользователя
+
+Под списки /agent_list, /memory_page_list и /memory_page/{agent_id}
+сервиса памяти: агенты пользователя по порядку id_agent (раньше - полный
+просмотр agents). Как и 0001, на PostgreSQL создаётся CONCURRENTLY и с
+IF NOT EXISTS.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    ("ix_agents_user", "agents", ["user_id", "id_agent"], None),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade():
+    if _is_postgresql():
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns, where in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True,
+                    postgresql_where=sa.text(where) if where else None,
+                    if_not_exists=True,
+                )
+    else:
+        for name, table, columns, _ in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
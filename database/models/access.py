@@ -1,8 +1,8 @@
 """
 SQLAlchemy модели для контроля доступа к страницам
 """
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -12,7 +12,28 @@ from database.base import Base
 
 class PageAccessControl(Base):
     __tablename__ = "page_access_control"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Проверка доступа пользователя к странице
+        Index(
+            "ix_page_access_page_user_active", "page_id", "user_id",
+            postgresql_where=text("is_active"),
+        ),
+        # Keyset-пагинация активных доступов по (granted_at, id)
+        Index(
+            "ix_page_access_user_granted", "user_id", "granted_at", "id_access",
+            postgresql_where=text("is_active"),
+        ),
+        Index(
+            "ix_page_access_grantor_granted", "granted_by", "granted_at", "id_access",
+            postgresql_where=text("is_active"),
+        ),
+        # Фоновое снятие истёкших доступов (services/Acces_Memory/expiry.py)
+        Index(
+            "ix_page_access_expires_active", "expires_at",
+            postgresql_where=text("is_active AND expires_at IS NOT NULL"),
+        ),
+        {'extend_existing': True},
+    )
 
     id_access = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     page_id = Column(UUID(as_uuid=True), ForeignKey('pages.id_page'), nullable=False, index=True)
@@ -47,4 +68,40 @@ class PageAccessControl(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'taget_type': self.taget_type,
-        }
\ No newline at end of file
+        }
+
+class PageAccessDashboard(Base):
+    """
+    Read model списков доступов (/access/my и /access/granted): строка на
+    активный доступ, страница, агент, получатель и выдавший уже присоединены.
+    Поддерживается инкрементально при изменении доступов, страниц и агентов
+    (database/access_dashboard.py).
+    """
+    __tablename__ = "page_access_dashboard"
+    __table_args__ = (
+        # Keyset-пагинация по (granted_at, id) для получателя и для выдавшего
+        Index("ix_access_dashboard_user_granted", "user_id", "granted_at", "id_access"),
+        Index("ix_access_dashboard_grantor_granted", "granted_by", "granted_at", "id_access"),
+        # Обновление при изменении страницы и агента
+        Index("ix_access_dashboard_page", "page_id"),
+        Index("ix_access_dashboard_agent", "agent_id"),
+        {'extend_existing': True},
+    )
+
+    id_access = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    granted_by = Column(UUID(as_uuid=True), nullable=True)
+    page_id = Column(UUID(as_uuid=True), nullable=False)
+    agent_id = Column(UUID(as_uuid=True), nullable=False)
+    agent_full_name = Column(String(255))
+    is_human = Column(Boolean)
+    is_public = Column(Boolean)
+    is_draft = Column(Boolean)
+    recipient_full_name = Column(String)
+    recipient_username = Column(String)
+    grantor_full_name = Column(String)
+    grantor_username = Column(String)
+    can_view = Column(Boolean)
+    can_edit = Column(Boolean)
+    granted_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
@@ -1,8 +1,8 @@
 """
 SQLAlchemy модели для семейного древа
 """
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -17,7 +17,15 @@ from database.models.auth import User
 
 class FamilyTree(Base):
     __tablename__ = "family_tree"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Keyset-пагинация: "мои древа" и публичные древа по (updated_at, id)
+        Index("ix_family_tree_user_updated", "user_id", "updated_at", "id_family_tree"),
+        Index(
+            "ix_family_tree_public_updated", "updated_at", "id_family_tree",
+            postgresql_where=text("is_public AND NOT is_draft"),
+        ),
+        {'extend_existing': True},
+    )
 
     id_family_tree = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name_family_tree = Column(String(255), nullable=False)
@@ -46,7 +54,10 @@ class FamilyTree(Base):
 
 class FamilyTreeAgent(Base):
     __tablename__ = "family_tree_agents"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_family_tree_agents_tree", "family_tree_id"),
+        {'extend_existing': True},
+    )
 
     id_tree_agent = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     family_tree_id = Column(UUID(as_uuid=True), ForeignKey('family_tree.id_family_tree'), nullable=False)
@@ -67,7 +78,10 @@ class FamilyTreeAgent(Base):
 
 class RelationshipAgent(Base):
     __tablename__ = "relationships_agents"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_relationships_agents_tree", "family_tree_id"),
+        {'extend_existing': True},
+    )
 
     id_relationships = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     type_relative = Column(String(50), nullable=False)
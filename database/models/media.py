@@ -1,8 +1,8 @@
 """
 SQLAlchemy модель для медиафайлов (соответствует существующей таблице media в БД)
 """
-from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, DateTime, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -12,7 +12,18 @@ from database.base import Base
 
 class MediaBD(Base):
     __tablename__ = "media"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Keyset-пагинация медиа пользователя по (updated_at, id)
+        Index("ix_media_user_updated", "user_id", "updated_at", "id_media"),
+        # Медиа страницы в порядке sort_order
+        Index("ix_media_page_temp_sort", "page_id", "is_temp", "sort_order"),
+        # Очистка старых временных файлов
+        Index(
+            "ix_media_temp_created", "created_at",
+            postgresql_where=text("is_temp"),
+        ),
+        {'extend_existing': True},
+    )
     
     id_media = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), nullable=False)  # кто загрузил
@@ -39,7 +50,8 @@ class MediaBD(Base):
     is_temp = Column(Boolean, nullable=False, default=False)
     
     # Relationships
-    page = relationship("PageBD", backref="media")
+    # page_id без ForeignKey в БД: условие связи задаётся явно
+    page = relationship("PageBD", primaryjoin="foreign(MediaBD.page_id) == PageBD.id_page", backref="media")
     
     def to_dict(self):
         """Преобразует объект в словарь"""
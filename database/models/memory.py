@@ -1,8 +1,8 @@
 """
 SQLAlchemy модели для сервиса памяти (упрощенная версия)
 """
-from sqlalchemy import Column, String, Date, Text, Boolean, DateTime, JSON, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, Date, Text, Boolean, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -14,7 +14,11 @@ from database.base import Base
 
 class AgentBD(Base):
     __tablename__ = "agents"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Агенты пользователя по порядку id: списки агентов и страниц памяти
+        Index("ix_agents_user", "user_id", "id_agent"),
+        {'extend_existing': True},
+    )
     
     id_agent = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     full_name = Column(String(255), nullable=False)
@@ -52,7 +56,17 @@ class AgentBD(Base):
 
 class PageBD(Base):
     __tablename__ = "pages"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Страницы агента (публикация снимает флаги с остальных страниц)
+        Index("ix_pages_agent_draft", "agent_id", "is_draft"),
+        Index("ix_pages_public_draft_updated", "is_public", "is_draft", "updated_at"),
+        # Keyset-пагинация публичных страниц по (updated_at, id)
+        Index(
+            "ix_pages_public_updated", "updated_at", "id_page",
+            postgresql_where=text("is_public"),
+        ),
+        {'extend_existing': True},
+    )
     
     id_page = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     epitaph = Column(Text, nullable=True)
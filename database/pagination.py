@@ -0,0 +1,133 @@
+"""
+Keyset (cursor) пагинация списков.
+
+Вместо OFFSET/LIMIT списки отдаются страницами по непрозрачному курсору:
+в курсоре лежат значения ключа сортировки последней строки, например
+(updated_at, id). Следующая страница - строки "после" курсора:
+
+    WHERE (updated_at, id) < (:updated_at, :id)
+    ORDER BY updated_at DESC, id DESC
+    LIMIT :limit + 1
+
+Такой запрос идёт по составному индексу и не зависит от глубины страницы,
+тогда как OFFSET N читает и отбрасывает N строк. Лишняя (limit + 1)-я
+строка показывает, есть ли следующая страница.
+
+Общее количество считается только по запросу клиента и на PostgreSQL
+берётся из оценки планировщика (EXPLAIN), а не из COUNT(*).
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или выдан для другого списка"""
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, uuid.UUID):
+        return ["uuid", str(value)]
+    return ["raw", value]
+
+
+def _decode_value(item) -> Any:
+    kind, value = item
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "uuid":
+        return uuid.UUID(value)
+    if kind == "raw":
+        return value
+    raise ValueError(f"unknown cursor value kind {kind!r}")
+
+
+def encode_cursor(*values: Any) -> str:
+    """Значения ключа сортировки -> непрозрачный URL-safe токен"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int = 2) -> Tuple[Any, ...]:
+    """Токен -> значения ключа сортировки; InvalidCursor, если токен не наш"""
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = tuple(_decode_value(item) for item in json.loads(payload))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from e
+    if len(values) != size:
+        raise InvalidCursor("Invalid cursor: wrong key size")
+    return values
+
+
+def after_cursor(columns: Sequence, cursor: Optional[str]):
+    """
+    Условие "строки после курсора" для сортировки по columns DESC.
+    Без курсора - None (первая страница).
+    """
+    if not cursor:
+        return None
+    values = decode_cursor(cursor, size=len(columns))
+    return tuple_(*columns) < tuple_(*values)
+
+
+def split_page(rows: Sequence, limit: int, key) -> Tuple[List, Optional[str]]:
+    """
+    Строки, выбранные с LIMIT limit + 1 -> (страница, курсор следующей страницы).
+    key(row) возвращает значения ключа сортировки строки.
+    """
+    items = list(rows[:limit])
+    if len(rows) <= limit or not items:
+        return items, None
+    return items, encode_cursor(*key(items[-1]))
+
+
+# ========== Количество строк ==========
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement> - оценка числа строк без выполнения"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _count_statement(db, statement):
+    """Для PostgreSQL - EXPLAIN, для остальных СУБД - точный COUNT(*)"""
+    if db.get_bind().dialect.name == "postgresql":
+        return _Explain(statement.order_by(None)), True
+    return select(func.count()).select_from(statement.order_by(None).subquery()), False
+
+
+def _plan_rows(value) -> int:
+    plan = json.loads(value) if isinstance(value, str) else value
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimated_count(db, statement) -> int:
+    """Оценка количества строк запроса statement (Select без LIMIT)"""
+    query, explain = _count_statement(db, statement)
+    value = db.execute(query).scalar()
+    return _plan_rows(value) if explain else int(value or 0)
+
+
+async def estimated_count_async(db, statement) -> int:
+    """Асинхронный вариант estimated_count"""
+    query, explain = _count_statement(db, statement)
+    value = (await db.execute(query)).scalar()
+    return _plan_rows(value) if explain else int(value or 0)
@@ -0,0 +1,205 @@
+"""
+Настройки и телеметрия пулов соединений.
+
+Параметры пула задаются переменными окружения с префиксом сервиса
+(DB_SERVICE=memory -> MEMORY_DB_POOL_SIZE), затем без префикса (DB_POOL_SIZE),
+затем значениями по умолчанию:
+
+  DB_POOL_SIZE      постоянные соединения пула (10)
+  DB_MAX_OVERFLOW   сверх пула при пиковой нагрузке (20)
+  DB_POOL_TIMEOUT   ожидание свободного соединения, сек (30)
+  DB_POOL_RECYCLE   пересоздавать соединения старше N сек (1800, -1 - никогда)
+  DB_PRE_PING       on | off | N - проверять соединение перед выдачей всегда,
+                    никогда или только если оно простаивало дольше N сек (on)
+  DB_PGBOUNCER      true - режим PgBouncer (transaction pooling): NullPool и
+                    без кэша подготовленных выражений asyncpg (false)
+"""
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+# Границы гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+def _env(service: Optional[str], name: str, default: str) -> str:
+    if service:
+        value = os.getenv(f"{service.upper()}_{name}")
+        if value is not None:
+            return value
+    return os.getenv(name, default)
+
+
+@dataclass
+class PoolSettings:
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pre_ping: str = "on"
+    pgbouncer: bool = False
+
+    @classmethod
+    def from_env(cls, service: Optional[str] = None) -> "PoolSettings":
+        return cls(
+            pool_size=int(_env(service, "DB_POOL_SIZE", "10")),
+            max_overflow=int(_env(service, "DB_MAX_OVERFLOW", "20")),
+            pool_timeout=float(_env(service, "DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(_env(service, "DB_POOL_RECYCLE", "1800")),
+            pre_ping=_env(service, "DB_PRE_PING", "on").lower(),
+            pgbouncer=_env(service, "DB_PGBOUNCER", "false").lower() == "true",
+        )
+
+    @property
+    def pre_ping_interval(self) -> Optional[float]:
+        """Интервал для DB_PRE_PING=N; None для on/off"""
+        try:
+            return float(self.pre_ping)
+        except ValueError:
+            return None
+
+    def engine_kwargs(self, is_async: bool = False) -> Dict:
+        """Аргументы create_engine / create_async_engine"""
+        if self.pgbouncer:
+            # Пулом занимается PgBouncer; держать свой пул поверх него бессмысленно
+            kwargs = {"poolclass": instrumented(NullPool)}
+            if is_async:
+                # В transaction pooling подготовленные выражения не переживают транзакцию
+                kwargs["connect_args"] = {
+                    "statement_cache_size": 0,
+                    "prepared_statement_cache_size": 0,
+                    "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+                }
+            return kwargs
+        return {
+            "poolclass": instrumented(AsyncAdaptedQueuePool if is_async else QueuePool),
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pre_ping == "on",
+        }
+
+
+class PoolTelemetry:
+    """Счётчики пула: ожидание выдачи соединения, занятые соединения, таймауты"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.timeouts = 0
+        self.pings = 0
+        self.invalidated = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[index] += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def record_checkin(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def to_dict(self, pool=None) -> Dict:
+        data = {
+            "checkouts": self.checkouts,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "timeouts": self.timeouts,
+            "pings": self.pings,
+            "invalidated": self.invalidated,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "wait_histogram_ms": {
+                **{f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                "inf": self.wait_buckets[-1],
+            },
+        }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), idle=pool.checkedin(), overflow=max(pool.overflow(), 0))
+        return data
+
+
+class InstrumentedPoolMixin:
+    """Замеряет ожидание соединения в _do_get (точка расширения подклассов Pool)"""
+
+    telemetry: PoolTelemetry
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.telemetry.timeouts += 1
+            raise
+        finally:
+            self.telemetry.record_wait(time.perf_counter() - started)
+
+
+_instrumented_classes = {}
+
+
+def instrumented(pool_class):
+    if pool_class not in _instrumented_classes:
+        _instrumented_classes[pool_class] = type(
+            f"Instrumented{pool_class.__name__}", (InstrumentedPoolMixin, pool_class), {}
+        )
+    return _instrumented_classes[pool_class]
+
+
+def attach_telemetry(engine, settings: PoolSettings) -> PoolTelemetry:
+    """Подключает счётчики и (для DB_PRE_PING=N) проверку простаивавших соединений"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    telemetry = PoolTelemetry()
+    pool.telemetry = telemetry
+    ping_interval = settings.pre_ping_interval
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        if ping_interval is not None:
+            idle = time.monotonic() - connection_record.info.get("checked_in_at", time.monotonic())
+            if idle > ping_interval:
+                telemetry.pings += 1
+                try:
+                    sync_engine.dialect.do_ping(dbapi_connection)
+                except Exception as e:
+                    telemetry.invalidated += 1
+                    # Пул выбросит это соединение и выдаст новое
+                    raise exc.DisconnectionError() from e
+        telemetry.record_checkout()
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+        telemetry.record_checkin()
+
+    return telemetry
+
+
+def pool_status(engine) -> Dict:
+    pool = getattr(engine, "sync_engine", engine).pool
+    telemetry = getattr(pool, "telemetry", None)
+    data = telemetry.to_dict(pool) if telemetry else {}
+    data["pool"] = type(pool).__name__
+    return data
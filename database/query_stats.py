@@ -0,0 +1,144 @@
+"""
+Счётчик SQL-запросов на HTTP-запрос и журнал медленных запросов.
+
+События before/after_cursor_execute всех engine пакета (engine.py) пишут
+в QueryStats текущего запроса (contextvar): число выражений и суммарное
+время в БД. QueryStatsMiddleware открывает QueryStats на каждый запрос,
+возвращает заголовки X-DB-Statements / X-DB-Time-Ms и предупреждает
+в логе о запросах с подозрением на N+1.
+
+  DB_SLOW_QUERY_MS     порог журнала медленных запросов (200)
+  DB_STATEMENT_WARN    предупреждение, если запрос выполнил больше выражений (20)
+
+Параметры запросов в журнал не попадают - только их типы.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+STATEMENT_WARN = int(os.getenv("DB_STATEMENT_WARN", "20"))
+MAX_STATEMENT_LENGTH = 500
+
+
+@dataclass
+class QueryStats:
+    statements: int = 0
+    db_time: float = 0.0
+    queries: List[str] = field(default_factory=list)
+    parent: Optional["QueryStats"] = field(default=None, repr=False)
+
+    def record(self, statement: str, elapsed: float):
+        self.statements += 1
+        self.db_time += elapsed
+        self.queries.append(statement[:MAX_STATEMENT_LENGTH])
+        if self.parent is not None:
+            self.parent.record(statement, elapsed)
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Блок кода выполнил больше SQL-выражений, чем разрешено"""
+
+
+def redact_parameters(parameters):
+    """Значения параметров заменяются их типами: в логах не должно быть персональных данных"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) if isinstance(value, (dict, list, tuple)) else type(value).__name__
+                for value in parameters]
+    return type(parameters).__name__
+
+
+def instrument_queries(engine):
+    """Подключает счётчик и журнал медленных запросов к engine (AsyncEngine тоже подходит)"""
+    engine = getattr(engine, "sync_engine", engine)
+    if getattr(engine, "_query_stats_instrumented", False):
+        return
+    engine._query_stats_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - getattr(context, "_query_started", time.perf_counter())
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query %.1fms: %s",
+                elapsed * 1000,
+                statement[:MAX_STATEMENT_LENGTH],
+                extra={"duration_ms": round(elapsed * 1000, 3), "parameters": redact_parameters(parameters)},
+            )
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Считает SQL-выражения внутри блока (в том числе из пула потоков FastAPI).
+    Вложенные блоки учитываются и во внешнем: бюджет теста видит запросы,
+    посчитанные QueryStatsMiddleware.
+    """
+    stats = QueryStats(parent=current_query_stats.get())
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+@contextmanager
+def query_budget(max_statements: int) -> Iterator[QueryStats]:
+    """Как track_queries, но с QueryBudgetExceeded при превышении max_statements"""
+    with track_queries() as stats:
+        yield stats
+    if stats.statements > max_statements:
+        listing = "\n".join(f"  {i + 1}. {query}" for i, query in enumerate(stats.queries))
+        raise QueryBudgetExceeded(
+            f"Выполнено {stats.statements} SQL-выражений при бюджете {max_statements}:\n{listing}"
+        )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: QueryStats на каждый HTTP-запрос"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-statements", str(stats.statements).encode()),
+                        (b"x-db-time-ms", f"{stats.db_time * 1000:.3f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if stats.statements > STATEMENT_WARN:
+            logger.warning(
+                "%s %s: %d SQL statements (possible N+1)",
+                scope["method"], scope["path"], stats.statements,
+                extra={"statements": stats.statements, "db_time_ms": round(stats.db_time * 1000, 3)},
+            )
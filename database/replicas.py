@@ -0,0 +1,179 @@
+"""
+Маршрутизация чтения на реплики.
+
+DATABASE_REPLICA_URLS - список URL реплик через запятую. Без него всё
+читается с primary, как раньше.
+
+RoutingSession отправляет SELECT на реплику (round-robin, одна реплика на
+сессию), а записи, SELECT ... FOR UPDATE и все запросы после первой записи
+в сессии (read-your-writes) - на primary. Фоновый поток раз в
+DB_REPLICA_CHECK_INTERVAL сек измеряет отставание реплик; реплики
+с отставанием больше DB_REPLICA_MAX_LAG сек или недоступные пропускаются,
+а если подходящих нет - чтение идёт на primary.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import Delete, Insert, Update, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "2"))
+
+# Возраст последней применённой транзакции растёт и при простое primary, когда
+# реплике нечего применять; поэтому сначала - всё ли полученное WAL уже применено
+LAG_QUERY = text(
+    "SELECT pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS caught_up, "
+    "COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) AS replay_age"
+)
+
+
+def replica_lag(caught_up: Optional[bool], replay_age: Optional[float]) -> float:
+    """
+    Отставание реплики в секундах по результату LAG_QUERY: 0, если применён
+    весь полученный WAL. caught_up = NULL (реплика не получает WAL потоком,
+    например восстанавливается из архива) - по возрасту последней транзакции.
+    """
+    if caught_up:
+        return 0.0
+    return float(replay_age or 0)
+
+
+@dataclass
+class ReplicaState:
+    url: str
+    # До первой проверки реплика считается непригодной - чтение идёт на primary
+    healthy: bool = False
+    lag: float = 0.0
+    checked_at: float = 0.0
+    error: Optional[str] = "not checked yet"
+
+    def to_dict(self):
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag, 3),
+            "checked_at": self.checked_at,
+            "error": self.error,
+        }
+
+
+class ReplicaSet:
+    """
+    Реплики и их состояние. Выбор реплики не обращается к БД: отставание
+    измеряет фоновый поток через синхронные engine (check_engines).
+    """
+
+    def __init__(self, urls: List[str], check_engines, max_lag: float = REPLICA_MAX_LAG,
+                 check_interval: float = REPLICA_CHECK_INTERVAL, monitor: bool = True):
+        self.states = [ReplicaState(url) for url in urls]
+        self.check_engines = check_engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._monitor: Optional[threading.Thread] = None
+        self._monitor_lock = threading.Lock()
+        self.monitor = monitor
+        self.fallbacks = 0
+
+    def __bool__(self):
+        return bool(self.states)
+
+    def pick(self) -> Optional[int]:
+        """Индекс следующей пригодной реплики (round-robin) или None - читать с primary"""
+        if not self.states:
+            return None
+        self.ensure_monitor()
+        start = next(self._counter)
+        for offset in range(len(self.states)):
+            index = (start + offset) % len(self.states)
+            state = self.states[index]
+            if state.healthy and state.lag <= self.max_lag:
+                return index
+        self.fallbacks += 1
+        return None
+
+    def check(self, index: int):
+        state = self.states[index]
+        engine = self.check_engines[index]
+        try:
+            with engine.connect() as conn:
+                state.lag = replica_lag(*conn.execute(LAG_QUERY).one()) if engine.dialect.name == "postgresql" \
+                    else float(conn.execute(text("SELECT 0")).scalar())
+            state.healthy, state.error = True, None
+        except Exception as e:
+            if state.healthy:
+                logger.warning("Реплика %s недоступна: %s", index, e)
+            state.healthy, state.error = False, str(e)
+        state.checked_at = time.time()
+
+    def check_all(self):
+        for index in range(len(self.states)):
+            self.check(index)
+
+    def ensure_monitor(self):
+        if self._monitor is not None or not self.monitor:
+            return
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._run_monitor, name="replica-lag-monitor", daemon=True)
+                self._monitor.start()
+
+    def _run_monitor(self):
+        while True:
+            self.check_all()
+            time.sleep(self.check_interval)
+
+    def to_dict(self):
+        return {
+            "max_lag_seconds": self.max_lag,
+            "fallbacks_to_primary": self.fallbacks,
+            "replicas": [state.to_dict() for state in self.states],
+        }
+
+
+class RoutingSession(Session):
+    """
+    Session, читающая с реплики. Подкласс создаётся routing_session_class()
+    с конкретными primary/реплик engine (синхронными или sync_engine асинхронных).
+    """
+
+    primary = None
+    replicas: List = []
+    replica_set: Optional[ReplicaSet] = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or self._is_write(clause):
+            # Read-your-writes: после записи сессия читает только с primary
+            self.info["use_primary"] = True
+        if self.info.get("use_primary"):
+            return self.primary
+        if "replica" not in self.info:
+            self.info["replica"] = self.replica_set.pick() if self.replica_set else None
+        index = self.info["replica"]
+        return self.primary if index is None else self.replicas[index]
+
+    @staticmethod
+    def _is_write(clause) -> bool:
+        if isinstance(clause, (Insert, Update, Delete)):
+            return True
+        return getattr(clause, "_for_update_arg", None) is not None
+
+    def use_primary(self):
+        """Дальнейшие запросы сессии - на primary (например, перед read-modify-write)"""
+        self.info["use_primary"] = True
+
+
+def routing_session_class(primary, replicas, replica_set: Optional[ReplicaSet], name: str):
+    return type(name, (RoutingSession,), {
+        "primary": primary,
+        "replicas": list(replicas),
+        "replica_set": replica_set,
+    })
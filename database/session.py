@@ -1,9 +1,11 @@
 """
 Управление сессиями БД.
 """
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, Session
-from .engine import engine
+from .engine import async_engine, async_replica_engines, engine, replica_engines, replica_set
+from .replicas import routing_session_class
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -13,6 +15,33 @@ SessionLocal = sessionmaker(
     class_=Session,
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
+# Сессии только для чтения: SELECT на реплику, записи и read-your-writes - на primary
+ReadSessionLocal = sessionmaker(
+    autoflush=False,
+    autocommit=False,
+    expire_on_commit=False,
+    class_=routing_session_class(engine, replica_engines, replica_set, "ReadSession"),
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+    sync_session_class=routing_session_class(
+        async_engine.sync_engine,
+        [e.sync_engine for e in async_replica_engines],
+        replica_set,
+        "AsyncReadSession",
+    ),
+)
+
 def get_db():
     """
     Dependency для FastAPI.
@@ -40,3 +69,52 @@ def session_scope():
         raise
     finally:
         session.close()
+
+async def get_async_db():
+    """
+    Dependency для async-эндпоинтов FastAPI.
+    """
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+@asynccontextmanager
+async def async_session_scope():
+    """
+    Асинхронный контекстный менеджер для использования вне FastAPI.
+    """
+    session = AsyncSessionLocal()
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+def get_read_db():
+    """
+    Dependency для эндпоинтов только на чтение (публичные списки и т.п.):
+    запросы уходят на реплику, если она есть и не отстаёт.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    """
+    Async-вариант get_read_db.
+    """
+    db = AsyncReadSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
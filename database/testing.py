@@ -0,0 +1,94 @@
+"""
+Pytest-плагин пакета database (подключён в корневом conftest.py).
+
+Фикстура query_budget проверяет, что эндпоинт укладывается в бюджет
+SQL-выражений - ловит N+1 из ленивых загрузок связей:
+
+    def test_public_list(query_budget, client):
+        with query_budget(1):
+            client.get("/public_memory_page_list")
+
+Фикстура assert_index_scan проверяет по EXPLAIN, что запросы CRUD-функции
+идут по ожидаемому индексу:
+
+    def test_tree_relationships(assert_index_scan, engine, db):
+        with capture_statements(engine) as statements:
+            get_tree_relationships(db, tree_id)
+        assert_index_scan(engine, statements, "ix_relationships_agents_tree")
+
+На SQLite разбирается EXPLAIN QUERY PLAN, на PostgreSQL - EXPLAIN (FORMAT
+JSON) с enable_seqscan = off: на маленьких тестовых данных планировщик
+иначе предпочёл бы последовательное чтение даже при подходящем индексе.
+"""
+import re
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Set, Tuple
+
+import pytest
+from sqlalchemy import event
+
+from .query_stats import query_budget as _query_budget
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+@pytest.fixture
+def query_budget():
+    """Контекстный менеджер query_budget(max_statements); при превышении тест падает со списком запросов"""
+    return _query_budget
+
+
+@contextmanager
+def capture_statements(engine) -> Iterator[List[Tuple[str, Any]]]:
+    """Собирает (SQL, параметры драйвера) всех запросов engine внутри блока (AsyncEngine тоже подходит)"""
+    engine = getattr(engine, "sync_engine", engine)
+    statements: List[Tuple[str, Any]] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _postgresql_indexes(node) -> Set[str]:
+    names = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        names |= _postgresql_indexes(child)
+    return names
+
+
+def explain(engine, statement: str, parameters) -> Tuple[str, Set[str]]:
+    """План запроса (текстом) и имена индексов, которые он использует"""
+    engine = getattr(engine, "sync_engine", engine)
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            conn.rollback()
+            return str(plan), _postgresql_indexes(plan[0]["Plan"])
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        plan = "\n".join(row[-1] for row in rows)
+        return plan, set(_SQLITE_INDEX.findall(plan))
+
+
+@pytest.fixture
+def assert_index_scan():
+    """
+    assert_index_scan(engine, statements, index_name): хотя бы один из
+    собранных capture_statements запросов идёт по индексу index_name
+    """
+    def check(engine, statements, index_name: str):
+        plans = []
+        for statement, parameters in statements:
+            plan, indexes = explain(engine, statement, parameters)
+            if index_name in indexes:
+                return
+            plans.append(f"{statement}\n  -> {plan}")
+        raise AssertionError(f"Ни один запрос не использует индекс {index_name}:\n" + "\n".join(plans))
+
+    return check
@@ -0,0 +1,41 @@
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+import database.models.auth  # noqa: F401
+import database.models.memory  # noqa: F401
+from database.base import Base
+from database.bulk import insert_returning
+from database.models.family import RelationshipAgent
+from database.query_stats import instrument_queries, track_queries
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def test_insert_returning_splits_rows_by_bind_parameter_limit(monkeypatch):
+    monkeypatch.setattr("database.bulk.MAX_BIND_PARAMS", 60)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[RelationshipAgent.__table__])
+    instrument_queries(engine)
+    tree_id, user_id = uuid.uuid4(), uuid.uuid4()
+    rows = [
+        {"type_relative": "parent", "is_blood_relative": True, "agent_from": uuid.uuid4(),
+         "agent_to": uuid.uuid4(), "family_tree_id": tree_id, "user_id": user_id}
+        for _ in range(25)
+    ]
+
+    with Session(engine, expire_on_commit=False) as db, track_queries() as stats:
+        created = insert_returning(db, RelationshipAgent, rows)
+        db.commit()
+
+    # 6 колонок на строку -> по 10 строк в INSERT
+    assert stats.statements == 3
+    assert [rel.agent_from for rel in created] == [row["agent_from"] for row in rows]
+    assert len({rel.id_relationships for rel in created}) == 25
+    assert all(rel.created_at is not None for rel in created)
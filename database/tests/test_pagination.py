@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, create_engine, desc, insert, select
+from sqlalchemy.orm import Session
+
+from database.pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor, estimated_count, split_page
+
+metadata = MetaData()
+items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("updated_at", DateTime))
+SORT_KEY = (items.c.updated_at, items.c.id)
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        # по три строки на каждое значение updated_at: порядок внутри решает id
+        conn.execute(insert(items), [{"id": i, "updated_at": start + timedelta(minutes=i // 3)} for i in range(25)])
+    return Session(engine)
+
+
+def fetch_page(db, cursor, limit):
+    query = select(items)
+    condition = after_cursor(SORT_KEY, cursor)
+    if condition is not None:
+        query = query.where(condition)
+    rows = db.execute(query.order_by(*(desc(column) for column in SORT_KEY)).limit(limit + 1)).all()
+    return split_page(rows, limit, lambda row: (row.updated_at, row.id))
+
+
+def test_cursor_walk_returns_every_row_once_in_order():
+    db = make_session()
+    seen, cursor = [], None
+    while True:
+        rows, cursor = fetch_page(db, cursor, limit=4)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+
+    assert seen == list(range(24, -1, -1))
+    assert estimated_count(db, select(items).where(items.c.id >= 10).order_by(items.c.id)) == 15
+
+
+def test_cursor_round_trip_and_tampering():
+    moment = datetime(2024, 5, 1, 12, 30)
+    token = encode_cursor(moment, 42)
+
+    assert decode_cursor(token) == (moment, 42)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(moment))
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+from database.pool import PoolSettings, attach_telemetry, pool_status
+
+
+def test_service_prefixed_settings_override_global(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "8")
+    monkeypatch.setenv("MEMORY_DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_PRE_PING", "30")
+
+    memory = PoolSettings.from_env("memory")
+    auth = PoolSettings.from_env("auth")
+
+    assert (memory.pool_size, auth.pool_size) == (3, 8)
+    assert memory.pre_ping_interval == 30
+    assert memory.engine_kwargs()["pool_pre_ping"] is False
+
+
+def test_pgbouncer_mode_uses_null_pool_without_prepared_statement_cache():
+    kwargs = PoolSettings(pgbouncer=True).engine_kwargs(is_async=True)
+
+    assert issubclass(kwargs["poolclass"], NullPool)
+    assert kwargs["connect_args"]["statement_cache_size"] == 0
+    assert "pool_size" not in kwargs
+
+
+def test_telemetry_counts_in_use_timeouts_and_interval_pings(tmp_path):
+    settings = PoolSettings(pool_size=1, max_overflow=0, pool_timeout=0.05, pre_ping="0")
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **settings.engine_kwargs())
+    telemetry = attach_telemetry(engine, settings)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert telemetry.in_use == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    status = pool_status(engine)
+    assert status["in_use"] == 0
+    assert status["checkouts"] == 2
+    assert status["timeouts"] == 1
+    assert status["pings"] == 1
+    assert status["wait_max_ms"] >= 50
+    engine.dispose()
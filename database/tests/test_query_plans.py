@@ -0,0 +1,161 @@
+import asyncio
+import importlib.util
+import pathlib
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from database.base import Base
+from database.models.auth import User
+from database import access_dashboard
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.models.family import FamilyTree, FamilyTreeAgent, RelationshipAgent
+from database.models.media import MediaBD
+from database.models.memory import AgentBD, PageBD
+from database.testing import capture_statements
+from services.Acces_Memory import crud as access_crud
+from services.Family_Tree import crud as family_crud
+from services.Media import crud as media_crud
+from services.Memory import crud as memory_crud
+
+MIGRATIONS = pathlib.Path(__file__).parents[1] / "migrations" / "versions"
+TABLES = [AgentBD, PageBD, PageAccessControl, PageAccessDashboard, MediaBD, FamilyTree, FamilyTreeAgent, RelationshipAgent]
+ROWS = 200
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[User.__table__] + [model.__table__ for model in TABLES])
+    now = datetime.now(timezone.utc)
+    users = [uuid.uuid4() for _ in range(20)]
+    agents = [uuid.uuid4() for _ in range(ROWS)]
+    pages = [uuid.uuid4() for _ in range(ROWS)]
+    trees = [uuid.uuid4() for _ in range(ROWS // 10)]
+    raw_page = uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(insert(AgentBD), [
+            {"id_agent": a, "full_name": f"Агент {i}", "gender": "M", "user_id": users[i % 20]}
+            for i, a in enumerate(agents)
+        ])
+        conn.execute(insert(PageBD), [
+            {"id_page": p, "agent_id": agents[i], "user_id": users[i % 20], "is_public": i % 2 == 0,
+             "is_draft": i % 3 == 0, "updated_at": now - timedelta(minutes=i)}
+            for i, p in enumerate(pages)
+        ])
+        # raw SQL сервиса доступа передаёт UUID строкой с дефисами, а на SQLite
+        # ORM хранит UUID без них: эту страницу он найдёт
+        conn.execute(
+            text("INSERT INTO pages (id_page, agent_id, user_id, is_public, is_draft) VALUES (:id, :agent, :user, 0, 0)"),
+            {"id": str(raw_page), "agent": agents[0].hex, "user": users[0].hex},
+        )
+        conn.execute(insert(PageAccessControl), [
+            {"page_id": pages[i], "user_id": users[(i + 1) % 20], "granted_by": users[i % 20],
+             "can_view": True, "is_active": i % 5 != 0, "granted_at": now - timedelta(minutes=i)}
+            for i in range(ROWS)
+        ])
+        access_dashboard.rebuild(conn)
+        conn.execute(insert(MediaBD), [
+            {"page_id": pages[i % ROWS], "user_id": users[i % 20], "file_extension": "jpg", "file_size": 1,
+             "media_type": "image", "mime_type": "image/jpeg", "is_public": False, "is_temp": i % 7 == 0,
+             "sort_order": i, "created_at": now - timedelta(days=i % 3), "updated_at": now - timedelta(minutes=i)}
+            for i in range(ROWS * 3)
+        ])
+        conn.execute(insert(FamilyTree), [
+            {"id_family_tree": t, "name_family_tree": f"Древо {i}", "user_id": users[i % 20],
+             "is_public": i % 2 == 0, "is_draft": False, "updated_at": now - timedelta(minutes=i)}
+            for i, t in enumerate(trees)
+        ])
+        conn.execute(insert(RelationshipAgent), [
+            {"type_relative": "parent", "agent_from": agents[i], "agent_to": agents[i + 1],
+             "family_tree_id": trees[i % len(trees)], "user_id": users[0]}
+            for i in range(ROWS - 1)
+        ])
+    yield engine, {"user": users[3], "agent": agents[5], "page": pages[5], "raw_page": raw_page, "tree": trees[2]}
+    engine.dispose()
+
+
+SYNC_CASES = [
+    ("ix_page_access_page_user_active", lambda db, ids: access_crud.check_user_page_access(db, ids["raw_page"], ids["user"])),
+    ("ix_access_dashboard_user_granted", lambda db, ids: access_crud.list_access_by_user(db, ids["user"])),
+    ("ix_access_dashboard_grantor_granted", lambda db, ids: access_crud.list_access_by_grantor(db, ids["user"])),
+    ("ix_media_page_temp_sort", lambda db, ids: media_crud.get_media_by_page(db, ids["page"])),
+    ("ix_media_temp_created", lambda db, ids: media_crud.delete_old_temp_media(db, hours_old=24 * 365)),
+    ("ix_media_user_updated", lambda db, ids: media_crud.search_media(db, user_id=ids["user"], limit=20)),
+    ("ix_family_tree_user_updated", lambda db, ids: family_crud.get_user_trees(db, ids["user"])),
+    ("ix_family_tree_public_updated", lambda db, ids: family_crud.get_public_trees(db)),
+    ("ix_relationships_agents_tree", lambda db, ids: family_crud.get_tree_relationships(db, ids["tree"])),
+    ("ix_page_access_expires_active", lambda db, ids: access_crud.deactivate_expired_access(db, batch_size=10)),
+]
+
+
+@pytest.mark.parametrize("index_name,call", SYNC_CASES, ids=[case[0] for case in SYNC_CASES])
+def test_hot_crud_query_uses_index(seeded, assert_index_scan, index_name, call):
+    engine, ids = seeded
+    with Session(engine) as db, capture_statements(engine) as statements:
+        call(db, ids)
+        db.rollback()
+
+    assert_index_scan(engine, statements, index_name)
+
+
+# Запросы сервиса памяти (AsyncSession): индекс -> coroutine(db, ids)
+ASYNC_CASES = [
+    ("ix_pages_agent_draft",
+     lambda db, ids: memory_crud._demote_other_main_pages(db, ids["agent"], ids["user"], ids["page"])),
+    ("ix_agents_user", lambda db, ids: memory_crud.select_memory_agent_list_by_user(db, ids["user"])),
+    ("ix_agents_user", lambda db, ids: memory_crud.select_memory_page_list_by_user(db, ids["user"])),
+]
+
+
+@pytest.mark.parametrize("index_name,call", ASYNC_CASES,
+                         ids=["demote_other_main_pages", "agent_list", "memory_page_list"])
+def test_memory_query_uses_index(seeded, assert_index_scan, index_name, call):
+    engine, ids = seeded
+    async_engine = create_async_engine(str(engine.url).replace("sqlite://", "sqlite+aiosqlite://"))
+
+    async def scenario():
+        async with AsyncSession(async_engine) as db:
+            await call(db, ids)
+            await db.rollback()
+        await async_engine.dispose()
+
+    with capture_statements(async_engine) as statements:
+        asyncio.run(scenario())
+
+    assert_index_scan(engine, statements, index_name)
+
+
+def load_migration(path):
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+def test_migrations_create_every_model_index():
+    # кроме индексов из Column(index=True): они были в схеме и раньше
+    declared = {
+        index.name: (index.table.name, [column.name for column in index.columns])
+        for model in TABLES
+        for index in model.__table__.indexes
+        if index.name != f"ix_{index.table.name}_{'_'.join(column.name for column in index.columns)}"
+    }
+    migrated = {
+        name: (table, columns)
+        for path in sorted(MIGRATIONS.glob("[0-9]*.py"))
+        for name, table, columns, _ in load_migration(path).INDEXES
+    }
+    assert migrated == declared
@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from database.query_stats import QueryBudgetExceeded, instrument_queries, redact_parameters, track_queries
+
+
+def make_engine():
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+    instrument_queries(engine)  # повторная регистрация не удваивает счётчик
+    return engine
+
+
+def test_budget_counts_nested_blocks_and_lists_queries(query_budget):
+    engine = make_engine()
+
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        with query_budget(2) as outer:
+            with track_queries() as inner, engine.connect() as conn:
+                for i in range(3):
+                    conn.execute(text("SELECT :i"), {"i": i})
+
+    assert inner.statements == outer.statements == 3
+    assert "бюджете 2" in str(exc.value)
+    assert "3. SELECT ?" in str(exc.value)
+
+
+def test_slow_query_log_redacts_parameters(monkeypatch, caplog):
+    monkeypatch.setattr("database.query_stats.SLOW_QUERY_MS", 0)
+    engine = make_engine()
+
+    with caplog.at_level(logging.WARNING, logger="database.query_stats"), engine.connect() as conn:
+        conn.execute(text("SELECT :email"), {"email": "ivan@example.com"})
+
+    record = next(r for r in caplog.records if r.getMessage().startswith("Slow query"))
+    assert "ivan@example.com" not in record.getMessage()
+    assert record.parameters == ["str"]
+    assert redact_parameters({"password": "secret", "n": 1}) == {"password": "str", "n": "int"}
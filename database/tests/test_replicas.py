@@ -0,0 +1,68 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from database.replicas import ReplicaSet, replica_lag, routing_session_class
+
+metadata = MetaData()
+items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("source", String))
+
+
+def make_engines(tmp_path):
+    engines = {}
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(items).values(id=1, source=name))
+        engines[name] = engine
+    return engines["primary"], engines["replica"]
+
+
+def make_session_factory(primary, replica, replica_set):
+    return sessionmaker(class_=routing_session_class(primary, [replica], replica_set, "TestReadSession"))
+
+
+def read_source(db):
+    return db.execute(select(items.c.source).where(items.c.id == 1)).scalar()
+
+
+def test_reads_go_to_replica_and_writes_pin_session_to_primary(tmp_path):
+    primary, replica = make_engines(tmp_path)
+    replica_set = ReplicaSet(["replica"], [replica], monitor=False)
+    replica_set.check_all()
+    ReadSession = make_session_factory(primary, replica, replica_set)
+
+    with ReadSession() as db:
+        assert read_source(db) == "replica"
+        assert db.execute(select(items.c.source).with_for_update()).scalar() == "primary"
+
+    with ReadSession() as db:
+        db.execute(insert(items).values(id=2, source="written"))
+        db.flush()
+        # read-your-writes: после записи сессия читает с primary
+        assert read_source(db) == "primary"
+        db.commit()
+
+
+def test_lagging_or_unchecked_replica_falls_back_to_primary(tmp_path):
+    primary, replica = make_engines(tmp_path)
+    replica_set = ReplicaSet(["replica"], [replica], max_lag=1, monitor=False)
+    ReadSession = make_session_factory(primary, replica, replica_set)
+
+    with ReadSession() as db:
+        assert read_source(db) == "primary"
+
+    replica_set.check_all()
+    replica_set.states[0].lag = 5
+    with ReadSession() as db:
+        assert read_source(db) == "primary"
+    assert replica_set.fallbacks == 2
+
+
+def test_idle_primary_does_not_count_as_replica_lag():
+    # primary без записей: последняя транзакция применена час назад, но весь WAL применён
+    assert replica_lag(caught_up=True, replay_age=3600.0) == 0
+    assert replica_lag(caught_up=False, replay_age=12.5) == 12.5
+    # WAL не получается потоком - судим по возрасту последней транзакции
+    assert replica_lag(caught_up=None, replay_age=7.0) == 7.0
+    assert replica_lag(caught_up=None, replay_age=None) == 0
@@ -0,0 +1,101 @@
+"""
+Балансировка нагрузки между экземплярами одного микросервиса
+
+Стратегии (GATEWAY_LB_STRATEGY):
+  round_robin        - по кругу
+  least_outstanding  - экземпляр с наименьшим числом незавершённых запросов
+  p2c                - power of two choices: из двух случайных - менее загруженный
+
+Пассивная проверка: экземпляр, подряд отвечающий ошибками, исключается
+из ротации на EJECT_SECONDS (без активных запросов к нему).
+"""
+import itertools
+import logging
+import random
+import time
+from typing import Callable, Dict, List
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+POWER_OF_TWO = "p2c"
+STRATEGIES = (ROUND_ROBIN, LEAST_OUTSTANDING, POWER_OF_TWO)
+
+
+class UpstreamInstance:
+    """Один экземпляр сервиса и его пассивная статистика ошибок"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= settings.LB_EJECT_CONSECUTIVE_FAILURES:
+            self.ejected_until = time.monotonic() + settings.LB_EJECT_SECONDS
+            self.ejections += 1
+            self.consecutive_failures = 0
+            logger.warning(f"Upstream {self.url} ejected for {settings.LB_EJECT_SECONDS}s")
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "ejected": self.is_ejected(time.monotonic()),
+            "ejections": self.ejections,
+        }
+
+
+class LoadBalancer:
+    def __init__(
+        self,
+        instances: List[UpstreamInstance],
+        strategy: str = None,
+        is_available: Callable[[UpstreamInstance], bool] = None,
+    ):
+        strategy = strategy or settings.LB_STRATEGY
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy '{strategy}'")
+        self.instances = instances
+        self.strategy = strategy
+        self.is_available = is_available or (lambda instance: True)
+        self._cycle = itertools.cycle(range(len(instances)))
+
+    def pick(self) -> UpstreamInstance:
+        if len(self.instances) == 1:
+            return self.instances[0]
+
+        now = time.monotonic()
+        candidates = [
+            instance for instance in self.instances
+            if not instance.is_ejected(now) and self.is_available(instance)
+        ]
+        # Все экземпляры исключены - распределяем по всем, а не отказываем целиком
+        if not candidates:
+            candidates = self.instances
+
+        if self.strategy == ROUND_ROBIN:
+            for _ in range(len(self.instances)):
+                instance = self.instances[next(self._cycle)]
+                if instance in candidates:
+                    return instance
+            return candidates[0]
+        if self.strategy == LEAST_OUTSTANDING:
+            return min(candidates, key=lambda instance: instance.outstanding)
+        # POWER_OF_TWO
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
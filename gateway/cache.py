@@ -1,82 +1,227 @@
 """
 Кэширование для API Gateway
+
+Двухуровневый кэш ответов GET:
+  L1 - LRU в памяти процесса с ограничением по размеру в байтах
+  L2 - Redis (общий для всех воркеров), опционально
+
+Значения хранятся как байты (статус + заголовки + тело), без pickle.
+Одновременные запросы с одинаковым ключом объединяются в один вызов upstream.
 """
-from datetime import datetime, timedelta
-from typing import Optional, Any
 import hashlib
-import pickle
-import os
-import redis.asyncio as redis
-from functools import wraps
 import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .config import settings
+from .proxy import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """Ответ upstream в сериализуемом виде"""
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({"s": self.status_code, "h": self.headers}).encode()
+        return len(meta).to_bytes(4, "big") + meta + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        meta_len = int.from_bytes(data[:4], "big")
+        meta = json.loads(data[4:4 + meta_len])
+        return cls(meta["s"], [tuple(h) for h in meta["h"]], data[4 + meta_len:])
+
+    def to_response(self, cache_status: str) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        for name, value in self.headers:
+            if name.lower() != "content-length":
+                response.headers.append(name, value)
+        response.headers["X-Cache"] = cache_status
+        return response
+
+
+@dataclass
+class CacheStats:
+    hits_l1: int = 0
+    hits_l2: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    coalesced: int = 0
+    errors_l2: int = 0
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+
+class LRUCache:
+    """In-process LRU с TTL и ограничением суммарного размера значений в байтах"""
+
+    def __init__(self, max_bytes: int, stats: CacheStats):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = stats
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        # Слишком большие значения не вытесняют весь L1
+        if len(value) > self.max_bytes // 8:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str):
+        _, value = self._data.pop(key)
+        self.size -= len(value)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InMemoryBackend:
+    """Минимальная замена Redis (get/set с ex) для тестов и окружений без Redis"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return item[1]
+
+    async def set(self, key: str, value: bytes, ex: int):
+        self._data[key] = (time.monotonic() + ex, value)
+
 
 class CacheManager:
-    def __init__(self, redis_url: Optional[str] = None):
-        self.redis = None
-        if redis_url:
+    def __init__(self, redis_url: Optional[str] = None, backend=None, l1_max_bytes: int = None):
+        self.stats = CacheStats()
+        self.l1 = LRUCache(l1_max_bytes or settings.CACHE_L1_MAX_BYTES, self.stats)
+        self.redis = backend
+        self.singleflight = SingleFlight()
+        if self.redis is None and redis_url:
             try:
+                import redis.asyncio as redis
                 self.redis = redis.from_url(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis cache disabled: {e}")
+
+    async def get(self, key: str) -> Tuple[Optional[bytes], str]:
+        """Возвращает (значение, уровень) - уровень 'L1', 'L2' или 'MISS'"""
+        value = self.l1.get(key)
+        if value is not None:
+            self.stats.hits_l1 += 1
+            return value, "L1"
+
+        if self.redis is not None:
+            try:
+                value = await self.redis.get(key)
             except Exception:
-                pass
-    
-    async def get(self, key: str) -> Optional[Any]:
-        if not self.redis:
-            return None
-        
-        try:
-            data = await self.redis.get(key)
-            if data:
-                return pickle.loads(data)
-        except Exception:
-            pass
-        return None
-    
-    async def set(self, key: str, value: Any, ttl: int = 300):
-        if not self.redis:
-            return
-        
-        try:
-            await self.redis.setex(
-                key,
-                ttl,
-                pickle.dumps(value)
-            )
-        except Exception:
-            pass
-
-cache = CacheManager(os.getenv("REDIS_URL"))
-
-def cache_response(ttl: int = 60):
-    """Декоратор для кэширования ответов"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            request = kwargs.get('request')
-            if not request:
-                return await func(*args, **kwargs)
-            
-            # Создаем ключ кэша
-            cache_key = hashlib.md5(
-                f"{request.url.path}:{request.query_params}".encode()
-            ).hexdigest()
-            
-            # Пытаемся получить из кэша
-            cached = await cache.get(cache_key)
-            if cached:
-                return Response(**cached)
-            
-            # Выполняем запрос
-            response = await func(*args, **kwargs)
-            
-            # Кэшируем ответ (только для GET и успешных запросов)
-            if request.method == "GET" and response.status_code < 400:
-                cache_data = {
-                    "content": response.body,
-                    "status_code": response.status_code,
-                    "headers": dict(response.headers)
-                }
-                await cache.set(cache_key, cache_data, ttl)
-            
-            return response
-        return wrapper
-    return decorator
\ No newline at end of file
+                self.stats.errors_l2 += 1
+                value = None
+            if value is not None:
+                self.stats.hits_l2 += 1
+                self.l1.set(key, value, settings.CACHE_L1_TTL)
+                return value, "L2"
+
+        self.stats.misses += 1
+        return None, "MISS"
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self.stats.stores += 1
+        # При наличии L2 срок жизни в L1 короче, чтобы воркеры не расходились надолго
+        l1_ttl = min(ttl, settings.CACHE_L1_TTL) if self.redis is not None else ttl
+        self.l1.set(key, value, l1_ttl)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, value, ex=ttl)
+            except Exception:
+                self.stats.errors_l2 += 1
+
+    async def get_or_load(
+        self,
+        key: str,
+        ttl: int,
+        loader: Callable[[], Awaitable[CachedResponse]],
+    ) -> Tuple[CachedResponse, str]:
+        """
+        Читает ответ из кэша или загружает его через loader.
+        Одновременные промахи по одному ключу ждут единственный вызов loader.
+        """
+        value, level = await self.get(key)
+        if value is not None:
+            return CachedResponse.from_bytes(value), f"HIT-{level}"
+
+        async def load_and_store() -> CachedResponse:
+            cached = await loader()
+            if 200 <= cached.status_code < 300:
+                await self.set(key, cached.to_bytes(), ttl)
+            return cached
+
+        cached, shared = await self.singleflight.do(key, load_and_store)
+        if shared:
+            self.stats.coalesced += 1
+            return cached, "COALESCED"
+        return cached, "MISS"
+
+    def info(self) -> Dict:
+        return {
+            **self.stats.to_dict(),
+            "l1_entries": len(self.l1),
+            "l1_bytes": self.l1.size,
+            "l1_max_bytes": self.l1.max_bytes,
+            "l2": "redis" if self.redis is not None else None,
+        }
+
+
+def route_ttl(full_path: str) -> int:
+    """TTL кэша для пути (0 - не кэшировать); самый длинный совпавший префикс"""
+    best, ttl = -1, 0
+    for prefix, prefix_ttl in settings.CACHE_ROUTE_TTLS.items():
+        if full_path.startswith(prefix) and len(prefix) > best:
+            best, ttl = len(prefix), prefix_ttl
+    return ttl
+
+
+def build_cache_key(request: Request, full_path: str, current_user: Optional[Dict]) -> str:
+    """
+    Ключ кэша: путь, отсортированные query-параметры, пользователь и Vary-заголовки.
+    Приватные ответы не пересекаются между пользователями.
+    """
+    user_scope = str(current_user.get("user_id")) if current_user else "anon"
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    vary = "|".join(request.headers.get(name, "") for name in settings.CACHE_VARY_HEADERS)
+    raw = f"{request.method}:{full_path}?{query}:{user_scope}:{vary}"
+    return "gw:cache:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+cache = CacheManager(settings.REDIS_URL)
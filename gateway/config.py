@@ -7,6 +7,10 @@ from dotenv import load_dotenv
 # Загружаем переменные окружения
 load_dotenv()
 
+def _url_list(name: str, default: str) -> list:
+    """Список экземпляров сервиса: URL через запятую"""
+    return [url.strip() for url in os.getenv(name, default).split(",") if url.strip()]
+
 class Settings:
     # Основные настройки Gateway
     APP_NAME = "Memory Book API Gateway"
@@ -17,14 +21,30 @@ class Settings:
     HOST = os.getenv("GATEWAY_HOST", "0.0.0.0")
     PORT = int(os.getenv("GATEWAY_PORT", "8000"))
     
-    # URL микросервисов
-    AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://localhost:8001")
-    MEMORY_SERVICE_URL = os.getenv("MEMORY_SERVICE_URL", "http://localhost:8002")
-    FAMILY_TREE_SERVICE_URL = os.getenv("FAMILY_TREE_SERVICE_URL", "http://localhost:8005")
+    # URL микросервисов (несколько экземпляров - через запятую)
+    AUTH_SERVICE_URLS = _url_list("AUTH_SERVICE_URL", "http://localhost:8001")
+    MEMORY_SERVICE_URLS = _url_list("MEMORY_SERVICE_URL", "http://localhost:8002")
+    FAMILY_TREE_SERVICE_URLS = _url_list("FAMILY_TREE_SERVICE_URL", "http://localhost:8005")
+    MEDIA_SERVICE_URLS = _url_list("MEDIA_SERVICE_URL", "http://localhost:8004")
+    AUTH_SERVICE_URL = AUTH_SERVICE_URLS[0]
+    MEMORY_SERVICE_URL = MEMORY_SERVICE_URLS[0]
+    FAMILY_TREE_SERVICE_URL = FAMILY_TREE_SERVICE_URLS[0]
+    MEDIA_SERVICE_URL = MEDIA_SERVICE_URLS[0]
+
+    # Балансировка между экземплярами: round_robin, least_outstanding, p2c
+    LB_STRATEGY = os.getenv("GATEWAY_LB_STRATEGY", "round_robin")
+    # Пассивное исключение экземпляра после N ошибок подряд
+    LB_EJECT_CONSECUTIVE_FAILURES = int(os.getenv("GATEWAY_LB_EJECT_FAILURES", "5"))
+    LB_EJECT_SECONDS = float(os.getenv("GATEWAY_LB_EJECT_SECONDS", "30"))
     
     # JWT настройки (должны совпадать с Auth сервисом)
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-key-change-in-production")
     JWT_ALGORITHM = "HS256"
+    # Кэш проверенных токенов (claims) - ограничен размером и временем жизни токена (exp)
+    AUTH_CACHE_SIZE = int(os.getenv("GATEWAY_AUTH_CACHE_SIZE", "10000"))
+    AUTH_CACHE_TTL = int(os.getenv("GATEWAY_AUTH_CACHE_TTL", "300"))
+    # Доля запросов, для которых optional_auth пишет отладочный лог
+    AUTH_DEBUG_SAMPLE_RATE = float(os.getenv("GATEWAY_AUTH_DEBUG_SAMPLE_RATE", "0.01"))
     
     # Настройки безопасности
     CORS_ORIGINS = [
@@ -38,11 +58,68 @@ class Settings:
         "http://172.27.136.127:3001",  # Frontend on network IP (port 3001)
     ]
     
-    # Rate limiting
+    # Rate limiting (бюджеты по сервисам и эндпоинтам - RATE_LIMITS в dependencies.py)
+    RATE_LIMIT_ENABLED = os.getenv("GATEWAY_RATE_LIMIT_ENABLED", "True").lower() == "true"
     RATE_LIMIT_PER_MINUTE = 60
     
     # Timeout для запросов к сервисам (секунды)
     SERVICE_TIMEOUT = 10.0
+    UPLOAD_TIMEOUT = float(os.getenv("GATEWAY_UPLOAD_TIMEOUT", "30"))
+
+    # Пул соединений к микросервисам (один долгоживущий пул на каждый upstream)
+    SERVICE_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+    SERVICE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GATEWAY_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    SERVICE_KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "30"))
+    SERVICE_POOL_TIMEOUT = float(os.getenv("GATEWAY_POOL_TIMEOUT", "5"))
+    SERVICE_HTTP2 = os.getenv("GATEWAY_HTTP2", "False").lower() == "true"
+
+    # Circuit breaker на каждый upstream
+    BREAKER_WINDOW = int(os.getenv("GATEWAY_BREAKER_WINDOW", "20"))
+    BREAKER_MIN_CALLS = int(os.getenv("GATEWAY_BREAKER_MIN_CALLS", "10"))
+    BREAKER_FAILURE_RATE = float(os.getenv("GATEWAY_BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("GATEWAY_BREAKER_OPEN_SECONDS", "15"))
+    BREAKER_HALF_OPEN_CALLS = int(os.getenv("GATEWAY_BREAKER_HALF_OPEN_CALLS", "1"))
+    # Столько неудачных проверок /health подряд открывают закрытый breaker (одна - не повод)
+    BREAKER_PROBE_FAILURES = int(os.getenv("GATEWAY_BREAKER_PROBE_FAILURES", "3"))
+
+    # Повторы (только идемпотентные методы) с экспоненциальной задержкой и jitter
+    RETRY_ATTEMPTS = int(os.getenv("GATEWAY_RETRY_ATTEMPTS", "3"))
+    RETRY_BACKOFF = float(os.getenv("GATEWAY_RETRY_BACKOFF", "0.05"))
+    RETRY_MAX_BACKOFF = float(os.getenv("GATEWAY_RETRY_MAX_BACKOFF", "1.0"))
+    RETRY_BUDGET_RATIO = float(os.getenv("GATEWAY_RETRY_BUDGET_RATIO", "0.2"))
+    RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("GATEWAY_RETRY_BUDGET_MIN_PER_SECOND", "5"))
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+    # Фоновая проверка /health сервисов (результаты управляют circuit breaker)
+    HEALTH_CHECK_INTERVAL = float(os.getenv("GATEWAY_HEALTH_CHECK_INTERVAL", "5"))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv("GATEWAY_HEALTH_CHECK_TIMEOUT", "2"))
+    HEALTH_HISTORY_SIZE = int(os.getenv("GATEWAY_HEALTH_HISTORY_SIZE", "20"))
+
+    # Потоковое проксирование тел запросов/ответов (без буферизации в памяти Gateway)
+    PROXY_STREAMING = os.getenv("GATEWAY_PROXY_STREAMING", "True").lower() == "true"
+
+    # Объединение одинаковых одновременных GET в один запрос к upstream (singleflight).
+    # Такие ответы буферизуются и не идут потоком, поэтому по умолчанию выключено:
+    # кэшируемые маршруты (CACHE_ROUTE_TTLS) объединяются и без него - в кэше ответов.
+    PROXY_COALESCE_GET = os.getenv("GATEWAY_COALESCE_GET", "False").lower() == "true"
+    COALESCE_EXCLUDE_SERVICES = ["media"]
+
+    # Загрузки файлов (multipart) проксируются потоком без буферизации
+    MAX_UPLOAD_SIZE = int(os.getenv("GATEWAY_MAX_UPLOAD_SIZE", str(200 * 1024 * 1024)))
+    MAX_CONCURRENT_UPLOADS = int(os.getenv("GATEWAY_MAX_CONCURRENT_UPLOADS", "8"))
+    UPLOAD_QUEUE_TIMEOUT = float(os.getenv("GATEWAY_UPLOAD_QUEUE_TIMEOUT", "10"))
+    
+    # Кэш ответов GET: L1 в памяти процесса + L2 в Redis (если задан REDIS_URL)
+    REDIS_URL = os.getenv("REDIS_URL")
+    CACHE_L1_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_L1_MAX_BYTES", str(32 * 1024 * 1024)))
+    CACHE_L1_TTL = int(os.getenv("GATEWAY_CACHE_L1_TTL", "10"))
+    CACHE_VARY_HEADERS = ["accept", "accept-encoding", "accept-language"]
+    # TTL (секунды) по префиксу пути; пути без записи не кэшируются
+    CACHE_ROUTE_TTLS = {
+        "/memory/public_memory_page_list": 60,
+        "/memory/public_memory_page/": 30,
+        "/family/tree/public": 60,
+    }
     
     # Пути, которые не требуют аутентификации
     PUBLIC_PATHS = [
@@ -69,17 +146,26 @@ class Settings:
         "/health",
     ]
     
-    # Сопоставление сервисов с путями
+    # Сопоставление сервисов с путями (сервис -> список экземпляров)
     SERVICE_ROUTES = {
-        "auth": AUTH_SERVICE_URL,
-        "memory": MEMORY_SERVICE_URL,
-        "agent": MEMORY_SERVICE_URL,
-        "page": MEMORY_SERVICE_URL,
-        "family": FAMILY_TREE_SERVICE_URL,
+        "auth": AUTH_SERVICE_URLS,
+        "memory": MEMORY_SERVICE_URLS,
+        "agent": MEMORY_SERVICE_URLS,
+        "page": MEMORY_SERVICE_URLS,
+        "family": FAMILY_TREE_SERVICE_URLS,
+        "media": MEDIA_SERVICE_URLS,
     }
+    # Не больше стольких шаблонов маршрута на сервис в метках метрик, остальные - "other"
+    METRICS_ROUTES_PER_SERVICE = int(os.getenv("GATEWAY_METRICS_ROUTES_PER_SERVICE", "100"))
     
     # Логирование
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE = "logs/gateway.log"
+    LOG_JSON = os.getenv("GATEWAY_LOG_JSON", "true").lower() == "true"
+    # Записи, не поместившиеся в очередь, отбрасываются (event loop не ждёт диск)
+    LOG_QUEUE_SIZE = int(os.getenv("GATEWAY_LOG_QUEUE_SIZE", "10000"))
+    # Доля успешных запросов в access-логе; ошибки и медленные пишутся всегда
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv("GATEWAY_ACCESS_LOG_SAMPLE_RATE", "1.0"))
+    ACCESS_LOG_SLOW_SECONDS = float(os.getenv("GATEWAY_ACCESS_LOG_SLOW_SECONDS", "1.0"))
 
 settings = Settings()
\ No newline at end of file
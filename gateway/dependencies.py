@@ -6,15 +6,117 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from slowapi.util import get_remote_address
 import jwt
 import httpx
-from typing import Optional, Dict
-from functools import wraps
+from typing import Optional, Dict, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import random
+import re
 import time
 
 from .config import settings
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
 
 # Разрешаем отсутствие токена (auto_error=False)
 security = HTTPBearer(auto_error=False)
 
+# Все публичные префиксы собраны в одно регулярное выражение (проверка за один проход)
+PUBLIC_PATH_RE = re.compile(
+    "|".join(re.escape(p.rstrip("/")) for p in sorted(settings.PUBLIC_PATHS, key=len, reverse=True))
+)
+
+
+def is_public_path(path: str) -> bool:
+    """Путь начинается с одного из PUBLIC_PATHS"""
+    return PUBLIC_PATH_RE.match(path.rstrip("/")) is not None
+
+
+def request_is_public(request: Request) -> bool:
+    """Результат is_public_path, вычисленный один раз на запрос"""
+    is_public = getattr(request.state, "is_public", None)
+    if is_public is None:
+        is_public = is_public_path(request.url.path)
+        request.state.is_public = is_public
+    return is_public
+
+
+class ClaimsCache:
+    """
+    LRU проверенных JWT: ключ - отпечаток токена (sha256), значение - данные пользователя.
+    Запись живёт не дольше exp токена и AUTH_CACHE_TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = self.fingerprint(token)
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, user = item
+        if expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def set(self, token: str, user: Dict, exp: Optional[float]):
+        expires_at = time.time() + self.ttl
+        if exp:
+            expires_at = min(expires_at, float(exp))
+        key = self.fingerprint(token)
+        self._data[key] = (expires_at, user)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+claims_cache = ClaimsCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
+
+def decode_access_token(token: str) -> Optional[Dict]:
+    """
+    Локальная проверка access-токена с кэшем claims.
+    Возвращает данные пользователя или None; ошибки jwt пробрасываются.
+    """
+    user = claims_cache.get(token)
+    if user is not None:
+        return user
+
+    payload = jwt.decode(
+        token,
+        settings.JWT_SECRET_KEY,
+        algorithms=[settings.JWT_ALGORITHM]
+    )
+    if payload.get("type") != "access":
+        return None
+
+    user = {
+        "user_id": payload.get("sub"),
+        "email": payload.get("email"),
+        "token": token
+    }
+    claims_cache.set(token, user, payload.get("exp"))
+    return user
+
+
+def _debug_sampled() -> bool:
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < settings.AUTH_DEBUG_SAMPLE_RATE
+
 # Настройки rate limiting по сервисам
 RATE_LIMITS = {
     'auth': {
@@ -30,17 +132,25 @@ RATE_LIMITS = {
     }
 }
 
-def get_rate_limit(request: Request):
-    """Динамическое определение rate limit в зависимости от пути"""
+DEFAULT_RATE_LIMIT = f"{settings.RATE_LIMIT_PER_MINUTE}/minute"
+
+def get_rate_limit_bucket(request: Request) -> Tuple[str, str]:
+    """Возвращает (бюджет, лимит): бюджет - 'service:endpoint' или 'service:default'"""
     path_parts = request.url.path.split('/')
     if len(path_parts) < 2:
-        return "60/minute"
+        return "default", DEFAULT_RATE_LIMIT
     
     service = path_parts[1]
     endpoint = path_parts[2] if len(path_parts) > 2 else 'default'
     
     service_limits = RATE_LIMITS.get(service, {})
-    return service_limits.get(endpoint, service_limits.get('default', '60/minute'))
+    if endpoint in service_limits:
+        return f"{service}:{endpoint}", service_limits[endpoint]
+    return f"{service}:default", service_limits.get('default', DEFAULT_RATE_LIMIT)
+
+def get_rate_limit(request: Request):
+    """Динамическое определение rate limit в зависимости от пути"""
+    return get_rate_limit_bucket(request)[1]
 
 async def verify_token(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
@@ -56,19 +166,7 @@ async def verify_token(
     
     try:
         # Локальная проверка токена
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        if payload.get("type") != "access":
-            return None
-            
-        return {
-            "user_id": payload.get("sub"),
-            "email": payload.get("email"),
-            "token": token
-        }
+        return decode_access_token(token)
         
     except jwt.ExpiredSignatureError:
         return None
@@ -99,71 +197,44 @@ async def optional_auth(request: Request, credentials: Optional[HTTPAuthorizatio
     Проверяет JWT токен только для приватных путей.
     Для PUBLIC_PATHS возвращает None.
     """
-    import sys
-    full_path = request.url.path.rstrip("/")
-    print(f"[DEBUG] optional_auth called: path={full_path}, credentials={credentials}", file=sys.stderr)
-    if any(full_path.startswith(p.rstrip("/")) for p in settings.PUBLIC_PATHS):
-        print(f"[DEBUG] Path is public, returning None", file=sys.stderr)
+    debug = _debug_sampled()
+    if request_is_public(request):
+        if debug:
+            logger.debug(f"optional_auth: public path {request.url.path}")
         return None
     
     if not credentials:
-        print(f"[DEBUG] No credentials provided", file=sys.stderr)
+        if debug:
+            logger.debug(f"optional_auth: no credentials for {request.url.path}")
         return None
-    token = credentials.credentials
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        if payload.get("type") != "access":
-            print(f"[DEBUG] Token type not access", file=sys.stderr)
-            return None
-        print(f"[DEBUG] Token valid for user {payload.get('sub')}", file=sys.stderr)
-        return {
-            "user_id": payload.get("sub"),
-            "email": payload.get("email"),
-            "token": token
-        }
+        user = decode_access_token(credentials.credentials)
+        if debug:
+            logger.debug(f"optional_auth: token {'valid' if user else 'not access'} for {request.url.path}")
+        return user
     except Exception as e:
-        print(f"[DEBUG] Token decode error: {e}", file=sys.stderr)
+        if debug:
+            logger.debug(f"optional_auth: token decode error: {e}")
         return None
 
-def rate_limit(max_requests: int = 60, window: int = 60):
+async def rate_limit(request: Request, current_user: Optional[Dict] = Depends(optional_auth)) -> None:
     """
-    Декоратор для ограничения количества запросов
+    Проверка бюджета запросов (RATE_LIMITS) для пользователя или IP клиента.
+    При превышении - 429 с заголовком Retry-After.
     """
-    from collections import defaultdict
-    import time
-    
-    request_log = defaultdict(list)
-    
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            request = kwargs.get('request')
-            if not request:
-                return await func(*args, **kwargs)
-                
-            client_ip = request.client.host
-            current_time = time.time()
-            
-            # Очищаем старые записи
-            request_log[client_ip] = [
-                req_time for req_time in request_log[client_ip]
-                if current_time - req_time < window
-            ]
-            
-            # Проверяем лимит
-            if len(request_log[client_ip]) >= max_requests:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Too many requests"
-                )
-            
-            # Добавляем текущий запрос
-            request_log[client_ip].append(current_time)
-            
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
\ No newline at end of file
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    bucket, rate = get_rate_limit_bucket(request)
+    if current_user:
+        identity = f"user:{current_user.get('user_id')}"
+    else:
+        identity = f"ip:{get_remote_address(request)}"
+
+    result = await rate_limiter.hit(f"{bucket}:{identity}", rate)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers=result.headers()
+        )
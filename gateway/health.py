@@ -0,0 +1,156 @@
+"""
+Фоновая проверка здоровья микросервисов
+
+Периодически и параллельно опрашивает /health каждого upstream через общий пул
+соединений и передаёт результат в circuit breaker сервиса: недоступный сервис
+помечается открытым breaker'ом ещё до того, как на нём зависнут пользовательские
+запросы. Последний результат хранится как готовый снимок - /health/all отдаёт
+его без обращения к сервисам.
+"""
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+
+from .config import settings
+from .proxy import ServiceProxy, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamHealth:
+    """Скользящая история проверок одного экземпляра"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latencies = deque(maxlen=settings.HEALTH_HISTORY_SIZE)
+        self.checks = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        # Проверки, не дождавшиеся соединения из пула Gateway (не учитываются как ошибки)
+        self.pool_timeouts = 0
+        self.last: Dict = {"status": "unknown", "url": url}
+
+    def record(self, result: Dict, latency: float):
+        self.checks += 1
+        self.latencies.append(latency)
+        if result["status"] == "healthy":
+            self.consecutive_errors = 0
+        else:
+            self.errors += 1
+            self.consecutive_errors += 1
+        self.last = result
+
+    def to_dict(self) -> Dict:
+        latencies_ms = sorted(latency * 1000 for latency in self.latencies)
+        return {
+            **self.last,
+            "latency_ms": {
+                "last": round(self.latencies[-1] * 1000, 2) if self.latencies else None,
+                "p50": round(statistics.median(latencies_ms), 2) if latencies_ms else None,
+                "max": round(latencies_ms[-1], 2) if latencies_ms else None,
+            },
+            "checks": self.checks,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "pool_timeouts": self.pool_timeouts,
+        }
+
+
+class HealthMonitor:
+    def __init__(self, proxy: ServiceProxy):
+        self.proxy = proxy
+        self.upstreams: Dict[str, UpstreamHealth] = {}
+        self.snapshot: Dict[str, Dict] = {}
+        self.snapshot_at: Optional[float] = None
+        self._singleflight = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+
+    async def probe(self, service_url: str) -> Dict:
+        """Проверяет /health одного upstream и обновляет его историю и circuit breaker"""
+        started = time.perf_counter()
+        upstream = self.upstreams.get(service_url)
+        if upstream is None:
+            upstream = self.upstreams[service_url] = UpstreamHealth(service_url)
+        try:
+            response = await self.proxy.get_client(service_url).get(
+                "/health", timeout=settings.HEALTH_CHECK_TIMEOUT
+            )
+            healthy = response.status_code == 200
+            result = {
+                "status": "healthy" if healthy else "unhealthy",
+                "status_code": response.status_code,
+                "url": service_url
+            }
+        except httpx.PoolTimeout:
+            # Исчерпан собственный пул Gateway - о сервисе проверка ничего не узнала,
+            # поэтому ни история, ни circuit breaker не меняются (как в ServiceProxy._send)
+            upstream.pool_timeouts += 1
+            return {"status": "unknown", "error": "gateway pool timeout", "url": service_url}
+        except (httpx.HTTPError, OSError) as e:
+            healthy = False
+            result = {
+                "status": "unreachable",
+                "error": str(e),
+                "url": service_url
+            }
+        upstream.record(result, time.perf_counter() - started)
+        self.proxy.breaker(service_url).record_probe(healthy, upstream.consecutive_errors)
+        return result
+
+    async def probe_all(self) -> Dict[str, Dict]:
+        """
+        Проверяет все экземпляры одновременно (время - максимум, а не сумма задержек)
+        и обновляет снимок. Параллельные вызовы разделяют один раунд проверок.
+        """
+        snapshot, _ = await self._singleflight.do("probe_all", self._probe_round)
+        return snapshot
+
+    async def _probe_round(self) -> Dict[str, Dict]:
+        await asyncio.gather(*(self.probe(url) for url in self.proxy.upstream_urls()))
+        self.snapshot = {
+            service_name: self._service_status(service_name)
+            for service_name in settings.SERVICE_ROUTES
+        }
+        self.snapshot_at = time.time()
+        return self.snapshot
+
+    def _service_status(self, service_name: str) -> Dict:
+        """Сервис здоров, если здоров хотя бы один его экземпляр"""
+        instances = [
+            {**self.upstreams[url].to_dict(), "circuit": self.proxy.breaker(url).state}
+            for url in self.proxy.service_urls(service_name)
+            if url in self.upstreams
+        ]
+        if len(instances) == 1:
+            return instances[0]
+        statuses = {instance["status"] for instance in instances}
+        return {
+            "status": "healthy" if "healthy" in statuses else "unreachable",
+            "instances": instances,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Health monitor error: {e}")
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
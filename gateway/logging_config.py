@@ -0,0 +1,164 @@
+"""
+Логирование Gateway вне event loop
+
+Обработчики логгеров получают только QueueHandler: запись кладётся в
+ограниченную очередь без ожидания, а форматирование в JSON, маскирование
+токенов и запись в файл/stderr выполняет фоновый поток QueueListener.
+При переполнении очереди записи отбрасываются и учитываются в dropped.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import time
+from typing import Dict, Optional
+
+from shared.tracing import current_span
+
+REDACTED = "***"
+SENSITIVE_KEYS = {
+    "token", "access_token", "refresh_token", "password",
+    "authorization", "x-auth-token", "cookie", "set-cookie",
+}
+SENSITIVE_PATTERNS = [
+    # Bearer <token> и JWT (три base64url-сегмента, заголовок всегда начинается с eyJ)
+    re.compile(r"(?i)(bearer\s+)[\w\-.~+/]+=*"),
+    re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*"),
+]
+STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "trace_id"}
+
+
+def redact_text(text: str) -> str:
+    for pattern in SENSITIVE_PATTERNS:
+        text = pattern.sub(lambda m: (m.group(1) if m.groups() else "") + REDACTED, text)
+    return text
+
+
+def redact(value):
+    """Маскирует токены в строках и значения чувствительных ключей во вложенных dict/list"""
+    if isinstance(value, str):
+        return redact_text(value)
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if str(k).lower() in SENSITIVE_KEYS else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись: служебные поля + всё, что передано через extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact_text(record.getMessage()),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = redact(value)
+        if record.exc_info:
+            entry["exc_info"] = redact_text(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Текстовый формат с маскированием токенов"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact_text(super().format(record))
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматирования в потоке вызывающего кода
+
+    Стандартный prepare() форматирует сообщение здесь же; нам достаточно
+    зафиксировать текст сообщения и trace id (contextvar доступен только
+    в потоке запроса), остальное сделает фоновый поток.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        span = current_span.get()
+        record.trace_id = span.trace_id if span else None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    def __init__(self):
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def configure(self, level: str, handlers, json_format: bool = True, queue_size: int = 10000):
+        """Подключает очередь к корневому логгеру и запускает фоновую запись в handlers"""
+        self.stop()
+        self.listener = None
+        formatter = JsonFormatter() if json_format else RedactingFormatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        root = logging.getLogger()
+        for old in list(root.handlers):
+            root.removeHandler(old)
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        root.addHandler(self.handler)
+        root.setLevel(getattr(logging, level))
+
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *handlers, respect_handler_level=True)
+        self.start()
+
+    def start(self):
+        if self.listener is not None and self.listener._thread is None:
+            self.listener.start()
+
+    def stop(self):
+        """Дописывает очередь и останавливает фоновый поток"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def info(self) -> Dict:
+        if self.handler is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+        }
+
+
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.stop)
+
+
+def setup_logging(settings):
+    # Строка на каждый исходящий запрос httpx дублирует access-лог
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    log_pipeline.configure(
+        settings.LOG_LEVEL,
+        [logging.FileHandler(settings.LOG_FILE), logging.StreamHandler()],
+        json_format=settings.LOG_JSON,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
@@ -6,33 +6,54 @@ from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
 import logging
+from contextlib import asynccontextmanager
 from typing import Dict, Optional
 import time
 
 # Импорты из внутренних модулей
 from .config import settings
-from .dependencies import verify_token, rate_limit, optional_auth
-from .middleware import LoggingMiddleware
-from .proxy import ServiceProxy
-
-
-# Настройка логирования
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(settings.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+from .dependencies import verify_token, rate_limit, optional_auth, request_is_public
+from .logging_config import log_pipeline, setup_logging
+from .middleware import LoggingMiddleware, MetricsMiddleware
+from .metrics import render_metrics
+from .proxy import ServiceProxy, UploadTooLarge
+from .cache import CachedResponse, build_cache_key, cache, route_ttl
+from .health import HealthMonitor
+from .resilience import CircuitOpenError
+from shared.tracing import TracingMiddleware, configure_tracing
+
+
+# Настройка логирования: запись в файл и stderr - в фоновом потоке
+setup_logging(settings)
 logger = logging.getLogger(__name__)
 
+# Инициализируем прокси для сервисов
+service_proxy = ServiceProxy()
+health_monitor = HealthMonitor(service_proxy)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Контекст жизненного цикла Gateway: пулы соединений к сервисам
+    живут всё время работы приложения.
+    """
+    log_pipeline.start()
+    await service_proxy.startup()
+    health_monitor.start()
+    
+    yield  # Приложение работает
+    
+    await health_monitor.stop()
+    await service_proxy.close()
+    log_pipeline.stop()
+
 # Создаем FastAPI приложение
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Настройка CORS
@@ -46,17 +67,17 @@ app.add_middleware(
 
 # Добавляем кастомное middleware
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Трассировка - внешний слой: логи и метрики запроса уже видят его trace id
+app.add_middleware(TracingMiddleware)
+configure_tracing("gateway")
 
 from .openapi import custom_openapi
 app.openapi = lambda: custom_openapi(app)
 
-# Инициализируем прокси для сервисов
-service_proxy = ServiceProxy()
-
 @app.get("/")
 async def root():
     """Корневой эндпоинт Gateway"""
-    print(settings.SERVICE_ROUTES)
     return {
         "message": "Memory Book API Gateway",
         "version": settings.VERSION,
@@ -73,39 +94,51 @@ async def health_check():
         "service": "gateway"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 @app.get("/health/all")
-async def health_check_all():
-    """Проверка здоровья всех сервисов"""
-    health_status = {
+async def health_check_all(refresh: bool = False):
+    """
+    Проверка здоровья всех сервисов.
+    Отдаёт снимок последней фоновой проверки; refresh=true - новая параллельная проверка.
+    """
+    if refresh or health_monitor.snapshot_at is None:
+        await health_monitor.probe_all()
+    return {
         "gateway": {"status": "healthy", "timestamp": time.time()},
-        "services": {}
+        "checked_at": health_monitor.snapshot_at,
+        "services": health_monitor.snapshot
+    }
+
+@app.get("/health/pool")
+async def health_pool():
+    """Метрики насыщения пулов соединений к сервисам"""
+    return {
+        "max_connections": settings.SERVICE_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": settings.SERVICE_KEEPALIVE_EXPIRY,
+        "upstreams": service_proxy.pool_stats(),
+        "coalescing": service_proxy.singleflight.to_dict(),
+        "circuits": {url: breaker.to_dict() for url, breaker in service_proxy.breakers.items()},
+        "balancers": service_proxy.balancer_stats(),
     }
-    
-    # Проверяем каждый сервис
-    for service_name, service_url in settings.SERVICE_ROUTES.items():
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{service_url}/health")
-                health_status["services"][service_name] = {
-                    "status": "healthy" if response.status_code == 200 else "unhealthy",
-                    "status_code": response.status_code,
-                    "url": service_url
-                }
-        except Exception as e:
-            health_status["services"][service_name] = {
-                "status": "unreachable",
-                "error": str(e),
-                "url": service_url
-            }
-    
-    return health_status
+
+@app.get("/health/cache")
+async def health_cache():
+    """Счётчики кэша ответов (попадания L1/L2, промахи, вытеснения)"""
+    return cache.info()
 
 @app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"])
 async def gateway_proxy(
     service: str,
     path: str,
     request: Request,
-    current_user: Optional[Dict] = Depends(optional_auth)
+    current_user: Optional[Dict] = Depends(optional_auth),
+    _rate_limit: None = Depends(rate_limit),
 ):
     """
     Основной прокси-эндпоинт Gateway
@@ -115,25 +148,31 @@ async def gateway_proxy(
     /memory/pages -> Memory Service
     и т.д.
     """
-    logger.info(f"Gateway request: {request.method} /{service}/{path}")
-    
     # Проверяем существование сервиса
     if service not in settings.SERVICE_ROUTES:
         raise HTTPException(status_code=404, detail=f"Service '{service}' not found")
     
     # Проверяем аутентификацию (если требуется)
     full_path = f"/{service}/{path}".rstrip("/")
-    logger.info(f"Gateway auth check: full_path={full_path}, current_user={current_user}")
-    logger.info(f"Gateway PUBLIC_PATHS: {settings.PUBLIC_PATHS}")
-    requires_auth = not any(full_path.startswith(public_path.rstrip("/")) for public_path in settings.PUBLIC_PATHS)
-    logger.info(f"Gateway requires_auth={requires_auth}")
+    requires_auth = not request_is_public(request)
     
     if requires_auth and not current_user:
-        logger.warning(f"Gateway 401: path={full_path}, requires_auth={requires_auth}, current_user={current_user}")
         raise HTTPException(status_code=401, detail="Authentication required")
     
     # Проксируем запрос к соответствующему сервису
     try:
+        # Кэшируемые GET (TTL задан для маршрута) обслуживаются через двухуровневый кэш
+        ttl = route_ttl(full_path) if request.method == "GET" else 0
+        if ttl:
+            async def load_from_upstream() -> CachedResponse:
+                resp = await service_proxy.fetch(service, path, request, current_user)
+                headers = service_proxy._filter_response_headers(resp.headers, decoded=True)
+                return CachedResponse(resp.status_code, list(headers.items()), resp.content)
+
+            cache_key = build_cache_key(request, full_path, current_user)
+            cached, cache_status = await cache.get_or_load(cache_key, ttl, load_from_upstream)
+            return cached.to_response(cache_status)
+
         response = await service_proxy.proxy_request(
             service=service,
             path=path,
@@ -141,14 +180,24 @@ async def gateway_proxy(
             current_user=current_user
         )
         return response
+    except HTTPException:
+        raise
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Upload too large")
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service {service} unavailable",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
     except httpx.TimeoutException:
-        logger.error(f"Service {service} timeout for path {path}")
+        logger.error("Service %s timeout", service, extra={"service": service, "path": path})
         raise HTTPException(status_code=504, detail=f"Service {service} timeout")
     except httpx.RequestError as e:
-        logger.error(f"Service {service} error: {str(e)}")
+        logger.error("Service %s error: %s", service, e, extra={"service": service, "path": path})
         raise HTTPException(status_code=502, detail=f"Service {service} unavailable")
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+    except Exception:
+        logger.exception("Unexpected gateway error", extra={"service": service, "path": path})
         raise HTTPException(status_code=500, detail="Internal gateway error")
 
 if __name__ == "__main__":
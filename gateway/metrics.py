@@ -0,0 +1,142 @@
+"""
+Prometheus-метрики API Gateway
+
+Гистограммы задержки (полное время Gateway и время upstream отдельно),
+счётчики запросов и байтов, gauge запросов в обработке. Метки: сервис,
+шаблон маршрута и класс статуса (2xx/4xx/5xx).
+
+Число рядов ограничено: сервис - один из SERVICE_ROUTES или "gateway",
+маршрут - шаблон сработавшего роута Gateway, для проксируемых путей -
+нормализованный путь, но не больше METRICS_ROUTES_PER_SERVICE шаблонов
+на сервис; всё остальное (неизвестные пути, сканеры) - "other".
+
+Несколько воркеров: при заданном PROMETHEUS_MULTIPROC_DIR метрики пишутся
+в общий каталог, а /metrics агрегирует их через MultiProcessCollector.
+"""
+import os
+import re
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.types import Scope
+
+from .config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    "gateway_requests_total", "Запросы к Gateway",
+    ["service", "route", "method", "status_class"],
+)
+REQUEST_DURATION = Histogram(
+    "gateway_request_duration_seconds", "Полное время обработки запроса в Gateway",
+    ["service", "route", "status_class"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_DURATION = Histogram(
+    "gateway_upstream_duration_seconds", "Время ожидания ответа upstream (до заголовков)",
+    ["service", "route", "status_class"], buckets=LATENCY_BUCKETS,
+)
+GATEWAY_DURATION = Histogram(
+    "gateway_own_duration_seconds", "Время Gateway без ожидания upstream",
+    ["service", "route", "status_class"], buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "gateway_requests_in_flight", "Запросы в обработке",
+    ["service"], multiprocess_mode="livesum",
+)
+BYTES_IN = Counter("gateway_request_bytes_total", "Байты тел запросов", ["service"])
+BYTES_OUT = Counter("gateway_response_bytes_total", "Байты тел ответов", ["service"])
+
+# Время upstream текущего запроса: middleware кладёт сюда список, proxy дописывает длительности
+upstream_timings: ContextVar[Optional[List[float]]] = ContextVar("upstream_timings", default=None)
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+ROUTE_MAX_SEGMENTS = 3
+GATEWAY_SERVICE = "gateway"
+OTHER_ROUTE = "other"
+
+
+def record_upstream_time(elapsed: float):
+    timings = upstream_timings.get()
+    if timings is not None:
+        timings.append(elapsed)
+
+
+def service_label(path: str) -> str:
+    """Сервис по первому сегменту пути; неизвестные - "gateway" """
+    segment = path.lstrip("/").split("/", 1)[0]
+    return segment if segment in settings.SERVICE_ROUTES else GATEWAY_SERVICE
+
+
+def normalize_path(path: str) -> str:
+    """UUID и числа заменяются на {id}, глубина ограничена ROUTE_MAX_SEGMENTS"""
+    segments = [segment for segment in path.split("/") if segment]
+    normalized = [
+        "{id}" if segment.isdigit() or _UUID_RE.match(segment) else segment
+        for segment in segments[:ROUTE_MAX_SEGMENTS]
+    ]
+    if len(segments) > ROUTE_MAX_SEGMENTS:
+        normalized.append("...")
+    return "/" + "/".join(normalized)
+
+
+class RouteLabels:
+    """Ограниченный набор шаблонов маршрута: первые limit шаблонов сервиса, дальше - "other" """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._seen: Dict[str, Set[str]] = {}
+
+    def admit(self, service: str, template: str) -> str:
+        seen = self._seen.setdefault(service, set())
+        if template in seen:
+            return template
+        if len(seen) >= self.limit:
+            return OTHER_ROUTE
+        seen.add(template)
+        return template
+
+
+route_labels = RouteLabels(settings.METRICS_ROUTES_PER_SERVICE)
+
+
+def route_template(scope: Scope) -> Tuple[str, str]:
+    """
+    (сервис, шаблон маршрута) для обработанного запроса.
+    Вызывается после приложения: роутер уже записал в scope сработавший роут.
+    """
+    service = service_label(scope["path"])
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        # ни один роут не подошёл (404, preflight CORS)
+        return service, OTHER_ROUTE
+    if "service" not in scope.get("path_params", {}):
+        # собственный эндпоинт Gateway
+        return service, template
+    if service == GATEWAY_SERVICE:
+        # прокси-роут с неизвестным сервисом
+        return service, OTHER_ROUTE
+    return service, route_labels.admit(service, normalize_path(scope["path"]))
+
+
+def status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Текстовый формат Prometheus (с агрегацией воркеров в multiprocess-режиме)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,68 +1,139 @@
 """
 Middleware для API Gateway
+
+Чистые ASGI middleware (без BaseHTTPMiddleware): не создают отдельную задачу
+и поток тела на каждый запрос, а только оборачивают send/receive.
 """
+import random
 import time
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .metrics import (
+    BYTES_IN,
+    BYTES_OUT,
+    GATEWAY_DURATION,
+    IN_FLIGHT,
+    REQUEST_DURATION,
+    REQUESTS,
+    UPSTREAM_DURATION,
+    route_template,
+    service_label,
+    status_class,
+    upstream_timings,
+)
 
 logger = logging.getLogger(__name__)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
     Middleware для логирования всех запросов
     """
-    
-    async def dispatch(self, request: Request, call_next):
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Засекаем время начала обработки
-        start_time = time.time()
-        
-        # Получаем информацию о запросе
-        client_ip = request.client.host if request.client else "unknown"
-        method = request.method
-        path = request.url.path
-        
-        # Пропускаем запрос через цепочку middleware
-        response = await call_next(request)
-        
-        # Вычисляем время обработки
-        process_time = time.time() - start_time
-        
-        # Логируем запрос
-        logger.info(
-            f"{client_ip} - \"{method} {path}\" "
-            f"{response.status_code} - {process_time:.3f}s"
-        )
-        
-        # Добавляем заголовок с временем обработки
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
-
-class MetricsMiddleware(BaseHTTPMiddleware):
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Добавляем заголовок с временем обработки
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = str(time.perf_counter() - start_time)
+            await send(message)
+
+        try:
+            # Пропускаем запрос через цепочку middleware
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            if self.should_log(status_code, elapsed):
+                client = scope.get("client")
+                logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "client_ip": client[0] if client else "unknown",
+                    },
+                )
+
+    @staticmethod
+    def should_log(status_code: int, elapsed: float) -> bool:
+        """Ошибки и медленные запросы пишутся всегда, успешные - с вероятностью ACCESS_LOG_SAMPLE_RATE"""
+        if status_code >= 400 or elapsed >= settings.ACCESS_LOG_SLOW_SECONDS:
+            return True
+        return random.random() < settings.ACCESS_LOG_SAMPLE_RATE
+
+class MetricsMiddleware:
     """
-    Middleware для сбора метрик
+    Middleware для сбора метрик (Prometheus): задержки, запросы в обработке,
+    байты тел по сервису, шаблону маршрута и классу статуса
     """
-    def __init__(self, app):
-        super().__init__(app)
-        self.request_count = 0
-        self.error_count = 0
-    
-    async def dispatch(self, request: Request, call_next):
-        self.request_count += 1
-        
+
+    EXCLUDED_PATHS = {"/metrics"}
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        service = service_label(scope["path"])
+        start_time = time.perf_counter()
+        status_code = 500
+        bytes_in = 0
+        bytes_out = 0
+        timings = []
+        token = upstream_timings.set(timings)
+
+        async def receive_wrapper() -> Message:
+            nonlocal bytes_in
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, bytes_out
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels(service)
+        in_flight.inc()
         try:
-            response = await call_next(request)
-            
-            # Считаем ошибки
-            if response.status_code >= 400:
-                self.error_count += 1
-            
-            # Добавляем метрики в заголовки
-            response.headers["X-Request-Count"] = str(self.request_count)
-            response.headers["X-Error-Count"] = str(self.error_count)
-            
-            return response
-        except Exception as e:
-            self.error_count += 1
-            raise e
\ No newline at end of file
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            in_flight.dec()
+            upstream_timings.reset(token)
+            elapsed = time.perf_counter() - start_time
+            upstream_elapsed = sum(timings)
+            status = status_class(status_code)
+            service, route = route_template(scope)
+
+            REQUESTS.labels(service, route, scope["method"], status).inc()
+            REQUEST_DURATION.labels(service, route, status).observe(elapsed)
+            if timings:
+                UPSTREAM_DURATION.labels(service, route, status).observe(upstream_elapsed)
+            GATEWAY_DURATION.labels(service, route, status).observe(max(elapsed - upstream_elapsed, 0.0))
+            BYTES_IN.labels(service).inc(bytes_in)
+            BYTES_OUT.labels(service).inc(bytes_out)
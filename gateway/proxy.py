@@ -1,30 +1,300 @@
 """
 Логика проксирования запросов к микросервисам
 """
+import asyncio
+import hashlib
 import httpx
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from typing import Dict, Optional
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import importlib.util
 import logging
-import json
+import time
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
 
 from .config import settings
+from .metrics import record_upstream_time
+from shared.tracing import current_span, inject_headers, new_span, tracer
+from .balancer import LoadBalancer, UpstreamInstance
+from .resilience import FAILURE_STATUS_CODES, OPEN, CircuitBreaker, RetryBudget
 
 logger = logging.getLogger(__name__)
 
+# Ошибки, после которых идемпотентный запрос можно безопасно повторить
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# Hop-by-hop заголовки (RFC 7230), которые не передаются через прокси
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'transfer-encoding', 'upgrade',
+}
+
+
+class UploadTooLarge(Exception):
+    """Тело загрузки превысило MAX_UPLOAD_SIZE во время потоковой передачи"""
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вызовов с одинаковым ключом:
+    первый вызов запускает работу, остальные ждут его результат.
+
+    Работа выполняется в отдельной задаче, которой владеет SingleFlight,
+    а вызывающие ждут её через shield: отмена любого из них (клиент
+    отключился) не отменяет общий вызов и не роняет остальных ожидающих.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Возвращает (результат, shared) - shared=True, если результат получен от чужого вызова"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            task = asyncio.create_task(self._run(key, fn))
+            task.add_done_callback(_retrieve_exception)
+            self._calls[key] = task
+            self.leaders += 1
+        return await asyncio.shield(task), shared
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            self._calls.pop(key, None)
+
+    def to_dict(self) -> Dict:
+        return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # Исключение уже передано ожидающим; если все они отменены - не логируем
+    # "Task exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class PoolStats:
+    """Счётчики насыщения пула соединений одного upstream"""
+
+    def __init__(self):
+        self.requests_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.pool_timeouts = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests_total": self.requests_total,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "pool_timeouts": self.pool_timeouts,
+            "saturation": round(self.in_flight / settings.SERVICE_MAX_CONNECTIONS, 3),
+        }
+
+
 class ServiceProxy:
     """Класс для проксирования запросов к микросервисам"""
     
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=settings.SERVICE_TIMEOUT)
+        # Один долгоживущий клиент (пул соединений) на каждый upstream URL.
+        # Клиенты создаются в lifespan приложения (startup) и закрываются в close().
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.stats: Dict[str, PoolStats] = {}
+        # Ограничение одновременных потоковых загрузок (backpressure для multipart)
+        self.upload_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_UPLOADS)
+        # Объединение одинаковых одновременных GET к upstream
+        self.singleflight = SingleFlight()
+        # Circuit breaker и бюджет повторов на каждый upstream
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_budgets: Dict[str, RetryBudget] = {}
+        # Экземпляры сервисов (по URL) и балансировщики (по имени сервиса)
+        self.instances: Dict[str, UpstreamInstance] = {}
+        self.balancers: Dict[str, LoadBalancer] = {}
+
+    async def startup(self):
+        """Создаёт пулы соединений для всех сконфигурированных сервисов"""
+        for service_url in self.upstream_urls():
+            self.get_client(service_url)
+
+    @staticmethod
+    def service_urls(service: str) -> List[str]:
+        urls = settings.SERVICE_ROUTES.get(service) or []
+        return [urls] if isinstance(urls, str) else list(urls)
+
+    def upstream_urls(self) -> List[str]:
+        """Все уникальные URL экземпляров всех сервисов"""
+        return list(dict.fromkeys(url for service in settings.SERVICE_ROUTES for url in self.service_urls(service)))
+
+    def instance(self, service_url: str) -> UpstreamInstance:
+        instance = self.instances.get(service_url)
+        if instance is None:
+            instance = self.instances[service_url] = UpstreamInstance(service_url)
+        return instance
+
+    def balancer(self, service: str) -> LoadBalancer:
+        """Балансировщик сервиса; пересоздаётся, если список экземпляров изменился"""
+        urls = self.service_urls(service)
+        balancer = self.balancers.get(service)
+        if balancer is None or [instance.url for instance in balancer.instances] != urls:
+            balancer = self.balancers[service] = LoadBalancer(
+                [self.instance(url) for url in urls],
+                is_available=lambda instance: self.breaker(instance.url).state != OPEN,
+            )
+        return balancer
+
+    def get_client(self, service_url: str) -> httpx.AsyncClient:
+        """Возвращает клиент с пулом соединений для upstream (создаёт при первом обращении)"""
+        client = self.clients.get(service_url)
+        if client is None or client.is_closed:
+            client = self._create_client(service_url)
+            self.clients[service_url] = client
+            self.stats.setdefault(service_url, PoolStats())
+        return client
+
+    def _create_client(self, service_url: str) -> httpx.AsyncClient:
+        http2 = settings.SERVICE_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("GATEWAY_HTTP2 включён, но пакет h2 не установлен - используется HTTP/1.1")
+            http2 = False
+
+        return httpx.AsyncClient(
+            base_url=service_url,
+            http2=http2,
+            timeout=httpx.Timeout(settings.SERVICE_TIMEOUT, pool=settings.SERVICE_POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.SERVICE_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    def pool_stats(self) -> Dict[str, Dict]:
+        """Метрики насыщения пулов по каждому upstream"""
+        return {service_url: stats.to_dict() for service_url, stats in self.stats.items()}
+
+    def balancer_stats(self) -> Dict[str, Dict]:
+        """Состояние балансировки по сервисам"""
+        return {
+            service: {
+                "strategy": balancer.strategy,
+                "instances": [instance.to_dict() for instance in balancer.instances],
+            }
+            for service, balancer in self.balancers.items()
+        }
+
+    def breaker(self, service_url: str) -> CircuitBreaker:
+        breaker = self.breakers.get(service_url)
+        if breaker is None:
+            breaker = self.breakers[service_url] = CircuitBreaker(service_url)
+            self.retry_budgets[service_url] = RetryBudget()
+        return breaker
+
+    async def _send(self, service_url: str, method: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """
+        Отправляет запрос через пул upstream и учитывает его в метриках пула.
+
+        Перед запросом проверяется circuit breaker сервиса (при open - CircuitOpenError
+        без обращения к upstream). Идемпотентные запросы без потокового тела повторяются
+        при ошибках соединения - с jitter и в пределах бюджета повторов.
+        При stream=True тело ответа не читается, и вызывающий обязан закрыть ответ
+        через _close_stream - соединение до этого остаётся занятым.
+        """
+        breaker = self.breaker(service_url)
+        breaker.before_call()
+
+        client = self.get_client(service_url)
+        stats = self.stats[service_url]
+        stats.requests_total += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        instance = self.instance(service_url)
+        instance.outstanding += 1
+
+        budget = self.retry_budgets[service_url]
+        budget.record_request()
+        content = kwargs.get("content")
+        retryable = method in settings.IDEMPOTENT_METHODS and (content is None or isinstance(content, bytes))
+
+        # Исходящий span только в рамках входящего запроса (фоновые health-пробы не трассируются)
+        span = new_span(f"{method} {service_url}", "client", url=url) if current_span.get() else None
+        if span is not None:
+            kwargs["headers"] = inject_headers(dict(kwargs.get("headers") or {}), span)
+        try:
+            started = time.perf_counter()
+            try:
+                resp = await self._send_with_retries(client, budget, retryable, method, url, stream, kwargs)
+            except httpx.PoolTimeout:
+                # Исчерпан собственный пул Gateway - это не отказ сервиса
+                stats.pool_timeouts += 1
+                self._release(service_url)
+                raise
+            except httpx.TransportError:
+                breaker.record_failure()
+                instance.record_failure()
+                self._release(service_url)
+                raise
+            except BaseException:
+                self._release(service_url)
+                raise
+            finally:
+                record_upstream_time(time.perf_counter() - started)
+
+            breaker.record_status(resp.status_code)
+            if span is not None:
+                span.attributes["status_code"] = resp.status_code
+            if resp.status_code in FAILURE_STATUS_CODES:
+                instance.record_failure()
+            else:
+                instance.record_success()
+            if not stream:
+                self._release(service_url)
+            return resp
+        finally:
+            if span is not None:
+                tracer.finish(span)
+
+    def _release(self, service_url: str):
+        self.stats[service_url].in_flight -= 1
+        self.instance(service_url).outstanding -= 1
+
+    async def _send_with_retries(self, client: httpx.AsyncClient, budget: RetryBudget, retryable: bool,
+                                 method: str, url: str, stream: bool, kwargs: Dict) -> httpx.Response:
+        def should_retry(exc: BaseException) -> bool:
+            return retryable and isinstance(exc, RETRYABLE_ERRORS) and budget.try_spend()
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(settings.RETRY_ATTEMPTS if retryable else 1),
+            wait=wait_random_exponential(multiplier=settings.RETRY_BACKOFF, max=settings.RETRY_MAX_BACKOFF),
+            retry=retry_if_exception(should_retry),
+            reraise=True,
+        ):
+            with attempt:
+                upstream_request = client.build_request(method, url, **kwargs)
+                return await client.send(upstream_request, stream=stream)
+
+    async def _send_stream(self, service_url: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Отправляет запрос и возвращает ответ без чтения тела (см. _send)"""
+        return await self._send(service_url, method, url, stream=True, **kwargs)
+
+    async def _close_stream(self, service_url: str, resp: httpx.Response):
+        await resp.aclose()
+        self._release(service_url)
     
-    async def proxy_request(self, service: str, path: str, request: Request, current_user: Optional[Dict] = None) -> Response:
-        service_url = settings.SERVICE_ROUTES.get(service)
-        if not service_url:
+    def resolve(self, service: str, path: str) -> Tuple[str, str]:
+        """Возвращает (URL выбранного экземпляра сервиса, путь в сервисе) для запроса к Gateway"""
+        if not self.service_urls(service):
             raise ValueError(f"Service '{service}' not configured")
-        
+        return self.balancer(service).pick().url, self.target_path(service, path)
+
+    def target_path(self, service: str, path: str) -> str:
+        """Путь в сервисе с учётом префиксов роутеров"""
         # Для Auth Service добавляем префикс "auth/" к path, потому что роутер имеет префикс /auth
         if service == "auth" and not path.startswith("auth/"):
             path = f"auth/{path}"
@@ -37,30 +307,131 @@ class ServiceProxy:
         # Для Family Tree Service добавляем префикс "family/"
         if service == "family" and not path.startswith("family/"):
             path = f"family/{path}"
+        # Для Media Service добавляем префикс "media/"
+        if service == "media" and not path.startswith("media/"):
+            path = f"media/{path}"
         
-        target_url = f"{service_url.rstrip('/')}/{path.lstrip('/')}"
+        return f"/{path.lstrip('/')}"
+
+    def coalesce_key(self, service: str, target_url: str, request: Request, current_user: Optional[Dict]) -> str:
+        """Ключ объединения: сервис, путь, query и область авторизации"""
+        if current_user:
+            scope = f"user:{current_user.get('user_id')}"
+        elif 'authorization' in request.headers:
+            scope = "auth:" + hashlib.sha256(request.headers['authorization'].encode()).hexdigest()
+        else:
+            scope = "anon"
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        accept = request.headers.get('accept', '')
+        return f"{request.method}:{service}{target_url}?{query}:{scope}:{accept}"
+
+    async def fetch(self, service: str, path: str, request: Request, current_user: Optional[Dict] = None) -> httpx.Response:
+        """
+        Буферизованный GET без тела: ответ читается целиком.
+        Одновременные одинаковые запросы разделяют один вызов upstream -
+        прочитанный httpx.Response неизменяем и безопасно отдаётся всем ожидающим.
+        """
+        target_url = self.target_path(service, path)
+        headers = self._prepare_headers(request, current_user)
+
+        async def send() -> httpx.Response:
+            # Экземпляр выбирается только для реально отправляемого запроса
+            service_url, _ = self.resolve(service, path)
+            return await self._send(
+                service_url,
+                request.method,
+                target_url,
+                headers=headers,
+                params=dict(request.query_params),
+            )
+
+        key = self.coalesce_key(service, target_url, request, current_user)
+        resp, _ = await self.singleflight.do(key, send)
+        return resp
+
+    def can_coalesce(self, service: str, request: Request) -> bool:
+        return (
+            settings.PROXY_COALESCE_GET
+            and request.method == "GET"
+            and service not in settings.COALESCE_EXCLUDE_SERVICES
+        )
+
+    async def proxy_request(self, service: str, path: str, request: Request, current_user: Optional[Dict] = None) -> Response:
+        if self.can_coalesce(service, request):
+            resp = await self.fetch(service, path, request, current_user)
+            return Response(
+                content=resp.content,
+                status_code=resp.status_code,
+                headers=self._filter_response_headers(resp.headers, decoded=True),
+            )
+
+        service_url, target_url = self.resolve(service, path)
         
         headers = self._prepare_headers(request, current_user)
 
         # Проверяем multipart
         if 'multipart/form-data' in request.headers.get('content-type', ''):
-            return await self._proxy_multipart(request, target_url, headers, current_user)
+            return await self._proxy_multipart(request, service_url, target_url, headers, current_user)
         
-        # Для обычных JSON-запросов
+        if settings.PROXY_STREAMING:
+            return await self._proxy_stream(request, service_url, target_url, headers)
+
+        # Буферизованный режим: тело читается целиком, байты ответа отдаются как есть
         body = await request.body()
-        async with httpx.AsyncClient(timeout=settings.SERVICE_TIMEOUT) as client:
-            resp = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=headers,
-                params=dict(request.query_params),
-                content=body
-            )
-            # Возвращаем JSON, если возможно
-            try:
-                return JSONResponse(status_code=resp.status_code, content=resp.json())
-            except Exception:
-                return Response(content=resp.content, status_code=resp.status_code, headers=dict(resp.headers))
+        resp = await self._send(
+            service_url,
+            request.method,
+            target_url,
+            headers=headers,
+            params=dict(request.query_params),
+            content=body
+        )
+        # httpx уже распаковал тело, поэтому content-encoding/length не передаём
+        response_headers = self._filter_response_headers(resp.headers, decoded=True)
+        return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
+
+    async def _proxy_stream(self, request: Request, service_url: str, target_url: str, headers: Dict) -> Response:
+        """
+        Потоковое проксирование: тело запроса передаётся из request.stream(),
+        тело ответа - исходными байтами через StreamingResponse.
+        Память на запрос не зависит от размера payload.
+        """
+        content = None
+        if 'content-length' in request.headers or 'transfer-encoding' in request.headers:
+            content = request.stream()
+            if 'content-length' in request.headers:
+                # Сохраняем длину, чтобы upstream не получал chunked-тело
+                headers['content-length'] = request.headers['content-length']
+
+        resp = await self._send_stream(
+            service_url,
+            request.method,
+            target_url,
+            headers=headers,
+            params=dict(request.query_params),
+            content=content,
+        )
+        return StreamingResponse(
+            self._stream_body(service_url, resp),
+            status_code=resp.status_code,
+            headers=self._filter_response_headers(resp.headers),
+        )
+
+    async def _stream_body(self, service_url: str, resp: httpx.Response) -> AsyncIterator[bytes]:
+        """
+        Тело ответа upstream; соединение и счётчики освобождаются и при обрыве
+        посреди тела (background-задача StreamingResponse тогда не запускается)
+        """
+        try:
+            async for chunk in resp.aiter_raw():
+                yield chunk
+        finally:
+            await self._close_stream(service_url, resp)
+
+    def _filter_response_headers(self, upstream_headers: httpx.Headers, decoded: bool = False) -> Dict:
+        """Заголовки ответа upstream без hop-by-hop (и без кодирования, если тело уже распаковано)"""
+        skip = HOP_BY_HOP_HEADERS | ({'content-encoding', 'content-length'} if decoded else set())
+        return {name: value for name, value in upstream_headers.items() if name.lower() not in skip}
     
     def _prepare_headers(self, request: Request, current_user: Optional[Dict]) -> Dict:
         """
@@ -109,40 +480,64 @@ class ServiceProxy:
         return await request.body()
     
     async def close(self):
-        """Закрывает HTTP клиент"""
-        await self.client.aclose()
+        """Закрывает все пулы соединений"""
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
 
 
-    async def _proxy_multipart(self, request: Request, target_url: str, 
+    async def _proxy_multipart(self, request: Request, service_url: str, target_url: str,
                               headers: Dict, current_user: Optional[Dict]) -> Response:
-        """Проксирование multipart/form-data запросов"""
-        # Получаем данные формы
-        form_data = await request.form()
-        
-        # Создаем новую форму
-        files = []
-        data = {}
-        
-        for key, value in form_data.items():
-            if hasattr(value, 'read'):  # Это файл
-                # Читаем файл в память (для небольших файлов)
-                # Для больших файлов используйте потоковую передачу
-                file_content = await value.read()
-                files.append((key, (value.filename, file_content, value.content_type)))
-            else:
-                data[key] = value
-        
-        # Отправляем запрос
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
+        """
+        Потоковое проксирование multipart/form-data запросов.
+
+        Сырое тело передаётся upstream по частям вместе с исходным content-type
+        (и boundary), форма в Gateway не разбирается. Число одновременных загрузок
+        ограничено семафором, а чтение из клиента идёт только по мере отправки
+        в upstream - в памяти на загрузку держится не больше одного чанка.
+        """
+        content_length = request.headers.get('content-length')
+        if content_length:
+            try:
+                declared_size = int(content_length)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid Content-Length")
+            if declared_size < 0:
+                raise HTTPException(status_code=400, detail="Invalid Content-Length")
+            if declared_size > settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413, detail="Upload too large")
+
+        try:
+            await asyncio.wait_for(self.upload_slots.acquire(), timeout=settings.UPLOAD_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Too many concurrent uploads")
+
+        try:
+            if content_length:
+                headers['content-length'] = content_length
+            response = await self._send(
+                service_url,
+                request.method,
                 target_url,
-                files=files,
-                data=data,
-                headers=headers
+                headers=headers,
+                params=dict(request.query_params),
+                content=self._limited_stream(request),
+                timeout=httpx.Timeout(settings.UPLOAD_TIMEOUT, pool=settings.SERVICE_POOL_TIMEOUT),
             )
-            
+        finally:
+            self.upload_slots.release()
+
         return Response(
             content=response.content,
             status_code=response.status_code,
-            headers=dict(response.headers)
-        )
\ No newline at end of file
+            headers=self._filter_response_headers(response.headers, decoded=True)
+        )
+
+    async def _limited_stream(self, request: Request) -> AsyncIterator[bytes]:
+        """Отдаёт тело запроса по чанкам, обрывая загрузку сверх MAX_UPLOAD_SIZE"""
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.MAX_UPLOAD_SIZE:
+                raise UploadTooLarge(f"Upload exceeds {settings.MAX_UPLOAD_SIZE} bytes")
+            yield chunk
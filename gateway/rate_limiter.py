@@ -0,0 +1,147 @@
+"""
+Rate limiting для API Gateway
+
+Алгоритм GCRA (generic cell rate algorithm): на ключ хранится одно число -
+теоретическое время прихода следующего запроса (TAT), проверка O(1).
+Состояние общее для всех воркеров через Redis (атомарный Lua-скрипт),
+при отсутствии Redis - в памяти процесса, разбитой на шарды.
+"""
+import logging
+import math
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# KEYS[1] - ключ; ARGV[1] - интервал между запросами (сек); ARGV[2] - период (сек).
+# Время берётся из Redis, чтобы воркеры с разными часами видели одну шкалу.
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, tostring(allow_at - now), '0'}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0', tostring(math.floor((period - (new_tat - now)) / interval))}
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """'10/minute' -> (10, 60)"""
+    amount, _, period = rate.partition("/")
+    return int(amount), PERIODS[period.strip().rstrip("s")]
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.remaining, 0)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class MemoryGCRA:
+    """GCRA в памяти процесса; ключи распределены по шардам, просроченные чистятся по шарду"""
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self, shards: int = 64):
+        self._shards: List[Dict[str, float]] = [{} for _ in range(shards)]
+        self._hits = [0] * shards
+
+    def _shard(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % len(self._shards)
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        index = self._shard(key)
+        shard = self._shards[index]
+        now = time.monotonic()
+        interval = period / limit
+
+        self._hits[index] += 1
+        if self._hits[index] % self.SWEEP_EVERY == 0:
+            # Удаляем ключи, чей TAT уже в прошлом - их состояние эквивалентно отсутствию
+            for stale in [k for k, tat in shard.items() if tat < now]:
+                del shard[stale]
+
+        tat = max(shard.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - period
+        if now < allow_at:
+            return RateLimitResult(False, limit, 0, allow_at - now)
+        shard[key] = new_tat
+        return RateLimitResult(True, limit, int((period - (new_tat - now)) / interval), 0.0)
+
+
+class RedisGCRA:
+    """GCRA в Redis: одно атомарное выполнение Lua-скрипта на запрос"""
+
+    def __init__(self, redis_client, prefix: str = "gw:rl:"):
+        self.redis = redis_client
+        self.prefix = prefix
+        self._script = redis_client.register_script(GCRA_LUA)
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        allowed, retry_after, remaining = await self._script(
+            keys=[self.prefix + key], args=[period / limit, period]
+        )
+        return RateLimitResult(bool(int(allowed)), limit, int(float(remaining)), float(retry_after))
+
+
+class RateLimiter:
+    """Выбирает Redis, если он задан, и переходит на память процесса при его недоступности"""
+
+    def __init__(self, redis_url: Optional[str] = None, redis_client=None):
+        self.memory = MemoryGCRA()
+        self.redis: Optional[RedisGCRA] = None
+        self.redis_errors = 0
+        if redis_client is None and redis_url:
+            try:
+                import redis.asyncio as redis
+                redis_client = redis.from_url(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis rate limiter disabled: {e}")
+        if redis_client is not None:
+            self.redis = RedisGCRA(redis_client)
+
+    async def hit(self, key: str, rate: str) -> RateLimitResult:
+        limit, period = parse_rate(rate)
+        if self.redis is not None:
+            try:
+                return await self.redis.hit(key, limit, period)
+            except Exception as e:
+                self.redis_errors += 1
+                if self.redis_errors % 100 == 1:
+                    logger.warning(f"Redis rate limiter unavailable, using in-process fallback: {e}")
+        return await self.memory.hit(key, limit, period)
+
+
+rate_limiter = RateLimiter(settings.REDIS_URL)
@@ -0,0 +1,174 @@
+"""
+Устойчивость к сбоям микросервисов: circuit breaker и бюджет повторов
+"""
+import logging
+import time
+from collections import deque
+from typing import Dict
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Ответы upstream, которые считаются отказом сервиса
+FAILURE_STATUS_CODES = {502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Сервис помечен как недоступный - запрос отклонён без обращения к upstream"""
+
+    def __init__(self, service_url: str, retry_after: float):
+        super().__init__(f"Circuit open for {service_url}")
+        self.service_url = service_url
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker одного upstream.
+
+    closed    - запросы проходят, исходы пишутся в скользящее окно;
+                при доле отказов >= failure_rate (и не меньше min_calls исходов) - open
+    open      - запросы сразу отклоняются до истечения open_seconds
+                (или до успешной фоновой проверки /health); из closed сюда
+                также ведут probe_failures неудачных проверок /health подряд
+    half_open - пропускается ограниченное число пробных запросов;
+                успех закрывает breaker, отказ снова открывает
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = None,
+        min_calls: int = None,
+        failure_rate: float = None,
+        open_seconds: float = None,
+        half_open_calls: int = None,
+        probe_failures: int = None,
+    ):
+        self.name = name
+        self.min_calls = min_calls or settings.BREAKER_MIN_CALLS
+        self.failure_rate = failure_rate or settings.BREAKER_FAILURE_RATE
+        self.open_seconds = open_seconds or settings.BREAKER_OPEN_SECONDS
+        self.half_open_calls = half_open_calls or settings.BREAKER_HALF_OPEN_CALLS
+        self.probe_failures = probe_failures or settings.BREAKER_PROBE_FAILURES
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trials = 0
+        self.trial_started_at = 0.0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window or settings.BREAKER_WINDOW)
+
+    def before_call(self):
+        """Проверка перед запросом; бросает CircuitOpenError, если запрос не пропускается"""
+        if self.state == CLOSED:
+            return
+        now = time.monotonic()
+        if self.state == OPEN:
+            remaining = self.opened_at + self.open_seconds - now
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self._transition(HALF_OPEN)
+        # HALF_OPEN: ограниченное число пробных запросов; зависшая проба не блокирует навсегда
+        if self.trials >= self.half_open_calls and now - self.trial_started_at < self.open_seconds:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.open_seconds)
+        if self.trials == 0 or now - self.trial_started_at >= self.open_seconds:
+            self.trial_started_at = now
+        self.trials += 1
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.min_calls and self.current_failure_rate() >= self.failure_rate:
+            self._transition(OPEN)
+
+    def record_status(self, status_code: int):
+        if status_code in FAILURE_STATUS_CODES:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_probe(self, healthy: bool, consecutive_failures: int = 1):
+        """
+        Результат фоновой проверки /health; consecutive_failures - число
+        неудачных проверок подряд, включая эту
+        """
+        if healthy and self.state == OPEN:
+            # Сервис ожил - не ждём окончания open_seconds, пропускаем пробные запросы
+            self._transition(HALF_OPEN)
+        elif not healthy and self.state == HALF_OPEN:
+            self._transition(OPEN)
+        elif not healthy and self.state == CLOSED and consecutive_failures >= self.probe_failures:
+            # Одиночный таймаут проверки не отрезает исправный сервис
+            self._transition(OPEN)
+
+    def current_failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.trials = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def to_dict(self) -> Dict:
+        return {
+            "state": self.state,
+            "failure_rate": round(self.current_failure_rate(), 3),
+            "window": len(self._outcomes),
+            "rejected": self.rejected,
+        }
+
+
+class RetryBudget:
+    """
+    Бюджет повторов: каждый запрос добавляет ratio токена, повтор тратит один токен.
+    Кроме того, бюджет пополняется на min_per_second в секунду - редкие запросы
+    тоже могут повторяться, а при массовом отказе повторы не умножают нагрузку.
+    """
+
+    def __init__(self, ratio: float = None, min_per_second: float = None):
+        self.ratio = ratio if ratio is not None else settings.RETRY_BUDGET_RATIO
+        self.min_per_second = min_per_second if min_per_second is not None else settings.RETRY_BUDGET_MIN_PER_SECOND
+        self.max_balance = max(10.0, self.min_per_second * 10)
+        self.balance = self.max_balance
+        self.updated = time.monotonic()
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.max_balance, self.balance + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def record_request(self):
+        self._refill()
+        self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.balance >= 1:
+            self.balance -= 1
+            return True
+        self.exhausted += 1
+        return False
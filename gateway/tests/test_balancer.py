@@ -0,0 +1,58 @@
+import asyncio
+from collections import Counter
+
+import httpx
+
+from gateway.balancer import LEAST_OUTSTANDING, POWER_OF_TWO, LoadBalancer, UpstreamInstance
+from gateway.config import settings
+from gateway.main import app, service_proxy
+from scripts.benchmarks._stub_upstream import make_app, start_stub, stub_payload
+
+
+def test_round_robin_spreads_requests_over_local_instances(monkeypatch):
+    urls = [start_stub(make_app(stub_payload(instance=i))) for i in range(3)]
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "family", urls)
+    monkeypatch.setattr(settings, "LB_STRATEGY", "round_robin")
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                return [(await client.get("/family/tree/public")).json()["instance"] for _ in range(30)]
+        finally:
+            await service_proxy.close()
+
+    served = Counter(asyncio.run(scenario()))
+
+    assert served == {0: 10, 1: 10, 2: 10}
+
+
+def test_failing_instance_is_ejected(monkeypatch):
+    urls = [start_stub(make_app(stub_payload(instance="alive"))), "http://127.0.0.1:1"]
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "family", urls)
+    monkeypatch.setattr(settings, "LB_STRATEGY", "round_robin")
+    monkeypatch.setattr(settings, "LB_EJECT_CONSECUTIVE_FAILURES", 2)
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                return [(await client.get("/family/tree/public")).status_code for _ in range(20)]
+        finally:
+            await service_proxy.close()
+
+    statuses = asyncio.run(scenario())
+
+    # Две ошибки мёртвого экземпляра, затем он исключён и все запросы уходят на живой
+    assert statuses.count(502) == 2
+    assert statuses[-10:] == [200] * 10
+
+
+def test_least_outstanding_and_p2c_prefer_idle_instance():
+    busy, idle = UpstreamInstance("http://busy"), UpstreamInstance("http://idle")
+    busy.outstanding = 10
+
+    assert LoadBalancer([busy, idle], LEAST_OUTSTANDING).pick() is idle
+    assert all(LoadBalancer([busy, idle], POWER_OF_TWO).pick() is idle for _ in range(20))
@@ -0,0 +1,77 @@
+import asyncio
+
+from gateway.cache import CachedResponse, CacheManager, InMemoryBackend
+
+
+def _response(body: bytes = b'{"items": []}') -> CachedResponse:
+    return CachedResponse(200, [("content-type", "application/json")], body)
+
+
+def test_cached_response_round_trip():
+    original = _response(b"\x00binary\xff")
+
+    restored = CachedResponse.from_bytes(original.to_bytes())
+
+    assert restored == original
+
+
+def test_l1_then_l2_hits():
+    backend = InMemoryBackend()
+    manager = CacheManager(backend=backend)
+
+    async def scenario():
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            return _response()
+
+        _, first = await manager.get_or_load("k", 60, loader)
+        _, second = await manager.get_or_load("k", 60, loader)
+        # Другой воркер: пустой L1, общий L2
+        other = CacheManager(backend=backend)
+        _, third = await other.get_or_load("k", 60, loader)
+        return calls, first, second, third
+
+    calls, first, second, third = asyncio.run(scenario())
+
+    assert calls == 1
+    assert (first, second, third) == ("MISS", "HIT-L1", "HIT-L2")
+
+
+def test_concurrent_misses_are_coalesced():
+    manager = CacheManager(backend=InMemoryBackend())
+
+    async def scenario():
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return _response()
+
+        results = await asyncio.gather(*(manager.get_or_load("k", 60, loader) for _ in range(20)))
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+
+    assert calls == 1
+    assert all(cached.body == b'{"items": []}' for cached, _ in results)
+    assert manager.stats.coalesced == 19
+
+
+def test_l1_is_bounded_by_bytes():
+    manager = CacheManager(l1_max_bytes=8 * 1024)
+
+    async def scenario():
+        for i in range(20):
+            await manager.set(f"k{i}", b"x" * 900, 60)
+
+    asyncio.run(scenario())
+
+    assert manager.l1.size <= 8 * 1024
+    assert manager.stats.evictions > 0
+    assert manager.l1.get("k19") is not None
+    assert manager.l1.get("k0") is None
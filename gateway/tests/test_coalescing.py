@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+from gateway.config import settings
+from gateway.main import app, service_proxy
+from gateway.proxy import SingleFlight
+from scripts.benchmarks._stub_upstream import make_app, start_stub, stub_payload
+
+
+def test_concurrent_calls_with_same_key_share_one_upstream_call():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "body"
+
+        results = await asyncio.gather(*(flight.do("GET /pages", fetch) for _ in range(10)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert [value for value, _ in results] == ["body"] * 10
+    assert [shared for _, shared in results].count(False) == 1
+    assert flight.to_dict() == {"leaders": 1, "shared": 9, "in_flight": 0}
+
+
+def test_upstream_error_is_raised_in_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("upstream down")
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(3)), return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert flight.to_dict()["in_flight"] == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "body"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("key", fetch)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [("body", True)] * 5
+
+
+def test_uncached_get_is_streamed_by_default(monkeypatch):
+    upstream_url = start_stub(make_app(stub_payload(biography="x" * 1024)))
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "family", [upstream_url])
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {})
+    streamed = []
+    proxy_stream = service_proxy._proxy_stream
+
+    async def spy(*args, **kwargs):
+        response = await proxy_stream(*args, **kwargs)
+        streamed.append(response)
+        return response
+
+    monkeypatch.setattr(service_proxy, "_proxy_stream", spy)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                return await client.get("/family/tree/public/list")
+        finally:
+            await service_proxy.close()
+
+    resp = asyncio.run(scenario())
+    assert settings.PROXY_COALESCE_GET is False
+    assert resp.status_code == 200
+    assert resp.json()["biography"] == "x" * 1024
+    assert len(streamed) == 1
@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import httpx
+
+from gateway.config import settings
+from gateway.health import HealthMonitor
+from gateway.main import app, health_monitor, service_proxy
+from gateway.proxy import ServiceProxy
+from gateway.resilience import CLOSED, OPEN
+from scripts.benchmarks._stub_upstream import make_app, start_stub
+
+PROBE_DELAY = 0.3
+
+
+def _status_app(status: int, hits: list = None):
+    async def upstream(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if hits is not None:
+            hits.append(scope["path"])
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return upstream
+
+
+def _probe_rounds(monitor: HealthMonitor, rounds: int):
+    async def scenario():
+        try:
+            started = time.perf_counter()
+            snapshot = await monitor.probe_all()
+            first_round = time.perf_counter() - started
+            for _ in range(rounds - 1):
+                snapshot = await monitor.probe_all()
+            return snapshot, first_round
+        finally:
+            await monitor.proxy.close()
+
+    return asyncio.run(scenario())
+
+
+def test_upstreams_are_probed_concurrently(monkeypatch):
+    slow = [start_stub(make_app(delay=PROBE_DELAY)) for _ in range(3)]
+    monkeypatch.setattr(settings, "SERVICE_ROUTES", {"auth": [slow[0]], "memory": [slow[1]], "family": [slow[2]]})
+
+    snapshot, elapsed = _probe_rounds(HealthMonitor(ServiceProxy()), rounds=1)
+
+    assert {service: status["status"] for service, status in snapshot.items()} == dict.fromkeys(
+        ("auth", "memory", "family"), "healthy")
+    # время раунда - самый медленный upstream, а не сумма трёх
+    assert PROBE_DELAY <= elapsed < PROBE_DELAY * 2
+
+
+def test_history_keeps_latency_and_error_counts(monkeypatch):
+    healthy = start_stub(make_app(delay=0.02))
+    failing = start_stub(_status_app(503))
+    monkeypatch.setattr(settings, "SERVICE_ROUTES", {"auth": [healthy], "media": [failing, "http://127.0.0.1:1"]})
+    monkeypatch.setattr(settings, "HEALTH_HISTORY_SIZE", 2)
+    monitor = HealthMonitor(ServiceProxy())
+
+    snapshot, _ = _probe_rounds(monitor, rounds=3)
+
+    auth = snapshot["auth"]
+    assert auth["status"] == "healthy"
+    assert (auth["checks"], auth["errors"], auth["consecutive_errors"]) == (3, 0, 0)
+    assert len(monitor.upstreams[healthy].latencies) == 2
+    assert 20 <= auth["latency_ms"]["p50"] <= auth["latency_ms"]["max"]
+
+    media = snapshot["media"]
+    assert media["status"] == "unreachable"
+    unhealthy, unreachable = media["instances"]
+    assert (unhealthy["status"], unhealthy["status_code"]) == ("unhealthy", 503)
+    assert unreachable["status"] == "unreachable"
+    assert all((instance["errors"], instance["consecutive_errors"]) == (3, 3) for instance in media["instances"])
+
+
+def test_health_all_serves_cached_snapshot_until_refresh(monkeypatch):
+    hits = []
+    monkeypatch.setattr(settings, "SERVICE_ROUTES", {"auth": [start_stub(_status_app(200, hits))]})
+    monkeypatch.setattr(health_monitor, "upstreams", {})
+    monkeypatch.setattr(health_monitor, "snapshot", {})
+    monkeypatch.setattr(health_monitor, "snapshot_at", None)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                first = await client.get("/health/all")
+                cached = await client.get("/health/all")
+                probes_before_refresh = len(hits)
+                refreshed = await client.get("/health/all", params={"refresh": "true"})
+                return first.json(), cached.json(), probes_before_refresh, refreshed.json()
+        finally:
+            await service_proxy.close()
+
+    first, cached, probes_before_refresh, refreshed = asyncio.run(scenario())
+
+    assert probes_before_refresh == 1
+    assert cached["checked_at"] == first["checked_at"]
+    assert cached["services"]["auth"]["checks"] == 1
+    assert len(hits) == 2
+    assert refreshed["checked_at"] > first["checked_at"]
+    assert refreshed["services"]["auth"]["checks"] == 2
+
+
+def test_pool_timeout_does_not_count_as_failed_probe(monkeypatch):
+    url = "http://family"
+    monkeypatch.setattr(settings, "SERVICE_ROUTES", {"family": [url]})
+    monkeypatch.setattr(settings, "BREAKER_PROBE_FAILURES", 3)
+    outcomes = iter([503, 503, "pool", "pool", 200, 503, 503, "pool", "pool", 503])
+
+    def handler(request):
+        outcome = next(outcomes)
+        if outcome == "pool":
+            raise httpx.PoolTimeout("pool exhausted", request=request)
+        return httpx.Response(outcome)
+
+    proxy = ServiceProxy()
+    client = httpx.AsyncClient(base_url=url, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(proxy, "get_client", lambda service_url: client)
+    monitor = HealthMonitor(proxy)
+
+    async def probe(times: int):
+        return [await monitor.probe(url) for _ in range(times)]
+
+    results = asyncio.run(probe(9))
+
+    # 503, 503, два pool timeout, 200, 503, 503, два pool timeout: подряд максимум две ошибки
+    assert [result["status"] for result in results].count("unknown") == 4
+    upstream = monitor.upstreams[url]
+    assert (upstream.checks, upstream.errors, upstream.consecutive_errors, upstream.pool_timeouts) == (5, 4, 2, 4)
+    assert proxy.breaker(url).state == CLOSED
+
+    # третья настоящая ошибка подряд открывает breaker
+    asyncio.run(probe(1))
+    assert proxy.breaker(url).state == OPEN
@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+
+import httpx
+
+from gateway.config import settings
+from gateway.main import app
+from gateway.metrics import OTHER_ROUTE, REQUESTS, RouteLabels, normalize_path, route_template
+
+
+class _Route:
+    def __init__(self, path):
+        self.path = path
+
+
+def _proxied(path: str) -> dict:
+    service, _, rest = path.lstrip("/").partition("/")
+    return {"path": path, "route": _Route("/{service}/{path:path}"),
+            "path_params": {"service": service, "path": rest}}
+
+
+def test_ids_are_folded_into_template():
+    assert normalize_path(f"/memory/pages/{uuid.uuid4()}") == "/memory/pages/{id}"
+    assert normalize_path("/family/trees/42/members/7") == "/family/trees/{id}/..."
+
+
+def test_random_paths_map_to_bounded_label_set(monkeypatch):
+    monkeypatch.setattr("gateway.metrics.route_labels", RouteLabels(limit=5))
+    labels = set()
+    for i in range(1000):
+        token = uuid.uuid4().hex
+        labels.add(route_template(_proxied(f"/memory/{token}/{i}")))
+        labels.add(route_template(_proxied(f"/{token}/pages")))
+        labels.add(route_template({"path": f"/{token}", "path_params": {}}))
+
+    services = {service for service, _ in labels}
+    assert services <= set(settings.SERVICE_ROUTES) | {"gateway"}
+    assert len({route for service, route in labels if service == "memory"}) == 5 + 1
+    assert ("gateway", OTHER_ROUTE) in labels
+    assert len(labels) <= 5 + 2
+
+
+def test_gateway_routes_use_matched_template():
+    scope = {"path": "/health/all", "route": _Route("/health/all"), "path_params": {}}
+    assert route_template(scope) == ("gateway", "/health/all")
+
+
+def _sample(service: str, route: str, status: str) -> float:
+    return REQUESTS.labels(service, route, "GET", status)._value.get()
+
+
+def test_middleware_records_requests_and_metrics_endpoint_exports_them():
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            health = await client.get("/health")
+            missing = await client.get(f"/{uuid.uuid4().hex}/pages")
+            exported = await client.get("/metrics")
+        return health, missing, exported
+
+    health_before = _sample("gateway", "/health", "2xx")
+    other_before = _sample("gateway", OTHER_ROUTE, "4xx")
+    health, missing, exported = asyncio.run(scenario())
+
+    assert health.status_code == 200
+    assert missing.status_code == 404
+    assert _sample("gateway", "/health", "2xx") == health_before + 1
+    assert _sample("gateway", OTHER_ROUTE, "4xx") == other_before + 1
+    assert exported.status_code == 200
+    assert exported.headers["content-type"].startswith("text/plain")
+    assert 'gateway_requests_total{method="GET",route="/health",service="gateway",status_class="2xx"}' in exported.text
+    # сам /metrics в метрики не попадает
+    assert 'route="/metrics"' not in exported.text
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from gateway.rate_limiter import MemoryGCRA, RateLimiter, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60)
+    assert parse_rate("5/second") == (5, 1)
+
+
+def test_memory_gcra_allows_budget_then_sets_retry_after():
+    limiter = RateLimiter()
+
+    async def scenario():
+        return [await limiter.hit("auth:login:ip:1.2.3.4", "10/minute") for _ in range(12)]
+
+    results = asyncio.run(scenario())
+
+    assert [r.allowed for r in results] == [True] * 10 + [False] * 2
+    assert 0 < results[-1].retry_after <= 6
+    assert results[-1].headers()["Retry-After"] == str(int(results[-1].retry_after) + 1)
+
+
+def test_memory_gcra_keys_are_independent():
+    gcra = MemoryGCRA(shards=4)
+
+    async def scenario():
+        first = [await gcra.hit("a", 2, 60) for _ in range(3)]
+        second = await gcra.hit("b", 2, 60)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert [r.allowed for r in first] == [True, True, False]
+    assert second.allowed
+
+
+def test_workers_share_budget_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    allowed = []
+
+    def worker():
+        # Отдельный поток, event loop и подключение - как у отдельного воркера Gateway
+        async def run():
+            limiter = RateLimiter(redis_client=fakeredis.aioredis.FakeRedis(server=server))
+            return sum([(await limiter.hit("auth:login:user:42", "10/minute")).allowed for _ in range(5)])
+
+        allowed.append(asyncio.run(run()))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    # 4 воркера x 5 попыток, общий бюджет 10/minute
+    assert sum(allowed) == 10
@@ -0,0 +1,72 @@
+import pytest
+
+from gateway.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RetryBudget
+
+
+def _breaker(**overrides) -> CircuitBreaker:
+    options = dict(window=10, min_calls=4, failure_rate=0.5, open_seconds=30, half_open_calls=1, probe_failures=1)
+    options.update(overrides)
+    return CircuitBreaker("http://memory", **options)
+
+
+def test_breaker_opens_on_failure_rate_and_fails_fast():
+    breaker = _breaker()
+    for status_code in (200, 503, 504, 502):
+        breaker.before_call()
+        breaker.record_status(status_code)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_allows_single_trial_and_closes_on_success():
+    breaker = _breaker()
+    breaker.record_probe(healthy=False)
+    assert breaker.state == OPEN
+
+    breaker.record_probe(healthy=True)
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_only_after_consecutive_probe_failures():
+    breaker = _breaker(probe_failures=3)
+    breaker.record_probe(healthy=False, consecutive_failures=1)
+    breaker.record_probe(healthy=False, consecutive_failures=2)
+    assert breaker.state == CLOSED
+
+    # успешная проверка обнуляет серию в UpstreamHealth
+    breaker.record_probe(healthy=True)
+    breaker.record_probe(healthy=False, consecutive_failures=1)
+    assert breaker.state == CLOSED
+
+    breaker.record_probe(healthy=False, consecutive_failures=3)
+    assert breaker.state == OPEN
+
+
+def test_half_open_failure_reopens():
+    breaker = _breaker()
+    breaker.record_probe(healthy=False)
+    breaker.record_probe(healthy=True)
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+
+
+def test_retry_budget_limits_retries_to_ratio():
+    budget = RetryBudget(ratio=0.25, min_per_second=0)
+    budget.balance = 0
+
+    for _ in range(40):
+        budget.record_request()
+    spent = sum(budget.try_spend() for _ in range(50))
+
+    assert spent == 10
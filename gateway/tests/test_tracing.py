@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from gateway.config import settings
+from gateway.main import app, service_proxy
+from scripts.benchmarks._stub_upstream import start_stub
+from shared.tracing import (
+    FileExporter,
+    InMemoryExporter,
+    TracingMiddleware,
+    configure_tracing,
+    exporter_from_env,
+    instrument_engine,
+    load_spans,
+    new_span,
+    tracer,
+)
+
+
+def make_traced_service():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    service = FastAPI()
+    service.add_middleware(TracingMiddleware)
+
+    @service.get("/family/tree/{tree_id}")
+    def tree(tree_id: str):
+        with engine.connect() as conn:
+            return {"tree": conn.execute(text("SELECT :id"), {"id": tree_id}).scalar()}
+
+    return service
+
+
+def test_trace_propagates_from_gateway_to_service_and_db(monkeypatch):
+    exporter = InMemoryExporter()
+    configure_tracing("gateway", exporter)
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "family", [start_stub(make_traced_service())])
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                return await client.get("/family/tree/public")
+        finally:
+            await service_proxy.close()
+
+    try:
+        resp = asyncio.run(scenario())
+    finally:
+        configure_tracing("gateway", InMemoryExporter())
+
+    assert resp.status_code == 200
+    spans = {(s.kind, s.name.split(" ")[0]): s for s in exporter.spans}
+    trace_ids = {s.trace_id for s in exporter.spans}
+    assert trace_ids == {resp.headers["x-request-id"]}
+
+    gateway_server = next(s for s in exporter.spans if s.kind == "server" and s.parent_id is None)
+    upstream_call = spans[("client", "GET")]
+    service_server = next(s for s in exporter.spans if s.kind == "server" and s.parent_id is not None)
+    db_query = spans[("client", "db.query")]
+    assert upstream_call.parent_id == gateway_server.span_id
+    assert service_server.parent_id == upstream_call.span_id
+    assert db_query.parent_id == service_server.span_id
+    assert db_query.attributes["statement"] == "SELECT ?"
+
+
+def test_tracing_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORT", raising=False)
+    assert exporter_from_env() is None
+
+
+def test_file_exporter_writes_in_background_and_rotates(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = FileExporter(str(path), max_bytes=2000, backup_count=2)
+    spans = [new_span(f"span {i}", "internal") for i in range(50)]
+    for span in spans:
+        exporter.export(span)
+    exporter.close()
+
+    files = sorted(tmp_path.iterdir())
+    assert [f.name for f in files] == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    assert all(f.stat().st_size <= 2000 for f in files)
+    written = load_spans(str(path))
+    assert written[-1]["span_id"] == spans[-1].span_id
+    assert exporter.dropped == 0
+
+
+def test_trace_context_is_propagated_with_export_off(monkeypatch):
+    received = {}
+
+    async def upstream(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        received.update({k.decode(): v.decode() for k, v in scope["headers"]})
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    monkeypatch.setattr(tracer, "exporter", None)
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "family", [start_stub(upstream)])
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {})
+    incoming_trace = "ab" * 16
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                return await client.get("/family/tree/public",
+                                        headers={"traceparent": f"00-{incoming_trace}-{'cd' * 8}-01"})
+        finally:
+            await service_proxy.close()
+
+    resp = asyncio.run(scenario())
+
+    assert resp.headers["x-request-id"] == incoming_trace
+    assert received["x-request-id"] == incoming_trace
+    assert received["traceparent"].startswith(f"00-{incoming_trace}-")
@@ -0,0 +1,137 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from gateway.config import settings
+from gateway.dependencies import optional_auth
+from gateway.main import app, service_proxy
+from scripts.benchmarks._stub_upstream import start_stub
+
+CHUNK = b"x" * (64 * 1024)
+UPLOAD_SIZE = 96 * 1024 * 1024
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _counting_upstream(received: dict):
+    async def upstream(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        received["content_type"] = dict(scope["headers"]).get(b"content-type", b"").decode()
+        more_body = True
+        while more_body:
+            message = await receive()
+            received["bytes"] += len(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok": true}'})
+    return upstream
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="RSS доступен только в Linux")
+def test_large_multipart_upload_is_streamed_with_bounded_rss(monkeypatch):
+    received = {"bytes": 0}
+    upstream_url = start_stub(_counting_upstream(received))
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "media", [upstream_url])
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", UPLOAD_SIZE * 2)
+
+    boundary = "gateway-test-boundary"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="video.mp4"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    total = len(head) + UPLOAD_SIZE + len(tail)
+
+    async def body():
+        yield head
+        for _ in range(UPLOAD_SIZE // len(CHUNK)):
+            yield CHUNK
+        yield tail
+
+    async def upload():
+        app.dependency_overrides[optional_auth] = lambda: {"user_id": "u", "email": ""}
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                rss_before = _rss_bytes()
+                resp = await client.post(
+                    "/media/upload",
+                    content=body(),
+                    headers={
+                        "content-type": f"multipart/form-data; boundary={boundary}",
+                        "content-length": str(total),
+                    },
+                )
+                rss_growth = _rss_bytes() - rss_before
+        finally:
+            app.dependency_overrides = {}
+            await service_proxy.close()
+        return resp, rss_growth
+
+    resp, rss_growth = asyncio.run(upload())
+
+    assert resp.status_code == 200
+    assert received["bytes"] == total
+    assert received["content_type"] == f"multipart/form-data; boundary={boundary}"
+    # Загрузка 96 MB не должна оседать в памяти Gateway
+    assert rss_growth < 32 * 1024 * 1024
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-1"])
+def test_malformed_content_length_is_rejected_with_400(content_length):
+    async def body():
+        yield b"--b\r\n\r\n--b--\r\n"
+
+    async def upload():
+        app.dependency_overrides[optional_auth] = lambda: {"user_id": "u", "email": ""}
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                return await client.post(
+                    "/media/upload",
+                    content=body(),
+                    headers={"content-type": "multipart/form-data; boundary=b", "content-length": content_length},
+                )
+        finally:
+            app.dependency_overrides = {}
+            await service_proxy.close()
+
+    resp = asyncio.run(upload())
+
+    assert resp.status_code == 400
+
+
+def test_upstream_reset_mid_body_releases_pool_slot_and_balancer_count(monkeypatch):
+    async def resetting_upstream(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-length", str(len(CHUNK) * 16).encode())]})
+        await send({"type": "http.response.body", "body": CHUNK, "more_body": True})
+        raise RuntimeError("upstream reset")
+
+    upstream_url = start_stub(resetting_upstream)
+    monkeypatch.setitem(settings.SERVICE_ROUTES, "family", [upstream_url])
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {})
+
+    async def download():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                with pytest.raises(httpx.RemoteProtocolError):
+                    await client.get("/family/tree/public/list")
+            return service_proxy.stats[upstream_url].in_flight, service_proxy.instance(upstream_url).outstanding
+        finally:
+            await service_proxy.close()
+
+    in_flight, outstanding = asyncio.run(download())
+
+    assert (in_flight, outstanding) == (0, 0)
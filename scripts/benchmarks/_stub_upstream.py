@@ -0,0 +1,59 @@
+"""
+Локальный stub-upstream для бенчмарков Gateway.
+
+Поднимает uvicorn с минимальным ASGI-приложением в фоновом потоке
+и возвращает его базовый URL.
+"""
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_app(payload: bytes = b'{"status": "ok"}', delay: float = 0.0):
+    """ASGI-приложение, отвечающее фиксированным JSON на любой запрос"""
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        # Вычитываем тело запроса целиком
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+        if delay:
+            import asyncio
+            await asyncio.sleep(delay)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+    return app
+
+
+def start_stub(app=None, port: int = None) -> str:
+    """Запускает stub-сервер в daemon-потоке и ждёт готовности"""
+    port = port or _free_port()
+    config = uvicorn.Config(app or make_app(), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def stub_payload(**fields) -> bytes:
+    return json.dumps(fields).encode()
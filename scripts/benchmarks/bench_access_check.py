@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк проверки доступа к странице при большом потоке запросов.
+
+--checks проверок (user, page) раздаются --threads потокам, как синхронным
+роутерам сервиса доступа в пуле потоков. Пары выбираются с перекосом
+(--hot доля запросов приходится на 1% пар), как у популярных страниц.
+  legacy   - прежний check_user_page_access: запрос страницы и отдельный
+             запрос page_access_control
+  resolver - resolve_page_access: один запрос, без кэша
+  cached   - check_user_page_access: resolve_page_access + кэш прав
+
+--rtt-ms добавляет задержку к каждому запросу, имитируя сетевой round-trip
+до PostgreSQL. Печатаются пропускная способность и задержки p50/p99.
+
+Запуск:
+    python scripts/benchmarks/bench_access_check.py --checks 50000 --threads 8 --rtt-ms 0.3
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from database.base import Base
+from database.models.access import PageAccessControl
+from database.models.auth import User
+from database.models.memory import AgentBD, PageBD
+from services.Acces_Memory import crud
+from services.Acces_Memory.permissions import permission_cache
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def seed(engine, pages: int, users: int):
+    """Страницы и доступы с UUID строкой с дефисами, как их передаёт raw SQL сервиса"""
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, AgentBD.__table__, PageBD.__table__, PageAccessControl.__table__
+    ])
+    page_ids = [uuid.uuid4() for _ in range(pages)]
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO pages (id_page, agent_id, user_id, is_public, is_draft) VALUES (:id, :agent, :user, :public, 0)"),
+            [{"id": str(p), "agent": str(uuid.uuid4()), "user": str(user_ids[i % users]), "public": i % 4 == 0}
+             for i, p in enumerate(page_ids)],
+        )
+        conn.execute(
+            text("INSERT INTO page_access_control (id_access, page_id, user_id, can_view, can_edit, is_active) "
+                 "VALUES (:id, :page, :user, 1, 0, 1)"),
+            [{"id": str(uuid.uuid4()), "page": str(p), "user": str(user_ids[(i + 1) % users])}
+             for i, p in enumerate(page_ids)],
+        )
+    return page_ids, user_ids
+
+
+def legacy_check(db, page_id, user_id):
+    """Прежняя проверка: страница, затем доступ - два запроса"""
+    page = db.execute(
+        text("SELECT id_page, user_id, is_public, is_draft FROM pages WHERE id_page = :page_id"),
+        {"page_id": str(page_id)},
+    ).fetchone()
+    if not page:
+        return False
+    if str(page.user_id) == str(user_id) or (page.is_public and not page.is_draft):
+        return True
+    access = db.execute(
+        text("SELECT can_view, can_edit, expires_at FROM page_access_control "
+             "WHERE page_id = :page_id AND user_id = :user_id AND is_active = TRUE"),
+        {"page_id": str(page_id), "user_id": str(user_id)},
+    ).fetchone()
+    return bool(access) and (access.expires_at is None or access.expires_at >= datetime.now(timezone.utc))
+
+
+def workload(page_ids, user_ids, checks: int, hot: float, seed_value: int = 42):
+    rng = random.Random(seed_value)
+    pairs = [(rng.choice(page_ids), rng.choice(user_ids)) for _ in range(max(len(page_ids), 100))]
+    hot_pairs = pairs[:max(1, len(pairs) // 100)]
+    return [rng.choice(hot_pairs) if rng.random() < hot else rng.choice(pairs) for _ in range(checks)]
+
+
+def run(engine, check, requests, threads: int):
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index):
+        with Session(engine) as db:
+            for page_id, user_id in requests[index::threads]:
+                started = time.perf_counter()
+                check(db, page_id, user_id)
+                latencies[index].append(time.perf_counter() - started)
+                db.rollback()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    samples = sorted(sample for chunk in latencies for sample in chunk)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    return len(samples) / elapsed, statistics.median(samples) * 1000, p99 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--checks", type=int, default=50_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--hot", type=float, default=0.8, help="доля запросов к 1%% самых популярных пар")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="задержка на каждый запрос к БД, мс")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        page_ids, user_ids = seed(engine, args.pages, args.users)
+        if args.rtt_ms > 0:
+            @event.listens_for(engine, "before_cursor_execute")
+            def _round_trip(conn, cursor, statement, parameters, context, executemany):
+                time.sleep(args.rtt_ms / 1000)
+
+        requests = workload(page_ids, user_ids, args.checks, args.hot)
+        print(f"{args.checks} checks, {args.threads} threads, hot {args.hot}, rtt {args.rtt_ms} ms")
+        print(f"{'mode':>9} {'checks/s':>10} {'p50, ms':>9} {'p99, ms':>9}")
+        for name, check in (
+            ("legacy", legacy_check),
+            ("resolver", crud.resolve_page_access),
+            ("cached", crud.check_user_page_access),
+        ):
+            permission_cache.clear()
+            rate, p50, p99 = run(engine, check, requests, args.threads)
+            print(f"{name:>9} {rate:>10.0f} {p50:>9.3f} {p99:>9.3f}")
+        print(f"cache: {permission_cache.hits} hits, {permission_cache.misses} misses, {len(permission_cache)} entries")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
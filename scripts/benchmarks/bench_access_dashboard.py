@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк списков доступов /access/my и /access/granted: прежний запрос
+с JOIN page_access_control, pages, agents и users против чтения read model
+page_access_dashboard.
+
+Засевается --grants активных доступов (по умолчанию 100 тысяч) на --pages
+страниц и --users пользователей; --heavy доля доступов выдана одному
+пользователю и одним пользователем (как у крупного семейного архива).
+Read model заполняется access_dashboard.rebuild. Для каждого режима
+печатается задержка p50/p99 первой страницы (--limit записей) по случайным
+пользователям, время прохода всех страниц тяжёлого пользователя по курсору
+и стоимость записи: create_access, который теперь пересобирает строку
+read model в той же транзакции.
+  legacy    - прежний SQL с тремя JOIN по page_access_control
+  dashboard - list_access_by_user / list_access_by_grantor
+
+Запуск:
+    python scripts/benchmarks/bench_access_dashboard.py --grants 100000 --users 2000 --limit 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, desc, insert, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, aliased
+
+from database import access_dashboard
+from database.base import Base
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.models.auth import User
+from database.models.memory import AgentBD, PageBD
+from database.pagination import after_cursor, split_page
+from services.Acces_Memory import crud, schemas
+from services.Acces_Memory.permissions import permission_cache
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def seed(engine, grants: int, pages: int, users: int, heavy: float, batch: int = 50_000):
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, AgentBD.__table__, PageBD.__table__, PageAccessControl.__table__,
+        PageAccessDashboard.__table__,
+    ])
+    rng = random.Random(42)
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    agent_ids = [uuid.uuid4() for _ in range(max(1, pages // 5))]
+    page_ids = [uuid.uuid4() for _ in range(pages)]
+    started = datetime.now(timezone.utc) - timedelta(days=365)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id_user": user_id, "email": f"user{i}@example.com", "username": f"user{i}",
+             "full_name": f"Пользователь {i}", "password_hash": "-", "role_id": user_ids[0]}
+            for i, user_id in enumerate(user_ids)
+        ])
+        conn.execute(insert(AgentBD), [
+            {"id_agent": agent_id, "full_name": f"Агент {i}", "gender": "M", "user_id": user_ids[i % users]}
+            for i, agent_id in enumerate(agent_ids)
+        ])
+        conn.execute(insert(PageBD), [
+            {"id_page": page_id, "agent_id": agent_ids[i % len(agent_ids)], "user_id": user_ids[i % users],
+             "is_public": False, "is_draft": False}
+            for i, page_id in enumerate(page_ids)
+        ])
+        for offset in range(0, grants, batch):
+            conn.execute(insert(PageAccessControl), [
+                {
+                    "id_access": uuid.uuid4(), "page_id": rng.choice(page_ids),
+                    # heavy-доля доступов - у одного получателя и одного грантора
+                    "user_id": user_ids[0] if rng.random() < heavy else rng.choice(user_ids),
+                    "granted_by": user_ids[1] if rng.random() < heavy else rng.choice(user_ids),
+                    "can_view": True, "is_active": i % 10 != 0,
+                    "granted_at": started + timedelta(seconds=i * 60),
+                }
+                for i in range(offset, min(offset + batch, grants))
+            ])
+        access_dashboard.rebuild(conn)
+    return page_ids, user_ids
+
+
+def legacy_list(db, owner_column, owner_id, cursor=None, limit=50):
+    """Прежний список: JOIN четырёх таблиц при каждом чтении"""
+    Other = aliased(User)
+    other_id = (PageAccessControl.granted_by if owner_column == "user_id" else PageAccessControl.user_id)
+    sort_key = (PageAccessControl.granted_at, PageAccessControl.id_access)
+    query = (
+        select(
+            PageAccessControl.id_access, PageAccessControl.user_id, PageAccessControl.granted_by,
+            Other.full_name, Other.username, AgentBD.id_agent, PageBD.id_page, AgentBD.full_name,
+            AgentBD.is_human, PageBD.is_public, PageBD.is_draft, PageAccessControl.can_view,
+            PageAccessControl.can_edit, PageAccessControl.granted_at, PageAccessControl.expires_at,
+            PageAccessControl.is_active,
+        )
+        .join(PageBD, PageAccessControl.page_id == PageBD.id_page)
+        .join(AgentBD, PageBD.agent_id == AgentBD.id_agent)
+        .join(Other, other_id == Other.id_user)
+        .where(getattr(PageAccessControl, owner_column) == owner_id, PageAccessControl.is_active == True)
+    )
+    condition = after_cursor(sort_key, cursor)
+    if condition is not None:
+        query = query.where(condition)
+    rows = db.execute(query.order_by(*(desc(column) for column in sort_key)).limit(limit + 1)).fetchall()
+    items = [dict(row._mapping) for row in rows]
+    items, next_cursor = split_page(items, limit, lambda item: (item['granted_at'], item['id_access']))
+    return items, next_cursor, None
+
+
+MODES = {
+    "legacy": {
+        "my": lambda db, owner_id, **kw: legacy_list(db, "user_id", owner_id, **kw),
+        "granted": lambda db, owner_id, **kw: legacy_list(db, "granted_by", owner_id, **kw),
+    },
+    "dashboard": {
+        "my": crud.list_access_by_user,
+        "granted": crud.list_access_by_grantor,
+    },
+}
+
+
+def first_pages(engine, list_fn, owners, limit):
+    latencies = []
+    with Session(engine) as db:
+        for owner_id in owners:
+            started = time.perf_counter()
+            list_fn(db, owner_id, limit=limit)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def walk(engine, list_fn, owner_id, limit):
+    rows, cursor = 0, None
+    with Session(engine) as db:
+        started = time.perf_counter()
+        while True:
+            items, cursor, _ = list_fn(db, owner_id, cursor=cursor, limit=limit)
+            rows += len(items)
+            if cursor is None:
+                break
+    return rows, time.perf_counter() - started
+
+
+def grant_cost(engine, page_ids, user_ids, count: int):
+    """Средняя стоимость create_access (с пересборкой строки read model), мс"""
+    rng = random.Random(7)
+    with Session(engine, expire_on_commit=False) as db:
+        started = time.perf_counter()
+        for _ in range(count):
+            crud.create_access(db, schemas.PageAccessCreate(
+                page_id=rng.choice(page_ids), user_id=rng.choice(user_ids), can_view=True
+            ), rng.choice(user_ids))
+        return (time.perf_counter() - started) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="URL БД (по умолчанию временный SQLite-файл)")
+    parser.add_argument("--grants", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--heavy", type=float, default=0.05, help="доля доступов у одного пользователя")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2_000, help="запросов первой страницы на режим")
+    parser.add_argument("--writes", type=int, default=500, help="create_access для оценки стоимости записи")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(args.url or f"sqlite:///{tmp}/bench.db")
+        started = time.perf_counter()
+        page_ids, user_ids = seed(engine, args.grants, args.pages, args.users, args.heavy)
+        print(f"seeded {args.grants} grants in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(1)
+        owners = [rng.choice(user_ids) for _ in range(args.requests)]
+        heavy_owner = {"my": user_ids[0], "granted": user_ids[1]}
+        print(f"{'mode':>10} {'list':>8} {'p50, ms':>9} {'p99, ms':>9} {'walk rows':>10} {'walk, ms':>9}")
+        for mode, lists in MODES.items():
+            for name, list_fn in lists.items():
+                p50, p99 = first_pages(engine, list_fn, owners, args.limit)
+                rows, elapsed = walk(engine, list_fn, heavy_owner[name], args.limit)
+                print(f"{mode:>10} {name:>8} {p50:>9.3f} {p99:>9.3f} {rows:>10} {elapsed * 1000:>9.1f}")
+
+        permission_cache.clear()
+        print(f"create_access with read model refresh: {grant_cost(engine, page_ids, user_ids, args.writes):.3f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
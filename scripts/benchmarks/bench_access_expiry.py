@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк фонового снятия истёкших доступов (deactivate_expired_access).
+
+Таблица page_access_control засевается --rows активными доступами
+(по умолчанию миллион; SQLite-файл, либо свой PostgreSQL через --url),
+у --expired доли из них срок действия уже истёк. Индексы создаются из
+модели, включая ix_page_access_expires_active. Для каждого --batch
+таблица восстанавливается и проходится чистильщиком до конца; печатаются
+общее время, строк в секунду и самая долгая пачка (сколько держатся
+блокировки одной транзакции).
+
+Запуск:
+    python scripts/benchmarks/bench_access_expiry.py --rows 1000000 --expired 0.2 --batch 500 1000 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+import database.models.auth  # noqa: F401  (users и pages для связей PageAccessControl)
+import database.models.memory  # noqa: F401
+from database.base import Base
+from database.models.access import PageAccessControl
+from services.Acces_Memory.crud import deactivate_expired_access
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def seed(engine, rows: int, expired: float, batch: int = 50_000):
+    Base.metadata.create_all(engine, tables=[PageAccessControl.__table__])
+    now = datetime.now(timezone.utc)
+    step = max(1, round(1 / expired)) if expired else 0
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            conn.execute(insert(PageAccessControl), [
+                {
+                    "id_access": uuid.uuid4(), "page_id": uuid.uuid4(), "user_id": uuid.uuid4(),
+                    "can_view": True, "is_active": True,
+                    # каждая step-я запись истекла, остальные - бессрочные или в будущем
+                    "expires_at": (now - timedelta(minutes=i % 10_000)) if step and i % step == 0
+                    else (now + timedelta(days=30) if i % 2 else None),
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+
+def reactivate(engine):
+    with engine.begin() as conn:
+        conn.execute(update(PageAccessControl).values(is_active=True))
+
+
+def sweep(engine, batch_size: int):
+    durations = []
+    total = 0
+    with Session(engine) as db:
+        while True:
+            started = time.perf_counter()
+            swept = deactivate_expired_access(db, batch_size)
+            durations.append(time.perf_counter() - started)
+            total += swept
+            if swept < batch_size:
+                break
+    return total, sum(durations), max(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="URL БД (по умолчанию временный SQLite-файл)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--expired", type=float, default=0.2, help="доля истёкших доступов")
+    parser.add_argument("--batch", type=int, nargs="+", default=[500, 1000, 5000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(args.url or f"sqlite:///{tmp}/bench.db")
+        started = time.perf_counter()
+        seed(engine, args.rows, args.expired)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'batch':>7} {'swept':>9} {'total, s':>9} {'rows/s':>9} {'max batch, ms':>14}")
+        for batch_size in args.batch:
+            reactivate(engine)
+            total, elapsed, slowest = sweep(engine, batch_size)
+            print(f"{batch_size:>7} {total:>9} {elapsed:>9.2f} {total / elapsed:>9.0f} {slowest * 1000:>14.1f}")
+
+        with engine.connect() as conn:
+            active = conn.execute(
+                select(func.count()).select_from(PageAccessControl).where(PageAccessControl.is_active == True)
+            ).scalar()
+        print(f"active grants after sweep: {active} of {args.rows}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк импорта семейного древа: поштучные CRUD-вызовы против пакетных.
+
+Импортируется древо из --people человек (по умолчанию 1000): агенты,
+их страницы, участники древа и связи parent между соседями по цепочке.
+  single - прежний путь клиента: create_memory_agent, create_page,
+           add_agent_to_tree и create_relationship на каждую запись,
+           у каждого свой commit
+  bulk   - create_memory_agents_bulk, create_pages_bulk,
+           add_agents_to_tree_bulk и create_relationships_bulk:
+           INSERT ... RETURNING пачками и один commit на вызов
+
+Сервис Memory работает через aiosqlite, Family Tree - через обычный
+sqlite на том же файле; сессии, как и в database.session, с
+expire_on_commit=False. --rtt-ms добавляет задержку к каждому запросу,
+имитируя сетевой round-trip до PostgreSQL.
+
+Запуск:
+    python scripts/benchmarks/bench_bulk_import.py --people 1000 --rtt-ms 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from database.base import Base
+from database.models.family import FamilyTree, FamilyTreeAgent, RelationshipAgent
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries, track_queries
+from services.Family_Tree import crud as family_crud
+from services.Family_Tree import schemas as family_schemas
+from services.Memory import crud as memory_crud
+from services.Memory import schemas_new as memory_schemas
+
+USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+TABLES = [AgentBD, PageBD, FamilyTree, FamilyTreeAgent, RelationshipAgent]
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def add_latency(engine, rtt_ms: float):
+    if rtt_ms <= 0:
+        return
+
+    @event.listens_for(getattr(engine, "sync_engine", engine), "before_cursor_execute")
+    def _round_trip(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(rtt_ms / 1000)
+
+
+def people(count: int):
+    return [
+        memory_schemas.AgentCreate(full_name=f"Человек {i}", gender="M" if i % 2 else "F", is_human=True)
+        for i in range(count)
+    ]
+
+
+async def import_memory_single(async_engine, agents):
+    async with AsyncSession(async_engine, expire_on_commit=False) as db:
+        agent_ids = []
+        for agent in agents:
+            created = await memory_crud.create_memory_agent(db, agent, USER_ID)
+            await memory_crud.create_page(
+                db, memory_schemas.PageCreate(agent_id=created.id_agent, is_public=True), USER_ID
+            )
+            agent_ids.append(created.id_agent)
+        return agent_ids
+
+
+async def import_memory_bulk(async_engine, agents):
+    async with AsyncSession(async_engine, expire_on_commit=False) as db:
+        created = await memory_crud.create_memory_agents_bulk(db, agents, USER_ID)
+        agent_ids = [agent.id_agent for agent in created]
+        await memory_crud.create_pages_bulk(
+            db, [memory_schemas.PageCreate(agent_id=agent_id, is_public=True) for agent_id in agent_ids], USER_ID
+        )
+        return agent_ids
+
+
+def relationships(agent_ids):
+    return [
+        family_schemas.RelationshipCreate(
+            type_relative="parent", is_blood_relative=True, agent_from=parent, agent_to=child
+        )
+        for parent, child in zip(agent_ids, agent_ids[1:])
+    ]
+
+
+def import_tree_single(engine, agent_ids):
+    with Session(engine, expire_on_commit=False) as db:
+        tree = family_crud.create_family_tree(
+            db, family_schemas.FamilyTreeCreate(name_family_tree="single"), USER_ID
+        )
+        for agent_id in agent_ids:
+            family_crud.add_agent_to_tree(db, tree.id_family_tree, agent_id)
+        for rel in relationships(agent_ids):
+            family_crud.create_relationship(db, tree.id_family_tree, USER_ID, rel)
+
+
+def import_tree_bulk(engine, agent_ids):
+    with Session(engine, expire_on_commit=False) as db:
+        tree = family_crud.create_family_tree(
+            db, family_schemas.FamilyTreeCreate(name_family_tree="bulk"), USER_ID
+        )
+        family_crud.add_agents_to_tree_bulk(db, tree.id_family_tree, agent_ids)
+        family_crud.create_relationships_bulk(db, tree.id_family_tree, USER_ID, relationships(agent_ids))
+
+
+def run(name, engine, async_engine, agents, memory_import, tree_import):
+    with track_queries() as stats:
+        started = time.perf_counter()
+        agent_ids = asyncio.run(memory_import(async_engine, agents))
+        tree_import(engine, agent_ids)
+        elapsed = time.perf_counter() - started
+    print(f"{name:>8} {elapsed * 1000:>12.1f} {stats.statements:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="задержка на каждый запрос к БД, мс")
+    args = parser.parse_args()
+
+    agents = people(args.people)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(engine, tables=[model.__table__ for model in TABLES])
+        for bind in (engine, async_engine):
+            instrument_queries(bind)
+            add_latency(bind, args.rtt_ms)
+
+        print(f"{args.people} people, {args.people - 1} relationships, rtt {args.rtt_ms} ms")
+        print(f"{'mode':>8} {'total, ms':>12} {'statements':>12}")
+        run("single", engine, async_engine, agents, import_memory_single, import_tree_single)
+        run("bulk", engine, async_engine, agents, import_memory_bulk, import_tree_bulk)
+
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
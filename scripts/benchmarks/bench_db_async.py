@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк async-эндпоинтов с синхронной и асинхронной сессией БД.
+
+SQLite-файл как стенд для PostgreSQL (aiosqlite выполняет запросы в отдельном
+потоке, как asyncpg - в сокете, не занимая event loop). Каждый --slow-every-й
+запрос - медленный: SELECT db_sleep(ms), ожидание на стороне БД (аналог
+pg_sleep / ожидания блокировки или диска), остальные - список публичных страниц
+памяти (select_public_memory_page_list).
+  before - async def + синхронная Session (прежний get_db): запрос блокирует event loop
+  after  - async def + AsyncSession (get_async_db)
+
+Пулы обоих вариантов больше --concurrency: при меньшем пуле before не просто
+медленнее, а зависает - синхронное ожидание соединения блокирует event loop,
+а соединения возвращаются в пул только после освобождения loop.
+
+Запуск:
+    python scripts/benchmarks/bench_db_async.py --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, desc, event, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import database.models.auth  # noqa: F401
+from database.base import Base
+from database.models.memory import AgentBD, PageBD
+from services.Memory.crud import select_public_memory_page_list
+
+SLOW_QUERY = text("SELECT db_sleep(:ms)")
+
+
+def register_sleep(engine):
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("db_sleep", 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def seed(url: str, pages: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[AgentBD.__table__, PageBD.__table__])
+    with Session(engine) as db:
+        user_id = uuid.uuid4()
+        for i in range(pages):
+            agent = AgentBD(full_name=f"Agent {i}", gender="M", user_id=user_id)
+            db.add(agent)
+            db.flush()
+            db.add(PageBD(agent_id=agent.id_agent, user_id=user_id, is_public=True, is_draft=False, epitaph="..."))
+        db.commit()
+    engine.dispose()
+
+
+def build_sync_app(url: str, slow_ms: int, pool_size: int) -> FastAPI:
+    engine = create_engine(url, pool_size=pool_size)
+    register_sleep(engine)
+    SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/public_memory_page_list")
+    async def page_list(db: Session = Depends(get_db)):
+        rows = db.query(AgentBD, PageBD).join(AgentBD, AgentBD.id_agent == PageBD.agent_id)\
+            .filter(PageBD.is_public == True).order_by(desc(PageBD.updated_at)).limit(50).all()
+        return {"count": len(rows)}
+
+    @app.get("/slow")
+    async def slow(db: Session = Depends(get_db)):
+        return {"count": db.execute(SLOW_QUERY, {"ms": slow_ms}).scalar()}
+
+    return app
+
+
+def build_async_app(url: str, slow_ms: int, pool_size: int) -> FastAPI:
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"),
+                                 poolclass=AsyncAdaptedQueuePool, pool_size=pool_size)
+    register_sleep(engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/public_memory_page_list")
+    async def page_list(db: AsyncSession = Depends(get_async_db)):
+        rows, _, _ = await select_public_memory_page_list(db, limit=50)
+        return {"count": len(rows)}
+
+    @app.get("/slow")
+    async def slow(db: AsyncSession = Depends(get_async_db)):
+        return {"count": (await db.execute(SLOW_QUERY, {"ms": slow_ms})).scalar()}
+
+    return app
+
+
+async def load(app: FastAPI, requests: int, concurrency: int, slow_every: int):
+    latencies = []
+    counter = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://memory") as client:
+        async def worker():
+            for i in counter:
+                if slow_every and i % slow_every == 0:
+                    await client.get("/slow")
+                    continue
+                started = time.perf_counter()
+                resp = await client.get("/public_memory_page_list")
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return requests / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--slow-every", type=int, default=20, help="каждый N-й запрос тяжёлый (0 - без них)")
+    parser.add_argument("--slow-ms", type=int, default=50, help="длительность медленного запроса")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url, args.pages)
+        for name, build in (("before", build_sync_app), ("after", build_async_app)):
+            rps, p50, p99 = asyncio.run(load(build(url, args.slow_ms, args.concurrency + 8), args.requests, args.concurrency, args.slow_every))
+            print(f"{name:6s} {rps:8.0f} req/s   page list p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк накладных расходов аутентификации Gateway на запрос.
+
+  before - прежний optional_auth: цикл startswith по PUBLIC_PATHS,
+           jwt.decode на каждый запрос, отладочные print в stderr
+  after  - одно регулярное выражение для публичных путей и кэш claims
+
+Запуск:
+    python scripts/benchmarks/bench_gateway_auth.py --iterations 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+
+from gateway.config import settings
+from gateway.dependencies import optional_auth
+
+
+def make_request(path: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""})
+
+
+async def optional_auth_before(request: Request, credentials):
+    full_path = request.url.path.rstrip("/")
+    print(f"[DEBUG] optional_auth called: path={full_path}, credentials={credentials}", file=sys.stderr)
+    if any(full_path.startswith(p.rstrip("/")) for p in settings.PUBLIC_PATHS):
+        print("[DEBUG] Path is public, returning None", file=sys.stderr)
+        return None
+    if not credentials:
+        return None
+    token = credentials.credentials
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        if payload.get("type") != "access":
+            return None
+        print(f"[DEBUG] Token valid for user {payload.get('sub')}", file=sys.stderr)
+        return {"user_id": payload.get("sub"), "email": payload.get("email"), "token": token}
+    except Exception as e:
+        print(f"[DEBUG] Token decode error: {e}", file=sys.stderr)
+        return None
+
+
+async def measure(func, paths, credentials, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        await func(make_request(paths[i % len(paths)]), credentials)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int):
+    token = jwt.encode(
+        {
+            "sub": "2b1f6a52-8b0e-4a57-9d3c-2f1d6c8f1a10",
+            "email": "user@example.com",
+            "type": "access",
+            "exp": datetime.now(timezone.utc) + timedelta(hours=1),
+        },
+        settings.JWT_SECRET_KEY,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    private_paths = ["/memory/memory_page_list", "/family/tree/my", "/agent/agent_list"]
+    public_paths = ["/memory/public_memory_page_list", "/family/tree/public"]
+
+    # stderr старой версии направляем в /dev/null, чтобы не мерить терминал
+    stderr, sys.stderr = sys.stderr, open(os.devnull, "w")
+    try:
+        results = {
+            "private before": await measure(optional_auth_before, private_paths, credentials, iterations),
+            "private after": await measure(optional_auth, private_paths, credentials, iterations),
+            "public before": await measure(optional_auth_before, public_paths, credentials, iterations),
+            "public after": await measure(optional_auth, public_paths, credentials, iterations),
+        }
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    for name, per_call in results.items():
+        print(f"{name:15s} {per_call:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк объединения запросов (singleflight) в Gateway.
+
+Отправляет всплеск одинаковых GET /family/tree/public через приложение Gateway
+к локальному stub-upstream (с искусственной задержкой) и считает, сколько
+запросов дошло до upstream с объединением и без него.
+
+Запуск:
+    python scripts/benchmarks/bench_gateway_coalescing.py --burst 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from gateway.config import settings
+from gateway.main import app, service_proxy
+from scripts.benchmarks._stub_upstream import start_stub
+
+
+def counting_upstream(counter: dict, delay: float):
+    async def upstream(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        counter["calls"] += 1
+        await asyncio.sleep(delay)
+        body = b'{"trees": [], "total": 0}'
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+    return upstream
+
+
+async def burst(size: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/family/tree/public/list") for _ in range(size)))
+        elapsed = time.perf_counter() - started
+    assert all(r.status_code == 200 for r in responses)
+    return elapsed
+
+
+async def main(size: int, delay: float):
+    logging.disable(logging.INFO)
+    counter = {"calls": 0}
+    settings.SERVICE_ROUTES["family"] = [start_stub(counting_upstream(counter, delay))]
+    # Маршрут без кэша - измеряем только объединение в proxy
+    settings.CACHE_ROUTE_TTLS.clear()
+
+    for enabled in (False, True):
+        settings.PROXY_COALESCE_GET = enabled
+        counter["calls"] = 0
+        elapsed = await burst(size)
+        label = "coalesced" if enabled else "direct"
+        print(f"{label:9s} burst={size} upstream_calls={counter['calls']:5d} elapsed={elapsed * 1000:8.1f}ms")
+
+    print(f"singleflight: {service_proxy.singleflight.to_dict()}")
+    await service_proxy.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.02, help="задержка upstream, сек")
+    args = parser.parse_args()
+    asyncio.run(main(args.burst, args.delay))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов middleware Gateway на запрос.
+
+Вызывает ASGI-приложение напрямую (без сети и HTTP-клиента) и сравнивает:
+  bare        - приложение без middleware
+  basehttp    - прежние LoggingMiddleware + MetricsMiddleware на BaseHTTPMiddleware
+  asgi        - текущие чистые ASGI LoggingMiddleware + MetricsMiddleware (с Prometheus)
+
+Запуск:
+    python scripts/benchmarks/bench_gateway_middleware.py --iterations 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from gateway.middleware import LoggingMiddleware, MetricsMiddleware
+
+
+class BaseHTTPLogging(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        logging.getLogger("bench").info(f"\"{request.method} {request.url.path}\" {response.status_code} - {process_time:.3f}s")
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+
+class BaseHTTPMetrics(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.request_count = 0
+        self.error_count = 0
+
+    async def dispatch(self, request, call_next):
+        self.request_count += 1
+        response = await call_next(request)
+        if response.status_code >= 400:
+            self.error_count += 1
+        response.headers["X-Request-Count"] = str(self.request_count)
+        response.headers["X-Error-Count"] = str(self.error_count)
+        return response
+
+
+async def endpoint(request):
+    return Response(b'{"status": "ok"}', media_type="application/json")
+
+
+def build(middleware):
+    return Starlette(routes=[Route("/memory/public_memory_page_list", endpoint)], middleware=middleware)
+
+
+async def measure(app, iterations: int) -> float:
+    scope = {
+        "type": "http", "method": "GET", "path": "/memory/public_memory_page_list",
+        "raw_path": b"/memory/public_memory_page_list", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 12345), "server": ("gateway", 8000), "scheme": "http",
+        "http_version": "1.1", "root_path": "",
+    }
+
+    def make_receive():
+        # Первое сообщение - тело запроса, дальше клиент "висит" до конца ответа
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+        return receive
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), make_receive(), send)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), make_receive(), send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int):
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    bare = await measure(build([]), iterations)
+    variants = {
+        "bare": bare,
+        "basehttp": await measure(build([Middleware(BaseHTTPMetrics), Middleware(BaseHTTPLogging)]), iterations),
+        "asgi": await measure(build([Middleware(MetricsMiddleware), Middleware(LoggingMiddleware)]), iterations),
+    }
+    for name, per_call in variants.items():
+        print(f"{name:9s} {per_call:8.2f} us/request  (+{per_call - bare:6.2f} us middleware)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
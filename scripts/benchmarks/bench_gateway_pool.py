@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пула соединений Gateway.
+
+Сравнивает p50/p99 задержки запросов к локальному stub-upstream:
+  fresh  - новый httpx.AsyncClient на каждый запрос (прежнее поведение proxy_request)
+  pooled - общий долгоживущий пул ServiceProxy
+
+Запуск:
+    python scripts/benchmarks/bench_gateway_pool.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from gateway.config import settings
+from gateway.proxy import ServiceProxy
+from scripts.benchmarks._stub_upstream import start_stub
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(send, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            resp = await send()
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert resp.status_code == 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def report(name: str, latencies, elapsed: float):
+    print(
+        f"{name:7s} p50={percentile(latencies, 50):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"mean={statistics.mean(latencies):7.2f}ms "
+        f"rps={len(latencies) / elapsed:8.0f}"
+    )
+
+
+async def main(total: int, concurrency: int):
+    upstream = start_stub()
+    print(f"stub upstream: {upstream}, requests={total}, concurrency={concurrency}")
+
+    async def fresh():
+        async with httpx.AsyncClient(timeout=settings.SERVICE_TIMEOUT) as client:
+            return await client.get(f"{upstream}/memory/public_memory_page_list")
+
+    proxy = ServiceProxy()
+
+    async def pooled():
+        return await proxy._send(upstream, "GET", "/memory/public_memory_page_list")
+
+    # Прогрев
+    await run(fresh, 50, 10)
+    await run(pooled, 50, 10)
+
+    report("fresh", *await run(fresh, total, concurrency))
+    report("pooled", *await run(pooled, total, concurrency))
+    print(f"pool stats: {proxy.pool_stats()}")
+    await proxy.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пагинации списка медиа: OFFSET/LIMIT + COUNT(*) против keyset-курсора.
+
+Таблица media засевается --rows строками одного пользователя (по умолчанию
+миллион; SQLite-файл, либо свой PostgreSQL через --url), индекс
+ix_media_user_updated создаётся из модели. Для страниц 1 и --deep-page
+измеряется задержка:
+  offset - прежний search_media: ORDER BY ... OFFSET (page - 1) * size LIMIT size
+           и отдельный COUNT(*) для total
+  keyset - search_media с курсором (updated_at, id) последней строки
+           предыдущей страницы, без total
+
+Запуск:
+    python scripts/benchmarks/bench_keyset_pagination.py --rows 1000000 --deep-page 10000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, desc, insert
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+import database.models.auth  # noqa: F401  (users и pages для связей MediaBD)
+import database.models.memory  # noqa: F401
+from database.base import Base
+from database.models.media import MediaBD
+from database.pagination import encode_cursor
+from services.Media.crud import search_media
+
+USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+SORT_KEY = (MediaBD.updated_at, MediaBD.id_media)
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def seed(engine, rows: int, batch: int = 50_000):
+    Base.metadata.create_all(engine, tables=[MediaBD.__table__])
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    page_id = uuid.uuid4()
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            conn.execute(insert(MediaBD), [
+                {
+                    "id_media": uuid.uuid4(), "user_id": USER_ID, "page_id": page_id,
+                    "file_extension": "jpg", "file_size": 1024, "media_type": "image",
+                    "mime_type": "image/jpeg", "is_public": False, "is_temp": False,
+                    # по два файла на секунду: сортировку внутри решает id
+                    "created_at": start + timedelta(seconds=i // 2),
+                    "updated_at": start + timedelta(seconds=i // 2),
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+
+def offset_page(db: Session, page: int, size: int):
+    """Прежний вариант: OFFSET и COUNT(*) на каждый запрос"""
+    query = db.query(MediaBD).filter(MediaBD.user_id == USER_ID)
+    total = query.count()
+    items = query.order_by(*(desc(column) for column in SORT_KEY)).offset((page - 1) * size).limit(size).all()
+    return items, total
+
+
+def cursor_for_page(db: Session, page: int, size: int):
+    """Курсор, который клиент получил бы на странице page - 1 (не замеряется)"""
+    if page == 1:
+        return None
+    last = (
+        db.query(MediaBD.updated_at, MediaBD.id_media)
+        .filter(MediaBD.user_id == USER_ID)
+        .order_by(*(desc(column) for column in SORT_KEY))
+        .offset((page - 1) * size - 1)
+        .first()
+    )
+    return encode_cursor(*last)
+
+
+def measure(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="URL БД (по умолчанию временный SQLite-файл)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--deep-page", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(args.url or f"sqlite:///{tmp}/bench.db")
+        started = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        with Session(engine) as db:
+            print(f"{'page':>8} {'offset+count, ms':>18} {'keyset, ms':>12}")
+            for page in (1, args.deep_page):
+                cursor = cursor_for_page(db, page, args.page_size)
+                offset_items, _ = offset_page(db, page, args.page_size)
+                keyset_items, _, _ = search_media(db, user_id=USER_ID, cursor=cursor, limit=args.page_size)
+                assert [m.id_media for m in offset_items] == [m.id_media for m in keyset_items]
+
+                offset_ms = measure(lambda: offset_page(db, page, args.page_size), args.repeat)
+                keyset_ms = measure(
+                    lambda: search_media(db, user_id=USER_ID, cursor=cursor, limit=args.page_size), args.repeat
+                )
+                print(f"{page:>8} {offset_ms:>18.2f} {keyset_ms:>12.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
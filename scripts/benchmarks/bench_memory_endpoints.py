@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк стратегий загрузки для GET-эндпоинтов сервиса памяти.
+
+Для каждого эндпоинта строится ответ (схема schemas_new + model_dump_json)
+тремя способами:
+  legacy       - прежние запросы: полные строки моделей, /memory_page_list и
+                 /memory_page/{agent_id} - кортежи (agent, page) из LEFT JOIN,
+                 перегруппировка по агентам в Python
+  selectinload - агенты, затем страницы вторым запросом (selectinload)
+                 (только эндпоинты агентов со страницами)
+  current      - crud сервиса: contains_eager (один запрос, группировка за
+                 один упорядоченный проход) и load_only колонок схемы ответа
+
+SQLite-файл (aiosqlite), --users пользователей по --agents агентов с
+--pages страницами у каждого. --rtt-ms добавляет задержку к каждому
+выражению, имитируя сетевой round-trip до PostgreSQL. Печатаются число
+SQL-выражений на запрос и задержка p50/p99. --without-agents-index
+удаляет ix_agents_user - план запросов до его появления.
+
+Запуск:
+    python scripts/benchmarks/bench_memory_endpoints.py --users 200 --agents 10 --pages 3 --rtt-ms 0.3
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import and_, create_engine, desc, event, insert, select, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import selectinload
+
+import database.models.auth  # noqa: F401  (таблица users для внешних ключей)
+from database.base import Base
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries, track_queries
+from services.Memory import crud
+from services.Memory import schemas_new as schemas
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+BIOGRAPHY = {"media_ids": [], "sections": [
+    {"title": f"Раздел {i}", "info": "Текст биографии. " * 20, "titles": []} for i in range(5)
+]}
+
+
+def seed(url: str, users: int, agents: int, pages: int, agents_index: bool = True):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[AgentBD.__table__, PageBD.__table__])
+    if not agents_index:
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_agents_user"))
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    agent_rows, page_rows = [], []
+    for user_id in user_ids:
+        for i in range(agents):
+            agent_id = uuid.uuid4()
+            agent_rows.append({
+                "id_agent": agent_id, "full_name": f"Агент {i}", "gender": "M", "user_id": user_id,
+                "place_of_birth": "Москва", "avatar_url": "https://example.com/avatar.png",
+            })
+            page_rows += [
+                {"id_page": uuid.uuid4(), "agent_id": agent_id, "user_id": user_id, "epitaph": "Помним",
+                 "biography": BIOGRAPHY, "is_public": j == 0, "is_draft": j != 0}
+                for j in range(pages)
+            ]
+    with engine.begin() as conn:
+        conn.execute(insert(AgentBD), agent_rows)
+        conn.execute(insert(PageBD), page_rows)
+    engine.dispose()
+    return user_ids, agent_rows, page_rows
+
+
+# ---------- прежние запросы ----------
+
+async def legacy_memory_page_list(db, ids):
+    rows = (await db.execute(
+        select(AgentBD, PageBD)
+        .outerjoin(PageBD, AgentBD.id_agent == PageBD.agent_id)
+        .filter(AgentBD.user_id == ids["user_id"])
+        .order_by(AgentBD.id_agent)
+        .limit(50)
+    )).all()
+    pages_by_agent, agents_by_id = defaultdict(list), {}
+    for agent, page in rows:
+        agents_by_id[agent.id_agent] = agent
+        pages_by_agent[agent.id_agent].append(page)
+    return schemas.MemoryPageListResponse(user_id=ids["user_id"], memory_page_list=[
+        schemas.MemoryPageResponse.from_models(agents_by_id[agent_id], pages)
+        for agent_id, pages in pages_by_agent.items()
+    ])
+
+
+async def legacy_memory_page(db, ids):
+    rows = (await db.execute(
+        select(AgentBD, PageBD)
+        .outerjoin(PageBD, AgentBD.id_agent == PageBD.agent_id)
+        .filter(and_(AgentBD.user_id == ids["user_id"], AgentBD.id_agent == ids["agent_id"]))
+        .order_by(AgentBD.id_agent)
+    )).all()
+    return schemas.MemoryPageResponse.from_models(rows[0][0], [page for _, page in rows if page])
+
+
+async def legacy_public_memory_page_list(db, ids):
+    rows = (await db.execute(
+        select(AgentBD, PageBD)
+        .join(AgentBD, AgentBD.id_agent == PageBD.agent_id)
+        .filter(PageBD.is_public == True)
+        .order_by(desc(PageBD.updated_at), desc(PageBD.id_page))
+        .limit(51)
+    )).all()
+    return schemas.PublicMemoryPageListResponse.from_public_memory_pages(rows[:50])
+
+
+async def legacy_agent_list(db, ids):
+    agents = (await db.execute(
+        select(AgentBD).filter(AgentBD.user_id == ids["user_id"]).limit(50)
+    )).scalars().all()
+    return schemas.AgentListResponse.from_agents(ids["user_id"], agents)
+
+
+async def legacy_page_list(db, ids):
+    pages = (await db.execute(
+        select(PageBD).filter(PageBD.agent_id == ids["agent_id"]).order_by(desc(PageBD.updated_at)).limit(50)
+    )).scalars().all()
+    return schemas.PageListResponse.from_pages(ids["user_id"], ids["agent_id"], pages)
+
+
+# ---------- selectinload ----------
+
+async def selectin_memory_page_list(db, ids):
+    agents = (await db.execute(
+        select(AgentBD).filter(AgentBD.user_id == ids["user_id"]).order_by(AgentBD.id_agent).limit(50)
+        .options(selectinload(AgentBD.pages))
+    )).scalars().all()
+    return schemas.MemoryPageListResponse.from_memory_pages(ids["user_id"], agents)
+
+
+async def selectin_memory_page(db, ids):
+    agent = (await db.execute(
+        select(AgentBD).filter(and_(AgentBD.user_id == ids["user_id"], AgentBD.id_agent == ids["agent_id"]))
+        .options(selectinload(AgentBD.pages))
+    )).scalars().first()
+    return schemas.MemoryPageResponse.from_models(agent, agent.pages)
+
+
+# ---------- текущий crud ----------
+
+async def current_memory_page_list(db, ids):
+    agents = await crud.select_memory_page_list_by_user(db, ids["user_id"])
+    return schemas.MemoryPageListResponse.from_memory_pages(ids["user_id"], agents)
+
+
+async def current_memory_page(db, ids):
+    agent = await crud.select_memory_page_by_user(db, ids["user_id"], ids["agent_id"])
+    return schemas.MemoryPageResponse.from_models(agent, agent.pages)
+
+
+async def current_public_memory_page_list(db, ids):
+    rows, next_cursor, total = await crud.select_public_memory_page_list(db)
+    return schemas.PublicMemoryPageListResponse.from_public_memory_pages(rows, next_cursor, total)
+
+
+async def current_agent_list(db, ids):
+    agents = await crud.select_memory_agent_list_by_user(db, ids["user_id"])
+    return schemas.AgentListResponse.from_agents(ids["user_id"], agents)
+
+
+async def current_page_list(db, ids):
+    pages = await crud.select_page_list(db, ids["agent_id"])
+    return schemas.PageListResponse.from_pages(ids["user_id"], ids["agent_id"], pages)
+
+
+ENDPOINTS = [
+    ("/memory_page_list", {"legacy": legacy_memory_page_list, "selectinload": selectin_memory_page_list,
+                           "current": current_memory_page_list}),
+    ("/memory_page/{agent_id}", {"legacy": legacy_memory_page, "selectinload": selectin_memory_page,
+                                 "current": current_memory_page}),
+    ("/public_memory_page_list", {"legacy": legacy_public_memory_page_list,
+                                  "current": current_public_memory_page_list}),
+    ("/agent_list", {"legacy": legacy_agent_list, "current": current_agent_list}),
+    ("/page_list/{agent_id}", {"legacy": legacy_page_list, "current": current_page_list}),
+]
+
+
+async def run(url: str, requests, rtt_ms: float, warmup: int = 50):
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    instrument_queries(engine)
+    if rtt_ms > 0:
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _round_trip(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(rtt_ms / 1000)
+
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def call(build, ids):
+        # новая сессия на запрос, как get_async_db
+        async with sessions() as db:
+            started = time.perf_counter()
+            with track_queries() as stats:
+                (await build(db, ids)).model_dump_json()
+            return time.perf_counter() - started, stats.statements
+
+    print(f"{'endpoint':>26} {'mode':>13} {'statements':>11} {'p50, ms':>9} {'p99, ms':>9}")
+    for path, modes in ENDPOINTS:
+        for build in modes.values():  # прогрев кэша скомпилированных выражений
+            for ids in requests[:warmup]:
+                await call(build, ids)
+        latencies = {mode: [] for mode in modes}
+        statements = dict.fromkeys(modes, 0)
+        # режимы чередуются на каждом запросе: дрейф стенда не достаётся одному из них
+        for ids in requests:
+            for mode, build in modes.items():
+                elapsed, count = await call(build, ids)
+                latencies[mode].append(elapsed)
+                statements[mode] += count
+        for mode, samples in latencies.items():
+            samples.sort()
+            print(f"{path:>26} {mode:>13} {statements[mode] / len(requests):>11.1f} "
+                  f"{statistics.median(samples) * 1000:>9.3f} {samples[int(len(samples) * 0.99) - 1] * 1000:>9.3f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--agents", type=int, default=10, help="агентов у пользователя")
+    parser.add_argument("--pages", type=int, default=3, help="страниц у агента")
+    parser.add_argument("--requests", type=int, default=500, help="запросов на эндпоинт и режим")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="задержка на каждое выражение, мс")
+    parser.add_argument("--without-agents-index", action="store_true", help="без индекса ix_agents_user")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        user_ids, agents, _ = seed(url, args.users, args.agents, args.pages, not args.without_agents_index)
+        rng = random.Random(42)
+        requests = []
+        for _ in range(args.requests):
+            agent = rng.choice(agents)
+            requests.append({"user_id": agent["user_id"], "agent_id": agent["id_agent"]})
+        print(f"{args.users} users x {args.agents} agents x {args.pages} pages, rtt {args.rtt_ms} ms, "
+              f"ix_agents_user: {'no' if args.without_agents_index else 'yes'}")
+        asyncio.run(run(url, requests, args.rtt_ms))
+
+
+if __name__ == "__main__":
+    main()
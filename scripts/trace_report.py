@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Отчёт по трассам из logs/traces.jsonl (см. shared/tracing.py; запись
+трасс включается переменной TRACE_EXPORT=file:logs/traces.jsonl).
+
+Для каждой трассы печатает дерево span'ов всех процессов (Gateway, сервисы,
+SQL-запросы) и критический путь - цепочку самых долгих дочерних span'ов,
+по которой видно, где на самом деле тратится время запроса.
+
+Запуск:
+    python scripts/trace_report.py logs/traces.jsonl --slowest 5
+    python scripts/trace_report.py logs/traces.jsonl --trace <trace_id>
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.tracing import load_spans
+
+
+def group_traces(spans):
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+    return traces
+
+
+def build_tree(spans):
+    """Возвращает (корни, дети по span_id); span с неизвестным родителем считается корнем"""
+    ids = {s["span_id"] for s in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in sorted(spans, key=lambda s: s["start"]):
+        if span["parent_id"] in ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+    return roots, children
+
+
+def critical_path(root, children):
+    path = [root]
+    while children.get(path[-1]["span_id"]):
+        path.append(max(children[path[-1]["span_id"]], key=lambda s: s["duration_ms"]))
+    return path
+
+
+def describe(span):
+    statement = span["attributes"].get("statement")
+    name = statement[:80] if statement else span["name"]
+    return f"{span['service']:<8} {span['kind']:<7} {span['duration_ms']:>9.2f}ms  {name}"
+
+
+def print_trace(trace_id, spans):
+    roots, children = build_tree(spans)
+    print(f"trace {trace_id}: {len(spans)} spans")
+
+    def walk(span, depth):
+        print("  " + "  " * depth + describe(span))
+        for child in children.get(span["span_id"], []):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+        print("  critical path:")
+        for span in critical_path(root, children):
+            print("    " + describe(span))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="logs/traces.jsonl")
+    parser.add_argument("--trace", help="показать только эту трассу")
+    parser.add_argument("--slowest", type=int, default=10, help="сколько самых долгих трасс показать")
+    args = parser.parse_args()
+
+    traces = group_traces(load_spans(args.path))
+    if args.trace:
+        print_trace(args.trace, traces.get(args.trace, []))
+        return
+
+    def total(spans):
+        return max(s["duration_ms"] for s in spans if s["parent_id"] not in {x["span_id"] for x in spans})
+
+    for trace_id, spans in sorted(traces.items(), key=lambda kv: total(kv[1]), reverse=True)[:args.slowest]:
+        print_trace(trace_id, spans)
+
+
+if __name__ == "__main__":
+    main()
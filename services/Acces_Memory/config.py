@@ -11,6 +11,9 @@ from config import config as base_config
 
 load_dotenv()
 
+# Пул соединений БД этого сервиса: ACCESS_DB_POOL_SIZE и др. (database/pool.py)
+os.environ.setdefault("DB_SERVICE", "access")
+
 class AccessConfig:
     """Конфигурация сервиса доступа"""
     
@@ -27,6 +30,15 @@ class AccessConfig:
     # Пагинация
     DEFAULT_PAGE_SIZE = 20
     MAX_PAGE_SIZE = 100
+
+    # Кэш проверок доступа (permissions.py): размер и время жизни записи, сек
+    PERMISSION_CACHE_SIZE = int(os.getenv("ACCESS_PERMISSION_CACHE_SIZE", "50000"))
+    PERMISSION_CACHE_TTL = float(os.getenv("ACCESS_PERMISSION_CACHE_TTL", "30"))
+
+    # Снятие истёкших доступов (expiry.py): период, сек (0 - выключено) и размер пачки
+    EXPIRY_SWEEP_INTERVAL = float(os.getenv("ACCESS_EXPIRY_SWEEP_INTERVAL", "60"))
+    EXPIRY_SWEEP_BATCH = int(os.getenv("ACCESS_EXPIRY_SWEEP_BATCH", "1000"))
+    EXPIRY_SWEEP_MAX_BATCHES = int(os.getenv("ACCESS_EXPIRY_SWEEP_MAX_BATCHES", "100"))
     
     # Логирование
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
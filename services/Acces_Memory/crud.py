@@ -2,13 +2,17 @@
 CRUD операции для управления доступом к страницам (исправленная версия).
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, text
-from typing import List, Optional, Tuple, Dict, Any
+from sqlalchemy import and_, bindparam, desc, literal, select, text, update
+from typing import List, Optional, Sequence, Tuple, Dict, Any
 import uuid
 from datetime import datetime, timezone
 
-from database.models.access import PageAccessControl
+from database.access_dashboard import refresh_grants, remove_grants
+from database.access_events import access_change_key, publish_access_changes
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.pagination import after_cursor, estimated_count, split_page
 from . import schemas
+from .permissions import permission_cache
 
 
 def normalize_uuid(value: Any) -> uuid.UUID:
@@ -47,200 +51,186 @@ def get_access_by_page_and_user(db: Session, page_id: uuid.UUID, user_id: uuid.U
     ).first()
 
 
-def list_access_by_user(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 50) -> Tuple[List[dict], int]:
-    """Получить список записей доступа для пользователя (страницы, к которым ему дали доступ)."""
-    # SQL запрос для получения данных с JOIN
-    sql = text("""
-        SELECT 
-            pa.id_access,
-            pa.user_id,
-            pa.granted_by,
-            g.full_name as grantor_full_name,
-            g.username as grantor_username,
-            a.id_agent,
-            p.id_page,
-            a.full_name as agent_full_name,
-            a.is_human,
-            p.is_public,
-            p.is_draft,
-            pa.can_view,
-            pa.can_edit,
-            pa.granted_at,
-            pa.expires_at,
-            pa.is_active
-        FROM page_access_control as pa
-        JOIN pages as p ON pa.page_id = p.id_page
-        JOIN agents as a ON p.agent_id = a.id_agent
-        JOIN users as g ON pa.granted_by = g.id_user
-        WHERE pa.user_id = :user_id AND pa.is_active = TRUE
-        ORDER BY pa.granted_at DESC
-        LIMIT :limit OFFSET :skip
-    """)
-    
-    # Получаем данные
-    result = db.execute(sql, {
-        'user_id': str(user_id),
-        'skip': skip,
-        'limit': limit
-    }).fetchall()
-    
-    # Получаем общее количество
-    count_sql = text("""
-        SELECT COUNT(*) 
-        FROM page_access_control as pa
-        WHERE pa.user_id = :user_id AND pa.is_active = TRUE
-    """)
-    
-    total = db.execute(count_sql, {'user_id': str(user_id)}).scalar() or 0
-    
-    # Преобразуем в список словарей
-    items = [dict(row._mapping) for row in result]
-    return items, total
-
-
-def list_access_by_grantor(db: Session, grantor_id: uuid.UUID, skip: int = 0, limit: int = 50) -> Tuple[List[dict], int]:
-    """Получить список записей доступа, которые предоставил определённый пользователь."""
-    # SQL запрос для получения данных с JOIN
-    sql = text("""
-        SELECT 
-            pa.id_access,
-            pa.granted_by,
-            pa.user_id,
-            u.full_name as recipient_full_name,
-            u.username as recipient_username,
-            a.id_agent,
-            p.id_page,
-            a.full_name as agent_full_name,
-            a.is_human,
-            p.is_public,
-            p.is_draft,
-            pa.can_view,
-            pa.can_edit,
-            pa.granted_at,
-            pa.expires_at,
-            pa.is_active
-        FROM page_access_control as pa
-        JOIN pages as p ON pa.page_id = p.id_page
-        JOIN agents as a ON p.agent_id = a.id_agent
-        JOIN users as u ON pa.user_id = u.id_user
-        WHERE pa.granted_by = :grantor_id AND pa.is_active = TRUE
-        ORDER BY pa.granted_at DESC
-        LIMIT :limit OFFSET :skip
-    """)
-    
-    # Получаем данные
-    result = db.execute(sql, {
-        'grantor_id': str(grantor_id),
-        'skip': skip,
-        'limit': limit
-    }).fetchall()
-    
-    # Получаем общее количество
-    count_sql = text("""
-        SELECT COUNT(*) 
-        FROM page_access_control as pa
-        WHERE pa.granted_by = :grantor_id AND pa.is_active = TRUE
-    """)
-    
-    total = db.execute(count_sql, {'grantor_id': str(grantor_id)}).scalar() or 0
-    
-    # Преобразуем в список словарей
-    items = [dict(row._mapping) for row in result]
-    return items, total
+# Поля элемента списка доступов: read model -> ключи build_*_item_from_raw
+LIST_COLUMNS = (
+    PageAccessDashboard.id_access,
+    PageAccessDashboard.user_id,
+    PageAccessDashboard.granted_by,
+    PageAccessDashboard.agent_id.label('id_agent'),
+    PageAccessDashboard.page_id.label('id_page'),
+    PageAccessDashboard.agent_full_name,
+    PageAccessDashboard.is_human,
+    PageAccessDashboard.is_public,
+    PageAccessDashboard.is_draft,
+    PageAccessDashboard.can_view,
+    PageAccessDashboard.can_edit,
+    PageAccessDashboard.granted_at,
+    PageAccessDashboard.expires_at,
+    literal(True).label('is_active'),
+)
+LIST_SORT_KEY = (PageAccessDashboard.granted_at, PageAccessDashboard.id_access)
 
 
-def check_user_page_access(
-    db: Session, 
-    page_id: uuid.UUID, 
-    user_id: uuid.UUID
-) -> Dict[str, Any]:
+def _access_list(
+    db: Session,
+    owner_column,
+    owner_id: uuid.UUID,
+    extra_columns: tuple,
+    cursor: Optional[str],
+    limit: int,
+    with_total: bool
+) -> Tuple[List[dict], Optional[str], Optional[int]]:
     """
-    Проверить, есть ли у пользователя доступ к странице.
-    Используем raw SQL для избежания проблем с relationships.
+    Страница списка доступов из read model page_access_dashboard
+    (keyset-пагинация по (granted_at, id_access), без JOIN).
     """
-    try:
-        # 1. Проверяем существование страницы
-        page_sql = text("""
-            SELECT id_page, user_id, is_public, is_draft
-            FROM pages 
-            WHERE id_page = :page_id
-        """)
-        
-        page_result = db.execute(page_sql, {'page_id': str(page_id)}).fetchone()
-        
-        if not page_result:
-            return {
-                'has_access': False,
-                'can_view': False,
-                'can_edit': False,
-                'reason': 'Page not found',
-                'is_owner': False
-            }
-        
-        page_data = dict(page_result._mapping)
-        
-        # 2. Проверяем, является ли пользователь владельцем страницы
-        is_owner = str(page_data['user_id']) == str(user_id)
-        
-        if is_owner:
-            return {
-                'has_access': True,
-                'can_view': True,
-                'can_edit': True,
-                'reason': 'Page owner',
-                'is_owner': True,
-                'page_id': page_id
-            }
-        
-        # 3. Проверяем, является ли страница публичной
-        if page_data['is_public'] and not page_data['is_draft']:
-            return {
-                'has_access': True,
-                'can_view': True,
-                'can_edit': False,
-                'reason': 'Public page',
-                'is_owner': False,
-                'page_id': page_id
-            }
-        
-        # 4. Проверяем доступ в access_control
-        access_sql = text("""
-            SELECT can_view, can_edit, expires_at
-            FROM page_access_control 
-            WHERE page_id = :page_id 
-                AND user_id = :user_id 
-                AND is_active = TRUE
-        """)
-        
-        access_result = db.execute(access_sql, {
-            'page_id': str(page_id),
-            'user_id': str(user_id)
-        }).fetchone()
-        
-        if access_result:
-            access_data = dict(access_result._mapping)
-            
-            # Проверяем срок действия доступа
-            if access_data['expires_at'] and access_data['expires_at'] < datetime.now(timezone.utc):
-                return {
-                    'has_access': False,
-                    'can_view': False,
-                    'can_edit': False,
-                    'reason': 'Access expired',
-                    'is_owner': False,
-                    'page_id': page_id
-                }
-            
-            return {
-                'has_access': True,
-                'can_view': access_data['can_view'],
-                'can_edit': access_data['can_edit'],
-                'reason': 'Has access',
-                'is_owner': False,
-                'page_id': page_id,
-                'access_expires': access_data['expires_at']
-            }
-        
+    condition = after_cursor(LIST_SORT_KEY, cursor)
+    query = select(*LIST_COLUMNS, *extra_columns).where(owner_column == owner_id)
+    if condition is not None:
+        query = query.where(condition)
+    rows = db.execute(
+        query.order_by(*(desc(column) for column in LIST_SORT_KEY)).limit(limit + 1)
+    ).fetchall()
+    items = [dict(row._mapping) for row in rows]
+    items, next_cursor = split_page(items, limit, lambda item: (item['granted_at'], item['id_access']))
+
+    # Общее количество - только по запросу и оценкой планировщика
+    total = None
+    if with_total:
+        total = estimated_count(db, select(PageAccessDashboard.id_access).where(owner_column == owner_id))
+
+    return items, next_cursor, total
+
+
+def list_access_by_user(
+    db: Session,
+    user_id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    with_total: bool = False
+) -> Tuple[List[dict], Optional[str], Optional[int]]:
+    """Получить страницу записей доступа для пользователя (страницы, к которым ему дали доступ)."""
+    return _access_list(db, PageAccessDashboard.user_id, user_id, (
+        PageAccessDashboard.grantor_full_name,
+        PageAccessDashboard.grantor_username,
+    ), cursor, limit, with_total)
+
+
+def list_access_by_grantor(
+    db: Session,
+    grantor_id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    with_total: bool = False
+) -> Tuple[List[dict], Optional[str], Optional[int]]:
+    """Получить страницу записей доступа, которые предоставил определённый пользователь."""
+    return _access_list(db, PageAccessDashboard.granted_by, grantor_id, (
+        PageAccessDashboard.recipient_full_name,
+        PageAccessDashboard.recipient_username,
+    ), cursor, limit, with_total)
+
+
+# Права на страницу одним запросом: владелец, публичность и активный доступ
+# пользователя с признаком истечения срока
+RESOLVE_ACCESS_SQL = """
+    SELECT
+        p.id_page,
+        p.user_id AS owner_id,
+        p.is_public,
+        p.is_draft,
+        pac.id_access,
+        pac.can_view AS access_can_view,
+        pac.can_edit AS access_can_edit,
+        pac.expires_at AS access_expires_at,
+        pac.expires_at IS NOT NULL AND pac.expires_at < CURRENT_TIMESTAMP AS access_expired
+    FROM pages p
+    LEFT JOIN page_access_control pac
+        ON pac.page_id = p.id_page AND pac.user_id = :user_id AND pac.is_active = TRUE
+"""
+# Служебные колонки RESOLVE_ACCESS_SQL, которых нет в pages/agents
+ACCESS_COLUMNS = (
+    'owner_id', 'id_access', 'access_can_view', 'access_can_edit', 'access_expires_at', 'access_expired',
+)
+# Права (колонки RESOLVE_ACCESS_SQL) вместе с данными страницы, агента и грантора.
+# Колонки перечислены явно: у pages и agents совпадают user_id, created_at, updated_at
+PAGE_WITH_ACCESS_SQL = """
+    SELECT
+        p.id_page,
+        p.user_id AS owner_id,
+        p.is_public,
+        p.is_draft,
+        pac.id_access,
+        pac.can_view AS access_can_view,
+        pac.can_edit AS access_can_edit,
+        pac.expires_at AS access_expires_at,
+        pac.expires_at IS NOT NULL AND pac.expires_at < CURRENT_TIMESTAMP AS access_expired,
+        p.user_id,
+        p.epitaph,
+        p.biography,
+        p.created_at,
+        p.updated_at,
+        a.id_agent AS agent_id,
+        a.full_name,
+        a.gender,
+        a.birth_date,
+        a.death_date,
+        a.place_of_birth,
+        a.place_of_death,
+        a.avatar_url,
+        a.is_human,
+        a.is_user,
+        u_grantor.full_name AS grantor_name,
+        u_grantor.username AS grantor_username
+    FROM pages p
+    JOIN agents a ON p.agent_id = a.id_agent
+    LEFT JOIN page_access_control pac
+        ON pac.page_id = p.id_page AND pac.user_id = :user_id AND pac.is_active = TRUE
+    LEFT JOIN users u_grantor ON pac.granted_by = u_grantor.id_user
+    WHERE p.id_page = :page_id
+"""
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """expires_at из raw SQL: datetime (PostgreSQL) или строка (SQLite); без зоны - UTC"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _access_decision(row: Optional[Dict[str, Any]], page_id: uuid.UUID, user_id: uuid.UUID) -> Dict[str, Any]:
+    """Строка RESOLVE_ACCESS_SQL -> результат проверки доступа."""
+    if row is None:
+        return {
+            'has_access': False,
+            'can_view': False,
+            'can_edit': False,
+            'reason': 'Page not found',
+            'is_owner': False
+        }
+
+    if normalize_uuid(row['owner_id']) == user_id:
+        return {
+            'has_access': True,
+            'can_view': True,
+            'can_edit': True,
+            'reason': 'Page owner',
+            'is_owner': True,
+            'page_id': page_id
+        }
+
+    if row['is_public'] and not row['is_draft']:
+        return {
+            'has_access': True,
+            'can_view': True,
+            'can_edit': False,
+            'reason': 'Public page',
+            'is_owner': False,
+            'page_id': page_id
+        }
+
+    if row['id_access'] is None:
         return {
             'has_access': False,
             'can_view': False,
@@ -249,6 +239,130 @@ def check_user_page_access(
             'is_owner': False,
             'page_id': page_id
         }
+
+    if row['access_expired']:
+        return {
+            'has_access': False,
+            'can_view': False,
+            'can_edit': False,
+            'reason': 'Access expired',
+            'is_owner': False,
+            'page_id': page_id
+        }
+
+    return {
+        'has_access': True,
+        'can_view': bool(row['access_can_view']),
+        'can_edit': bool(row['access_can_edit']),
+        'reason': 'Has access',
+        'is_owner': False,
+        'page_id': page_id,
+        'access_expires': _as_datetime(row['access_expires_at'])
+    }
+
+
+def _remember_access(decision: Dict[str, Any], page_id: uuid.UUID, user_id: uuid.UUID, generation: int) -> None:
+    """Кладёт результат в кэш; несуществующие страницы не кэшируются."""
+    if decision['reason'] == 'Page not found':
+        return
+    permission_cache.set(
+        user_id, page_id, decision,
+        access_expires=decision.get('access_expires'),
+        generation=generation,
+    )
+
+
+def resolve_page_access(
+    db: Session,
+    page_id: uuid.UUID,
+    user_id: uuid.UUID
+) -> Dict[str, Any]:
+    """Проверить доступ пользователя к странице одним запросом, без кэша."""
+    page_id, user_id = normalize_uuid(page_id), normalize_uuid(user_id)
+    row = db.execute(text(RESOLVE_ACCESS_SQL + "WHERE p.id_page = :page_id"), {
+        'page_id': str(page_id),
+        'user_id': str(user_id)
+    }).fetchone()
+    return _access_decision(dict(row._mapping) if row else None, page_id, user_id)
+
+
+def resolve_pages_access(
+    db: Session,
+    page_ids: Sequence[uuid.UUID],
+    user_id: uuid.UUID
+) -> Dict[uuid.UUID, Dict[str, Any]]:
+    """
+    Проверить доступ пользователя к нескольким страницам одним запросом,
+    без кэша: на PostgreSQL - id_page = ANY(:page_ids), на остальных СУБД - IN.
+    """
+    user_id = normalize_uuid(user_id)
+    page_ids = list(dict.fromkeys(normalize_uuid(page_id) for page_id in page_ids))
+    if not page_ids:
+        return {}
+
+    if db.get_bind().dialect.name == "postgresql":
+        sql = text(RESOLVE_ACCESS_SQL + "WHERE p.id_page = ANY(CAST(:page_ids AS uuid[]))")
+    else:
+        sql = text(RESOLVE_ACCESS_SQL + "WHERE p.id_page IN :page_ids").bindparams(
+            bindparam('page_ids', expanding=True)
+        )
+    rows = db.execute(sql, {
+        'page_ids': [str(page_id) for page_id in page_ids],
+        'user_id': str(user_id)
+    }).fetchall()
+
+    found = {normalize_uuid(row.id_page): dict(row._mapping) for row in rows}
+    return {page_id: _access_decision(found.get(page_id), page_id, user_id) for page_id in page_ids}
+
+
+def check_user_pages_access(
+    db: Session,
+    page_ids: Sequence[uuid.UUID],
+    user_id: uuid.UUID
+) -> Dict[uuid.UUID, Dict[str, Any]]:
+    """
+    Проверить доступ пользователя к нескольким страницам (в порядке page_ids).
+    Известное берётся из кэша прав, остальное - одним resolve_pages_access.
+    """
+    user_id = normalize_uuid(user_id)
+    page_ids = list(dict.fromkeys(normalize_uuid(page_id) for page_id in page_ids))
+
+    decisions = {}
+    for page_id in page_ids:
+        cached = permission_cache.get(user_id, page_id)
+        if cached is not None:
+            decisions[page_id] = cached
+
+    missing = [page_id for page_id in page_ids if page_id not in decisions]
+    if missing:
+        generation = permission_cache.generation
+        for page_id, decision in resolve_pages_access(db, missing, user_id).items():
+            _remember_access(decision, page_id, user_id, generation)
+            decisions[page_id] = decision
+
+    return {page_id: decisions[page_id] for page_id in page_ids}
+
+
+def check_user_page_access(
+    db: Session, 
+    page_id: uuid.UUID, 
+    user_id: uuid.UUID
+) -> Dict[str, Any]:
+    """
+    Проверить, есть ли у пользователя доступ к странице.
+    Результат берётся из кэша прав (permissions.py), при промахе -
+    resolve_page_access и запись в кэш.
+    """
+    try:
+        page_id, user_id = normalize_uuid(page_id), normalize_uuid(user_id)
+        cached = permission_cache.get(user_id, page_id)
+        if cached is not None:
+            return cached
+
+        generation = permission_cache.generation
+        decision = resolve_page_access(db, page_id, user_id)
+        _remember_access(decision, page_id, user_id, generation)
+        return decision
         
     except Exception as e:
         print(f"Error in check_user_page_access: {e}")
@@ -270,36 +384,32 @@ def get_page_with_access_check(
 ) -> Optional[Dict[str, Any]]:
     """
     Получить полную информацию о странице с проверкой доступа пользователя.
-    Используем raw SQL для избежания проблем с relationships.
+    Права и данные страницы читаются одним запросом; отказ из кэша прав
+    обходится без запросов.
     """
     try:
-        # 1. Проверяем доступ
-        access_check = check_user_page_access(db, page_id, user_id)
-        
-        if not access_check['has_access']:
+        page_id, user_id = normalize_uuid(page_id), normalize_uuid(user_id)
+        cached = permission_cache.get(user_id, page_id)
+        if cached is not None and not cached['has_access']:
             return None
-        
-        # 2. Получаем информацию о странице
-        page_sql = text("""
-            SELECT p.*, a.*, u_grantor.full_name as grantor_name, u_grantor.username as grantor_username
-            FROM pages p
-            JOIN agents a ON p.agent_id = a.id_agent
-            LEFT JOIN page_access_control pac ON p.id_page = pac.page_id AND pac.user_id = :user_id AND pac.is_active = TRUE
-            LEFT JOIN users u_grantor ON pac.granted_by = u_grantor.id_user
-            WHERE p.id_page = :page_id
-        """)
-        
-        page_result = db.execute(page_sql, {
+
+        generation = permission_cache.generation
+        page_result = db.execute(text(PAGE_WITH_ACCESS_SQL), {
             'page_id': str(page_id),
             'user_id': str(user_id)
         }).fetchone()
         
-        if not page_result:
+        page_data = dict(page_result._mapping) if page_result else None
+        access_check = _access_decision(page_data, page_id, user_id)
+        _remember_access(access_check, page_id, user_id, generation)
+        
+        if not access_check['has_access']:
             return None
         
-        page_data = dict(page_result._mapping)
+        for column in ACCESS_COLUMNS:
+            page_data.pop(column, None)
         
-        # 3. Формируем результат
+        # Формируем результат
         result = {
             'has_access': True,
             'permissions': {
@@ -320,14 +430,27 @@ def get_page_with_access_check(
         return None
 
 
+def commit_access_change(db: Session, db_access: PageAccessControl) -> None:
+    """
+    Фиксирует изменение записи доступа: пересобирает её строку в read model
+    списков, ставит оповещение другим воркерам в ту же транзакцию и после
+    commit сбрасывает свой кэш прав.
+    """
+    db.flush()
+    refresh_grants(db, [db_access.id_access])
+    publish_access_changes(db, [access_change_key(db_access.page_id, db_access.user_id)])
+    db.commit()
+    permission_cache.invalidate(normalize_uuid(db_access.page_id), normalize_uuid(db_access.user_id))
+
+
 def create_access(db: Session, access_data: schemas.PageAccessCreate, grantor_id: uuid.UUID) -> PageAccessControl:
     """Создать новую запись доступа."""
     db_access = PageAccessControl(
-        **access_data.model_dump(),
+        **access_data.model_dump(exclude={'granted_by'}),
         granted_by=grantor_id
     )
     db.add(db_access)
-    db.commit()
+    commit_access_change(db, db_access)
     db.refresh(db_access)
     return db_access
 
@@ -341,7 +464,7 @@ def update_access(db: Session, access_id: uuid.UUID, update_data: schemas.PageAc
     for key, value in update_data.model_dump(exclude_unset=True).items():
         setattr(db_access, key, value)
     
-    db.commit()
+    commit_access_change(db, db_access)
     db.refresh(db_access)
     return db_access
 
@@ -353,7 +476,7 @@ def deactivate_access(db: Session, access_id: uuid.UUID) -> bool:
         return False
     
     db_access.is_active = False
-    db.commit()
+    commit_access_change(db, db_access)
     return True
 
 
@@ -364,5 +487,44 @@ def delete_access(db: Session, access_id: uuid.UUID) -> bool:
         return False
     
     db.delete(db_access)
+    commit_access_change(db, db_access)
+    return True
+
+
+def deactivate_expired_access(db: Session, batch_size: int, now: Optional[datetime] = None) -> int:
+    """
+    Деактивировать до batch_size истёкших доступов одним UPDATE и сбросить их в кэше прав.
+
+    Записи выбираются по ix_page_access_expires_active с FOR UPDATE SKIP LOCKED:
+    параллельные чистильщики (несколько воркеров) берут разные записи и не
+    ждут друг друга. Возвращает число деактивированных записей.
+    """
+    expired = (
+        select(PageAccessControl.id_access)
+        .where(
+            PageAccessControl.is_active == True,
+            PageAccessControl.expires_at.isnot(None),
+            PageAccessControl.expires_at < (now or datetime.now(timezone.utc)),
+        )
+        .order_by(PageAccessControl.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = db.execute(
+        update(PageAccessControl)
+        .where(PageAccessControl.id_access.in_(expired.scalar_subquery()))
+        .values(is_active=False)
+        .returning(PageAccessControl.id_access, PageAccessControl.page_id, PageAccessControl.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    changed = result.all()
+    if not changed:
+        db.rollback()
+        return 0
+
+    remove_grants(db, [access_id for access_id, _, _ in changed])
+    publish_access_changes(db, [access_change_key(page_id, user_id) for _, page_id, user_id in changed])
     db.commit()
-    return True
\ No newline at end of file
+    for _, page_id, user_id in changed:
+        permission_cache.invalidate(normalize_uuid(page_id), normalize_uuid(user_id))
+    return len(changed)
@@ -0,0 +1,64 @@
+"""
+Фоновое снятие истёкших доступов.
+
+Раньше истёкший доступ распознавался только при проверке
+(check_user_page_access) и оставался is_active = TRUE навсегда, раздувая
+списки доступов и их подсчёт. Чистильщик раз в ACCESS_EXPIRY_SWEEP_INTERVAL
+сек деактивирует истёкшие записи пачками по ACCESS_EXPIRY_SWEEP_BATCH
+(deactivate_expired_access), не больше ACCESS_EXPIRY_SWEEP_MAX_BATCHES
+пачек за проход, чтобы не держать соединение долго.
+"""
+import asyncio
+import logging
+from typing import Callable
+
+from database.session import SessionLocal
+from .config import config
+from .crud import deactivate_expired_access
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_expired_access(session_factory: Callable = SessionLocal,
+                         batch_size: int = config.EXPIRY_SWEEP_BATCH,
+                         max_batches: int = config.EXPIRY_SWEEP_MAX_BATCHES) -> int:
+    """Один проход: пачки до первой неполной; возвращает число деактивированных записей"""
+    total = 0
+    with session_factory() as db:
+        for _ in range(max_batches):
+            swept = deactivate_expired_access(db, batch_size)
+            total += swept
+            if swept < batch_size:
+                break
+    if total:
+        logger.info(f"Deactivated {total} expired access grants")
+    return total
+
+
+class ExpirySweeper:
+    """Периодический запуск sweep_expired_access в фоне (в пуле потоков)"""
+
+    def __init__(self, interval: float = config.EXPIRY_SWEEP_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(sweep_expired_access)
+            except Exception as e:
+                logger.error(f"Expiry sweeper error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
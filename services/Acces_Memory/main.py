@@ -5,8 +5,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from .config import config
+from database.engine import all_engines, engine
+from database.query_stats import QueryStatsMiddleware
+from shared.tracing import install_tracing
 import logging
 
+from .expiry import ExpirySweeper
+from .permissions import start_access_change_listener
 from .routers import access_router, health_router
 
 # Настройка логирования
@@ -26,9 +31,17 @@ async def lifespan(app: FastAPI):
     Контекст жизненного цикла приложения.
     """
     print("🚀 Сервис управления доступом запущен")
+    # Сброс кэша прав по изменениям из других воркеров и сервиса Memory
+    listener = start_access_change_listener(engine)
+    # Деактивация истёкших доступов
+    sweeper = ExpirySweeper()
+    sweeper.start()
     
     yield  # Приложение работает
     
+    await sweeper.stop()
+    if listener is not None:
+        listener.stop()
     print("👋 Сервис управления доступом остановлен")
 
 # Создаем FastAPI приложение
@@ -48,6 +61,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Счётчик SQL-выражений на запрос (X-DB-Statements) и журнал медленных запросов
+app.add_middleware(QueryStatsMiddleware)
+
+# Сквозная трассировка (traceparent / X-Request-ID, SQL span'ы)
+install_tracing(app, "access", *all_engines())
+
 # Подключаем роутеры
 app.include_router(access_router)
 app.include_router(health_router)
@@ -65,6 +84,7 @@ async def root():
                 "my": "GET /access/my",
                 "granted": "GET /access/granted",
                 "grant": "POST /access/grant",
+                "check_pages": "POST /access/pages/check",
                 "revoke": "DELETE /access/{access_id}",
             }
         }
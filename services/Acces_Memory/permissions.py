@@ -0,0 +1,111 @@
+"""
+Кэш результатов проверки доступа к страницам.
+
+Ключ - (user_id, page_id), значение - результат resolve_page_access.
+Запись живёт не дольше PERMISSION_CACHE_TTL и срока действия выданного
+доступа. Изменения доступа и видимости страниц сбрасывают записи явно:
+в своём процессе - сразу после commit, в остальных воркерах - по
+оповещению из database.access_events.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from database.access_events import AccessChangeListener
+from .config import config
+
+
+class PermissionCache:
+    """
+    LRU с TTL и индексом по странице для сброса всех пользователей страницы.
+    Синхронные роутеры работают в пуле потоков, поэтому операции под блокировкой.
+
+    generation растёт при каждом сбросе. Вызывающий код запоминает его до
+    чтения из БД и передаёт в set: если за время чтения права сбросили,
+    прочитанное могло устареть и в кэш не попадает.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Tuple[uuid.UUID, uuid.UUID], tuple]" = OrderedDict()
+        self._by_page: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: uuid.UUID, page_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        key = (user_id, page_id)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, decision = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return dict(decision)
+
+    def set(self, user_id: uuid.UUID, page_id: uuid.UUID, decision: Dict[str, Any],
+            access_expires: Optional[datetime] = None, generation: Optional[int] = None):
+        ttl = self.ttl
+        if access_expires is not None:
+            ttl = min(ttl, (access_expires - datetime.now(timezone.utc)).total_seconds())
+            if ttl <= 0:
+                return
+        key = (user_id, page_id)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + ttl, dict(decision))
+            self._data.move_to_end(key)
+            self._by_page.setdefault(page_id, set()).add(user_id)
+            while len(self._data) > self.max_size:
+                self._remove(next(iter(self._data)))
+
+    def invalidate(self, page_id: uuid.UUID, user_id: Optional[uuid.UUID] = None):
+        """Сбрасывает права пользователя на страницу или, без user_id, всех пользователей"""
+        with self._lock:
+            self.generation += 1
+            users = [user_id] if user_id is not None else list(self._by_page.get(page_id, ()))
+            for user in users:
+                self._remove((user, page_id))
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self._by_page.clear()
+
+    def _remove(self, key: Tuple[uuid.UUID, uuid.UUID]):
+        if self._data.pop(key, None) is None:
+            return
+        user_id, page_id = key
+        users = self._by_page.get(page_id)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._by_page[page_id]
+
+    def __len__(self):
+        return len(self._data)
+
+
+permission_cache = PermissionCache(config.PERMISSION_CACHE_SIZE, config.PERMISSION_CACHE_TTL)
+
+
+def start_access_change_listener(engine) -> Optional[AccessChangeListener]:
+    """Подписывает кэш на оповещения других воркеров и сервисов (только PostgreSQL)"""
+    if engine.dialect.name != "postgresql":
+        return None
+    listener = AccessChangeListener(engine, permission_cache.invalidate, permission_cache.clear)
+    listener.start()
+    return listener
@@ -4,10 +4,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 import uuid
+from typing import Optional
 from sqlalchemy import text
 from datetime import datetime, timezone
 
-from database.session import get_db
+from database.pagination import InvalidCursor
+from database.session import get_db, get_read_db
 from database.models.memory import PageBD
 from ..dependencies import get_current_user_id
 from .. import schemas
@@ -21,9 +23,11 @@ from ..crud import (
     deactivate_access,
     delete_access,
     check_user_page_access,
+    check_user_pages_access,
     get_page_with_access_check,
     normalize_uuid,
     can_manage_access,
+    commit_access_change,
 )
 
 router = APIRouter(prefix="/access", tags=["Access Management"])
@@ -31,14 +35,18 @@ router = APIRouter(prefix="/access", tags=["Access Management"])
 
 @router.get("/my", response_model=schemas.PageAccessListResponse)
 def get_my_access(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor)"),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    with_total: bool = Query(False, description="Вернуть оценку общего количества"),
+    db: Session = Depends(get_read_db),
     user_id: uuid.UUID = Depends(get_current_user_id)
 ):
     """Получить список страниц, к которым у текущего пользователя есть доступ."""
     # Получаем данные из базы
-    raw_items, total = list_access_by_user(db, user_id, skip=skip, limit=limit)
+    try:
+        raw_items, next_cursor, total = list_access_by_user(db, user_id, cursor=cursor, limit=limit, with_total=with_total)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     # Преобразуем в схемы
     items = []
@@ -46,27 +54,28 @@ def get_my_access(
         item = schemas.build_page_access_item_from_raw(raw_item)
         items.append(item)
     
-    # Рассчитываем номер страницы
-    page = skip // limit + 1 if limit > 0 else 1
-    
     return schemas.PageAccessListResponse(
         items=items,
         total=total,
-        page=page,
+        next_cursor=next_cursor,
         size=limit
     )
 
 
 @router.get("/granted", response_model=schemas.GrantedAccessListResponse)
 def get_granted_by_me(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor)"),
     limit: int = Query(50, ge=1, le=100),
+    with_total: bool = Query(False, description="Вернуть оценку общего количества"),
     db: Session = Depends(get_db),
     grantor_id: uuid.UUID = Depends(get_current_user_id)
 ):
     """Получить список страниц, к которым текущий пользователь предоставил доступ."""
     # Получаем данные из базы
-    raw_items, total = list_access_by_grantor(db, grantor_id, skip=skip, limit=limit)
+    try:
+        raw_items, next_cursor, total = list_access_by_grantor(db, grantor_id, cursor=cursor, limit=limit, with_total=with_total)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     # Преобразуем в схемы
     items = []
@@ -74,13 +83,10 @@ def get_granted_by_me(
         item = schemas.build_granted_access_item_from_raw(raw_item)
         items.append(item)
     
-    # Рассчитываем номер страницы
-    page = skip // limit + 1 if limit > 0 else 1
-    
     return schemas.GrantedAccessListResponse(
         items=items,
         total=total,
-        page=page,
+        next_cursor=next_cursor,
         size=limit
     )
 
@@ -118,6 +124,32 @@ def check_page_access(
     return response
 
 
+@router.post("/pages/check", response_model=schemas.PagesAccessCheckResponse)
+def check_pages_access(
+    request: schemas.PagesAccessCheckRequest,
+    db: Session = Depends(get_db),
+    user_id: uuid.UUID = Depends(get_current_user_id)
+):
+    """
+    Проверить доступ текущего пользователя к списку страниц.
+    
+    Один запрос к БД на все страницы, которых нет в кэше прав.
+    """
+    decisions = check_user_pages_access(db, request.page_ids, user_id)
+    
+    return schemas.PagesAccessCheckResponse(items=[
+        schemas.PageAccessCheckItem(
+            page_id=page_id,
+            has_access=decision['has_access'],
+            can_view=decision['can_view'],
+            can_edit=decision['can_edit'],
+            is_owner=decision['is_owner'],
+            reason=decision['reason']
+        )
+        for page_id, decision in decisions.items()
+    ])
+
+
 @router.get("/page/{page_id}/full", response_model=schemas.PageAccessDetails)
 def get_page_with_full_info(
     page_id: uuid.UUID,
@@ -341,7 +373,7 @@ def grant_access(
         existing.expires_at = request.expires_at
         existing.is_active = True
         existing.granted_by = grantor_id
-        db.commit()
+        commit_access_change(db, existing)
         db.refresh(existing)
         return schemas.PageAccessResponse.model_validate(existing)
 
@@ -2,6 +2,7 @@
 Роутер для проверки здоровья сервиса памяти
 """
 from fastapi import APIRouter
+from database.engine import engines_status
 from datetime import datetime
 
 router = APIRouter(tags=["health"])
@@ -13,4 +14,10 @@ async def health_check():
         "status": "healthy",
         "service": "AccessMemory",
         "timestamp": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/health/db")
+async def db_pool_health():
+    """Пулы соединений БД: ожидание выдачи, занятые и overflow-соединения"""
+    return engines_status()
@@ -70,16 +70,16 @@ class GrantedAccessListItem(BaseModel):
 class PageAccessListResponse(BaseModel):
     """Ответ со списком доступов к страницам"""
     items: List[PageAccessListItem]
-    total: int
-    page: int
+    total: Optional[int] = None  # оценка, только при with_total=true
+    next_cursor: Optional[str] = None
     size: int
 
 
 class GrantedAccessListResponse(BaseModel):
     """Ответ со списком предоставленных доступов"""
     items: List[GrantedAccessListItem]
-    total: int
-    page: int
+    total: Optional[int] = None  # оценка, только при with_total=true
+    next_cursor: Optional[str] = None
     size: int
 
 
@@ -292,6 +292,30 @@ class PageAccessCheckResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# Не больше одной страницы списка за вызов
+MAX_CHECK_PAGES = 500
+
+
+class PagesAccessCheckRequest(BaseModel):
+    """Запрос на проверку доступа к нескольким страницам"""
+    page_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=MAX_CHECK_PAGES)
+
+
+class PageAccessCheckItem(BaseModel):
+    """Права текущего пользователя на одну страницу"""
+    page_id: uuid.UUID
+    has_access: bool
+    can_view: bool = False
+    can_edit: bool = False
+    is_owner: bool = False
+    reason: Optional[str] = None
+
+
+class PagesAccessCheckResponse(BaseModel):
+    """Ответ на пакетную проверку доступа: по элементу на страницу, в порядке запроса"""
+    items: List[PageAccessCheckItem]
+
+
 # Добавим в конец schemas.py
 
 def create_page_access_details_from_models(
@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from database import access_dashboard
+from database.base import Base
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.models.auth import User
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries, track_queries
+from services.Acces_Memory import crud, schemas
+from services.Acces_Memory.permissions import permission_cache
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def test_grant_changes_are_reflected_in_read_model_and_listed_without_joins():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, AgentBD.__table__, PageBD.__table__, PageAccessControl.__table__,
+        PageAccessDashboard.__table__,
+    ])
+    instrument_queries(engine)
+    owner, reader = uuid.uuid4(), uuid.uuid4()
+    agent_id = uuid.uuid4()
+    page_ids = [uuid.uuid4() for _ in range(3)]
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id_user": owner, "email": "owner@example.com", "username": "owner", "full_name": "Владелец",
+             "password_hash": "-", "role_id": uuid.uuid4()},
+            {"id_user": reader, "email": "reader@example.com", "username": "reader", "full_name": "Читатель",
+             "password_hash": "-", "role_id": uuid.uuid4()},
+        ])
+        conn.execute(insert(AgentBD), [{"id_agent": agent_id, "full_name": "Агент", "gender": "M", "user_id": owner}])
+        conn.execute(insert(PageBD), [{"id_page": page_id, "agent_id": agent_id, "user_id": owner}
+                                      for page_id in page_ids])
+
+    permission_cache.clear()
+    try:
+        with Session(engine, expire_on_commit=False) as db:
+            grants = [
+                crud.create_access(db, schemas.PageAccessCreate(page_id=page_id, user_id=reader, can_view=True), owner)
+                for page_id in page_ids
+            ]
+            crud.update_access(db, grants[0].id_access, schemas.PageAccessUpdate(can_edit=True))
+            crud.deactivate_access(db, grants[1].id_access)
+            # одинаковый granted_at у всех доступов: порядок внутри решает id_access
+            db.execute(update(PageAccessDashboard).values(granted_at=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+
+            with track_queries() as stats:
+                first, cursor, _ = crud.list_access_by_user(db, reader, limit=1)
+                rest, last_cursor, _ = crud.list_access_by_user(db, reader, cursor=cursor, limit=1)
+            assert stats.statements == 2
+            assert last_cursor is None
+            items = {item["id_access"]: item for item in first + rest}
+            assert set(items) == {grants[0].id_access, grants[2].id_access}
+            assert items[grants[0].id_access]["can_edit"] is True
+            assert items[grants[2].id_access]["agent_full_name"] == "Агент"
+            assert items[grants[2].id_access]["grantor_username"] == "owner"
+
+            granted, _, _ = crud.list_access_by_grantor(db, owner)
+            assert {item["recipient_full_name"] for item in granted} == {"Читатель"}
+            assert len(granted) == 2
+    finally:
+        permission_cache.clear()
+    engine.dispose()
+
+
+def test_profile_rename_is_reflected_for_recipient_and_grantor():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, AgentBD.__table__, PageBD.__table__, PageAccessControl.__table__,
+        PageAccessDashboard.__table__,
+    ])
+    owner, reader = uuid.uuid4(), uuid.uuid4()
+    agent_id, page_id = uuid.uuid4(), uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id_user": owner, "email": "owner@example.com", "username": "owner", "full_name": "Владелец",
+             "password_hash": "-", "role_id": uuid.uuid4()},
+            {"id_user": reader, "email": "reader@example.com", "username": "reader", "full_name": "Читатель",
+             "password_hash": "-", "role_id": uuid.uuid4()},
+        ])
+        conn.execute(insert(AgentBD), [{"id_agent": agent_id, "full_name": "Агент", "gender": "M", "user_id": owner}])
+        conn.execute(insert(PageBD), [{"id_page": page_id, "agent_id": agent_id, "user_id": owner}])
+
+    permission_cache.clear()
+    try:
+        with Session(engine, expire_on_commit=False) as db:
+            crud.create_access(db, schemas.PageAccessCreate(page_id=page_id, user_id=reader, can_view=True), owner)
+            access_dashboard.update_user(db, owner, username="keeper")
+            access_dashboard.update_user(db, reader, full_name="Новый читатель")
+            db.commit()
+
+            received, _, _ = crud.list_access_by_user(db, reader)
+            granted, _, _ = crud.list_access_by_grantor(db, owner)
+            assert received[0]["grantor_username"] == "keeper"
+            assert received[0]["grantor_full_name"] == "Владелец"
+            assert granted[0]["recipient_full_name"] == "Новый читатель"
+            assert granted[0]["recipient_username"] == "reader"
+    finally:
+        permission_cache.clear()
+    engine.dispose()
@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from database.base import Base
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.models.auth import User
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries, track_queries
+from services.Acces_Memory.expiry import sweep_expired_access
+from services.Acces_Memory.permissions import permission_cache
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def test_sweeper_deactivates_expired_grants_in_batches_and_drops_them_from_cache():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, AgentBD.__table__, PageBD.__table__, PageAccessControl.__table__,
+        PageAccessDashboard.__table__,
+    ])
+    instrument_queries(engine)
+    sessions = sessionmaker(engine, expire_on_commit=False)
+    now = datetime.now(timezone.utc)
+    page_id, reader = uuid.uuid4(), uuid.uuid4()
+
+    expired = [{"id_access": uuid.uuid4(), "page_id": page_id, "user_id": uuid.uuid4(),
+                "is_active": True, "expires_at": now - timedelta(hours=i + 1)} for i in range(5)]
+    expired[0]["user_id"] = reader
+    kept = [
+        {"id_access": uuid.uuid4(), "page_id": page_id, "user_id": uuid.uuid4(), "is_active": True,
+         "expires_at": now + timedelta(days=1)},
+        {"id_access": uuid.uuid4(), "page_id": page_id, "user_id": uuid.uuid4(), "is_active": True,
+         "expires_at": None},
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(PageAccessControl), expired + kept)
+
+    permission_cache.clear()
+    permission_cache.set(reader, page_id, {"has_access": True, "reason": "Has access"})
+    try:
+        with track_queries() as stats:
+            swept = sweep_expired_access(sessions, batch_size=2, max_batches=10)
+        # пачки 2 + 2 + 1 (UPDATE и удаление из read model): на неполной пачке проход заканчивается
+        assert (swept, stats.statements) == (5, 6)
+        assert permission_cache.get(reader, page_id) is None
+    finally:
+        permission_cache.clear()
+
+    with sessions() as db:
+        active = set(db.scalars(select(PageAccessControl.id_access).where(PageAccessControl.is_active == True)))
+        assert active == {row["id_access"] for row in kept}
+        assert sweep_expired_access(sessions, batch_size=2) == 0
+    engine.dispose()
@@ -0,0 +1,200 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from database.access_events import _payloads, access_change_key, parse_access_changes
+from database import get_db
+from database.base import Base
+from database.models.access import PageAccessControl, PageAccessDashboard
+from database.models.auth import User
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries, track_queries
+from services.Acces_Memory import crud
+from services.Acces_Memory.config import config
+from services.Acces_Memory.main import app
+from services.Acces_Memory.permissions import PermissionCache, permission_cache
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@pytest.fixture
+def db():
+    # синхронные роутеры выполняются в пуле потоков: одно соединение на все потоки
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, AgentBD.__table__, PageBD.__table__, PageAccessControl.__table__,
+        PageAccessDashboard.__table__,
+    ])
+    instrument_queries(engine)
+    permission_cache.clear()
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+    permission_cache.clear()
+    engine.dispose()
+
+
+def add_page(db, owner, is_public=False, is_draft=False):
+    # raw SQL сервиса передаёт UUID строкой с дефисами - так и храним
+    page_id = uuid.uuid4()
+    db.execute(
+        text("INSERT INTO pages (id_page, agent_id, user_id, is_public, is_draft) VALUES (:id, :agent, :user, :public, :draft)"),
+        {"id": str(page_id), "agent": str(uuid.uuid4()), "user": str(owner), "public": is_public, "draft": is_draft},
+    )
+    return page_id
+
+
+def add_grant(db, page_id, user_id, expires_at=None):
+    db.execute(
+        text("INSERT INTO page_access_control (id_access, page_id, user_id, can_view, can_edit, is_active, expires_at) "
+             "VALUES (:id, :page, :user, 1, 0, 1, :expires)"),
+        {"id": str(uuid.uuid4()), "page": str(page_id), "user": str(user_id),
+         "expires": expires_at.strftime("%Y-%m-%d %H:%M:%S") if expires_at else None},
+    )
+
+
+def test_resolver_decides_every_case_in_one_statement(db):
+    owner, reader, stranger = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    private = add_page(db, owner)
+    public = add_page(db, owner, is_public=True)
+    expired = add_page(db, owner)
+    add_grant(db, private, reader, expires_at=datetime.now(timezone.utc) + timedelta(days=1))
+    add_grant(db, expired, reader, expires_at=datetime.now(timezone.utc) - timedelta(days=1))
+
+    cases = [
+        (private, owner, "Page owner"),
+        (public, stranger, "Public page"),
+        (private, reader, "Has access"),
+        (expired, reader, "Access expired"),
+        (private, stranger, "No access"),
+        (uuid.uuid4(), owner, "Page not found"),
+    ]
+    for page_id, user_id, reason in cases:
+        with track_queries() as stats:
+            decision = crud.resolve_page_access(db, page_id, user_id)
+        assert (decision["reason"], stats.statements) == (reason, 1)
+
+    assert crud.resolve_page_access(db, private, reader)["can_edit"] is False
+
+
+def test_check_is_served_from_cache_until_access_changes(db):
+    owner, reader = uuid.uuid4(), uuid.uuid4()
+    page_id = add_page(db, owner)
+    add_grant(db, page_id, reader)
+
+    with track_queries() as stats:
+        assert crud.check_user_page_access(db, page_id, reader)["has_access"]
+        assert crud.check_user_page_access(db, str(page_id), str(reader))["has_access"]
+    assert stats.statements == 1
+
+    # отзыв доступа сбрасывает запись кэша после commit
+    access = PageAccessControl(page_id=page_id, user_id=reader, granted_by=owner)
+    db.add(access)
+    db.commit()
+    assert permission_cache.get(reader, page_id) is not None
+    crud.deactivate_access(db, access.id_access)
+    assert permission_cache.get(reader, page_id) is None
+
+
+def test_batch_check_resolves_pages_in_one_statement_then_from_cache(db):
+    owner, reader = uuid.uuid4(), uuid.uuid4()
+    own = add_page(db, reader)
+    public = add_page(db, owner, is_public=True)
+    granted = add_page(db, owner)
+    private = add_page(db, owner)
+    add_grant(db, granted, reader)
+    missing = uuid.uuid4()
+    page_ids = [private, own, granted, missing, public, own]
+
+    app.dependency_overrides[get_db] = lambda: db
+    token = jwt.encode({"sub": str(reader)}, config.SECRET_KEY, algorithm=config.ALGORITHM)
+
+    async def check():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://access") as client:
+            return await client.post(
+                "/access/pages/check",
+                headers={"Authorization": f"Bearer {token}"},
+                json={"page_ids": [str(page_id) for page_id in page_ids]},
+            )
+
+    try:
+        with track_queries() as first:
+            response = asyncio.run(check())
+        with track_queries() as second:
+            asyncio.run(check())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [(item["page_id"], item["reason"]) for item in response.json()["items"]] == [
+        (str(private), "No access"),
+        (str(own), "Page owner"),
+        (str(granted), "Has access"),
+        (str(missing), "Page not found"),
+        (str(public), "Public page"),
+    ]
+    # второй вызов: из БД читается только несуществующая страница
+    assert (first.statements, second.statements) == (1, 1)
+
+
+def test_page_with_access_check_returns_named_page_and_agent_columns(db):
+    owner, reader, stranger = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    page_id = add_page(db, owner)
+    agent_id = db.execute(text("SELECT agent_id FROM pages WHERE id_page = :id"), {"id": str(page_id)}).scalar()
+    db.execute(
+        text("INSERT INTO agents (id_agent, full_name, gender, user_id) VALUES (:id, 'Агент', 'F', :user)"),
+        {"id": agent_id, "user": str(owner)},
+    )
+    add_grant(db, page_id, reader)
+
+    with track_queries() as stats:
+        result = crud.get_page_with_access_check(db, page_id, reader)
+    assert stats.statements == 1
+    assert result["permissions"] == {"can_view": True, "can_edit": False}
+    page_data = result["page_data"]
+    assert (page_data["id_page"], page_data["agent_id"], page_data["user_id"]) == (str(page_id), agent_id, str(owner))
+    assert (page_data["full_name"], page_data["gender"]) == ("Агент", "F")
+    assert not set(crud.ACCESS_COLUMNS) & set(page_data)
+
+    assert crud.get_page_with_access_check(db, page_id, stranger) is None
+
+
+def test_cache_drops_page_entries_and_stale_stores():
+    cache = PermissionCache(max_size=2, ttl=60)
+    page_id, first, second = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    cache.set(first, page_id, {"has_access": True})
+    cache.set(second, page_id, {"has_access": True})
+
+    cache.invalidate(page_id)
+    assert cache.get(first, page_id) is None and cache.get(second, page_id) is None
+
+    # права сбросили, пока шло чтение из БД: прочитанное в кэш не попадает
+    generation = cache.generation
+    cache.invalidate(page_id, first)
+    cache.set(first, page_id, {"has_access": True}, generation=generation)
+    assert cache.get(first, page_id) is None
+
+    # запись не переживает срок действия доступа
+    cache.set(first, page_id, {"has_access": True}, access_expires=datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert cache.get(first, page_id) is None
+
+
+def test_access_change_payloads_round_trip():
+    keys = [access_change_key(uuid.uuid4(), uuid.uuid4()) for _ in range(300)] + [access_change_key(uuid.uuid4())]
+    payloads = _payloads(keys)
+
+    assert len(payloads) > 1 and all(len(payload) <= 7900 for payload in payloads)
+    parsed = [change for payload in payloads for change in parse_access_changes(payload)]
+    assert [access_change_key(*change) for change in parsed] == keys
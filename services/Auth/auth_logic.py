@@ -5,14 +5,17 @@ import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from database.models.auth import User, RefreshToken
 from .config import config
 from .utils import get_password_hash, verify_password
 
 
-from .crud import get_user_by_email, get_user_by_username
+from .crud import get_user_by_email, get_user_by_email_async, get_user_by_username, get_user_by_username_async
 from argon2 import PasswordHasher
 
 ph = PasswordHasher()
@@ -110,6 +113,30 @@ def authenticate_user(db: Session, username_or_email: str, password: str):
     
     return user
 
+def _password_matches(password_hash: str, password: str) -> bool:
+    try:
+        return ph.verify(password_hash, password)
+    except Exception:
+        return False
+
+async def authenticate_user_async(db: AsyncSession, username_or_email: str, password: str):
+    """
+    Аутентификация для async-эндпоинтов: запрос через AsyncSession,
+    проверка argon2 (десятки мс CPU) - в пуле потоков, а не в event loop
+    """
+    if "@" in username_or_email:
+        user = await get_user_by_email_async(db, username_or_email)
+    else:
+        user = await get_user_by_username_async(db, username_or_email)
+
+    if not user:
+        return None
+
+    if not await run_in_threadpool(_password_matches, user.password_hash, password):
+        return None
+
+    return user
+
 # ===== REFRESH TOKENS =====
 
 def save_refresh_token(
@@ -152,6 +179,49 @@ def verify_refresh_token(
     return verify_password(refresh_token, token.token_hash)
 
 
+async def save_refresh_token_async(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    refresh_token: str,
+    device_info: str | None,
+    ip_address: str | None
+):
+    token_hash = await run_in_threadpool(get_password_hash, refresh_token)
+
+    await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+
+    db.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=token_hash,
+            device_info=device_info,
+            ip_address=ip_address,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+    )
+    await db.commit()
+
+async def verify_refresh_token_async(
+    db: AsyncSession,
+    refresh_token: str,
+    user_id: uuid.UUID,
+    device_info: str | None
+) -> bool:
+    # Ищем токен по user_id и сроку действия, игнорируя device_info
+    result = await db.execute(
+        select(RefreshToken).filter(
+            RefreshToken.user_id == user_id,
+            RefreshToken.expires_at > datetime.now(timezone.utc)
+        )
+    )
+    token = result.scalars().first()
+
+    if not token:
+        return False
+
+    return await run_in_threadpool(verify_password, refresh_token, token.token_hash)
+
+
 def create_verification_token(user_id: uuid.UUID, expires_minutes: int = 60) -> str:
     payload = {
         "sub": str(user_id),
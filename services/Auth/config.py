@@ -13,6 +13,9 @@ from config import config as base_config
 
 load_dotenv()
 
+# Пул соединений БД этого сервиса: AUTH_DB_POOL_SIZE и др. (database/pool.py)
+os.environ.setdefault("DB_SERVICE", "auth")
+
 class AuthConfig:
     """Конфигурация сервиса авторизации"""
     
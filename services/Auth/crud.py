@@ -1,6 +1,8 @@
 """
 CRUD операции для работы с базой данных.
 """
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
@@ -23,6 +25,23 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
     """Получает пользователя по username"""
     return db.query(User).filter(User.username == username).first()
 
+# ===== ASYNC (AsyncSession из get_async_db для async-эндпоинтов) =====
+
+async def get_user_by_id_async(db: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
+    """Получает пользователя по ID"""
+    result = await db.execute(select(User).filter(User.id_user == user_id))
+    return result.scalars().first()
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    """Получает пользователя по email"""
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
+
+async def get_user_by_username_async(db: AsyncSession, username: str) -> Optional[User]:
+    """Получает пользователя по username"""
+    result = await db.execute(select(User).filter(User.username == username))
+    return result.scalars().first()
+
 def create_user(db: Session, user_data: schemas.UserCreate) -> Optional[User]:
     """Создает нового пользователя"""
     try:
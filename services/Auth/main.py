@@ -4,6 +4,9 @@ from datetime import datetime
 import logging
 
 from .config import config
+from database.engine import all_engines
+from database.query_stats import QueryStatsMiddleware
+from shared.tracing import install_tracing
 from .routers import auth, users, health
 
 # Настройка логирования
@@ -30,6 +33,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Счётчик SQL-выражений на запрос (X-DB-Statements) и журнал медленных запросов
+app.add_middleware(QueryStatsMiddleware)
+
+# Сквозная трассировка (traceparent / X-Request-ID, SQL span'ы)
+install_tracing(app, "auth", *all_engines())
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(health.router)
@@ -3,12 +3,14 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 import uuid
 
-from database.session import get_db
+from database.session import get_async_db, get_db
 
 from database.models.auth import User, RefreshToken, UserRole
 from services.Auth import schemas
@@ -18,27 +20,29 @@ from services.Auth.auth_logic import (
     create_verification_token,
     verify_password_reset_token,
     verify_verification_token,
-    authenticate_user,
+    authenticate_user_async,
     create_access_token,
     create_refresh_token,
-    save_refresh_token,
-    verify_refresh_token,
+    save_refresh_token_async,
+    verify_refresh_token_async,
     verify_token,
     get_password_hash,
     revoke_token,
 )
-from services.Auth.crud import get_user_by_id, create_user, update_user_password, get_user_by_email
+from services.Auth.crud import get_user_by_id, get_user_by_id_async, update_user_password, get_user_by_email
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: schemas.UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def register(user_data: schemas.UserCreate, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
 
     try:
         print(f"📝 Регистрация пользователя: {user_data.email}")
 
         # Получаем роль по умолчанию
-        default_role = db.query(UserRole).filter(UserRole.role_name == "user").first()
+        result = await db.execute(select(UserRole).filter(UserRole.role_name == "user"))
+        default_role = result.scalars().first()
         if not default_role:
             raise HTTPException(status_code=500, detail="Default role not found")
 
@@ -47,15 +51,15 @@ async def register(user_data: schemas.UserCreate, background_tasks: BackgroundTa
             email=user_data.email,
             username=user_data.username,
             full_name=user_data.full_name,
-            password_hash=get_password_hash(user_data.password),
+            password_hash=await run_in_threadpool(get_password_hash, user_data.password),
             is_active=True,
             is_verified=False,
             role_id=default_role.id_role
         )
         print("@@#@4")
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
 
         # Создаем JWT для верификации
         # verification_token = create_verification_token(db_user.id_user)
@@ -64,7 +68,7 @@ async def register(user_data: schemas.UserCreate, background_tasks: BackgroundTa
         return schemas.UserResponse.model_validate(db_user)
 
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         error = str(e.orig).lower() if e.orig else ""
         if "email" in error:
             detail = "Email already registered"
@@ -75,7 +79,7 @@ async def register(user_data: schemas.UserCreate, background_tasks: BackgroundTa
         raise HTTPException(status_code=400, detail=detail)
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"❌ Unexpected error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
@@ -84,10 +88,10 @@ async def register(user_data: schemas.UserCreate, background_tasks: BackgroundTa
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     request: Request = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Вход пользователя"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -97,7 +101,7 @@ async def login(
 
     # Обновляем время входа
     user.last_login_at = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
 
     # Создаем токены
     access_token = create_access_token(user.id_user, user.email)
@@ -107,7 +111,7 @@ async def login(
     device_info = request.headers.get("User-Agent", "") if request else ""
     ip_address = request.client.host if request and request.client else None
 
-    save_refresh_token(
+    await save_refresh_token_async(
         db=db,
         user_id=user.id_user,
         refresh_token=refresh_token,
@@ -126,7 +130,7 @@ async def login(
 async def refresh_token(
     token_data: schemas.RefreshTokenRequest,
     request: Request = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновление access токена"""
     try:
@@ -134,10 +138,10 @@ async def refresh_token(
         user_id = uuid.UUID(payload.get("sub"))
 
         device_info = request.headers.get("User-Agent", "") if request else ""
-        if not verify_refresh_token(db, token_data.refresh_token, user_id, device_info):
+        if not await verify_refresh_token_async(db, token_data.refresh_token, user_id, device_info):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-        user = get_user_by_id(db, user_id)
+        user = await get_user_by_id_async(db, user_id)
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
         if not user.is_active:
@@ -149,7 +153,7 @@ async def refresh_token(
         device_info = request.headers.get("User-Agent", "") if request else ""
         ip_address = request.client.host if request and request.client else None
 
-        save_refresh_token(
+        await save_refresh_token_async(
             db=db,
             user_id=user.id_user,
             refresh_token=new_refresh_token,
@@ -173,7 +177,7 @@ async def refresh_token(
 @router.post("/logout")
 async def logout(
     token_data: schemas.RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Выход пользователя"""
     try:
@@ -181,8 +185,8 @@ async def logout(
         user_id = uuid.UUID(payload.get("sub"))
 
         revoke_token(token_data.refresh_token)
-        db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
-        db.commit()
+        await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+        await db.commit()
         return {"message": "Successfully logged out"}
 
     except HTTPException:
@@ -193,7 +197,7 @@ async def logout(
 
 
 @router.get("/verify-email")
-async def verify_email(token: str, db: Session = Depends(get_db)):
+def verify_email(token: str, db: Session = Depends(get_db)):
     """Подтверждение email через JWT-токен."""
     try:
         user_id = verify_verification_token(token)
@@ -212,7 +216,7 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
 
 
 @router.post("/password-reset/request")
-async def request_password_reset(
+def request_password_reset(
     data: schemas.PasswordResetRequest,
     db: Session = Depends(get_db),
 ):
@@ -230,7 +234,7 @@ async def request_password_reset(
 
 
 @router.post("/password-reset/confirm")
-async def confirm_password_reset(
+def confirm_password_reset(
     data: schemas.PasswordResetConfirm,
     db: Session = Depends(get_db),
 ):
@@ -2,6 +2,7 @@
 Маршруты для проверки здоровья сервиса.
 """
 from fastapi import APIRouter
+from database.engine import engines_status
 from datetime import datetime
 
 router = APIRouter(tags=["health"])
@@ -15,4 +16,10 @@ async def health_check():
         "status": "healthy",
         "service": "Auth",
         "timestamp": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/health/db")
+async def db_pool_health():
+    """Пулы соединений БД: ожидание выдачи, занятые и overflow-соединения"""
+    return engines_status()
@@ -10,6 +10,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../'))
 
 # Импортируем из общей базы данных
+from database import access_dashboard
 from database.session import get_db
 
 # Импортируем из текущего сервиса
@@ -39,7 +40,7 @@ async def get_current_user_info(
     }
 
 @router.put("/me", response_model=schemas.UserResponse)
-async def update_user_info(
+def update_user_info(
     user_data: schemas.UserBase,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -74,7 +75,11 @@ async def update_user_info(
         for field, value in user_data.model_dump(exclude_unset=True).items():
             if value is not None and hasattr(current_user, field):
                 setattr(current_user, field, value)
-        
+
+        # Имена пользователя денормализованы в списки доступов
+        access_dashboard.update_user(
+            db, current_user.id_user, full_name=user_data.full_name, username=user_data.username
+        )
         db.commit()
         db.refresh(current_user)
         
@@ -100,7 +105,7 @@ async def update_user_info(
         )
 
 @router.put("/me/password", status_code=status.HTTP_200_OK)
-async def update_password(
+def update_password(
     password_data: schemas.PasswordUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -132,7 +137,7 @@ async def update_password(
     return {"message": "Password updated successfully"}
 
 @router.put("/me/email", status_code=status.HTTP_200_OK)
-async def change_email(
+def change_email(
     email_data: schemas.EmailChangeRequest,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -157,7 +162,7 @@ async def change_email(
 
 
 @router.delete("/me", status_code=status.HTTP_200_OK)
-async def delete_account(
+def delete_account(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -170,7 +175,7 @@ async def delete_account(
 
 
 @router.get("/me/tokens", status_code=status.HTTP_200_OK)
-async def get_user_tokens(
+def get_user_tokens(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -196,7 +201,7 @@ async def get_user_tokens(
     }
 
 @router.post("/me/tokens/revoke-all", status_code=status.HTTP_200_OK)
-async def revoke_all_tokens(
+def revoke_all_tokens(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -12,6 +12,9 @@ from config import config as base_config
 
 load_dotenv()
 
+# Пул соединений БД этого сервиса: FAMILY_DB_POOL_SIZE и др. (database/pool.py)
+os.environ.setdefault("DB_SERVICE", "family")
+
 class FamilyTreeConfig:
     """Конфигурация сервиса семейного древа"""
     
@@ -3,12 +3,15 @@ CRUD операции для сервиса Family Tree
 """
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence, Tuple
 from datetime import datetime, timezone
 import uuid
 import logging
 
+from database.bulk import insert_returning
 from database.models.family import FamilyTree, FamilyTreeAgent, RelationshipAgent
+from database.models.memory import AgentBD
+from database.pagination import after_cursor, estimated_count, split_page
 from . import schemas
 
 logger = logging.getLogger(__name__)
@@ -35,17 +38,36 @@ def create_family_tree(
     return db_tree
 
 
+TREE_SORT_KEY = (FamilyTree.updated_at, FamilyTree.id_family_tree)
+
+
+def _tree_page(
+    db: Session,
+    query,
+    cursor: Optional[str],
+    limit: int,
+    with_total: bool
+) -> Tuple[List[FamilyTree], Optional[str], Optional[int]]:
+    """Страница древ по курсору (updated_at, id): (древа, следующий курсор, оценка количества)"""
+    total = estimated_count(db, query.statement) if with_total else None
+    condition = after_cursor(TREE_SORT_KEY, cursor)
+    if condition is not None:
+        query = query.filter(condition)
+    rows = query.order_by(*(desc(column) for column in TREE_SORT_KEY)).limit(limit + 1).all()
+    trees, next_cursor = split_page(rows, limit, lambda t: (t.updated_at, t.id_family_tree))
+    return trees, next_cursor, total
+
+
 def get_user_trees(
     db: Session,
     user_id: uuid.UUID,
-    skip: int = 0,
-    limit: int = 20
-) -> Tuple[List[FamilyTree], int]:
-    """Получает список древ пользователя с пагинацией"""
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    with_total: bool = False
+) -> Tuple[List[FamilyTree], Optional[str], Optional[int]]:
+    """Получает страницу древ пользователя (keyset-пагинация)"""
     query = db.query(FamilyTree).filter(FamilyTree.user_id == user_id)
-    total = query.count()
-    trees = query.order_by(desc(FamilyTree.updated_at)).offset(skip).limit(limit).all()
-    return trees, total
+    return _tree_page(db, query, cursor, limit, with_total)
 
 
 def get_user_tree_by_id(
@@ -113,17 +135,16 @@ def delete_family_tree(
 
 def get_public_trees(
     db: Session,
-    skip: int = 0,
-    limit: int = 20
-) -> Tuple[List[FamilyTree], int]:
-    """Получает список публичных древ"""
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    with_total: bool = False
+) -> Tuple[List[FamilyTree], Optional[str], Optional[int]]:
+    """Получает страницу публичных древ (keyset-пагинация)"""
     query = db.query(FamilyTree).filter(
         FamilyTree.is_public == True,
         FamilyTree.is_draft == False
     )
-    total = query.count()
-    trees = query.order_by(desc(FamilyTree.updated_at)).offset(skip).limit(limit).all()
-    return trees, total
+    return _tree_page(db, query, cursor, limit, with_total)
 
 
 def get_public_tree_by_id(
@@ -140,6 +161,16 @@ def get_public_tree_by_id(
 
 # ========== Family Tree Agents CRUD ==========
 
+def select_existing_agent_ids(db: Session, agent_ids: Sequence[uuid.UUID]) -> set:
+    """Какие из agent_ids существуют (один запрос, для проверки пакета)"""
+    if not agent_ids:
+        return set()
+    return {
+        agent_id for (agent_id,) in
+        db.query(AgentBD.id_agent).filter(AgentBD.id_agent.in_(set(agent_ids)))
+    }
+
+
 def add_agent_to_tree(
     db: Session,
     tree_id: uuid.UUID,
@@ -165,6 +196,33 @@ def add_agent_to_tree(
     return db_agent
 
 
+def add_agents_to_tree_bulk(
+    db: Session,
+    tree_id: uuid.UUID,
+    agent_ids: Sequence[uuid.UUID]
+) -> List[FamilyTreeAgent]:
+    """
+    Добавляет агентов в древо одной вставкой. Как и add_agent_to_tree, для уже
+    добавленных агентов возвращает существующие записи (в порядке agent_ids)
+    """
+    existing = {
+        member.agent_id: member
+        for member in db.query(FamilyTreeAgent).filter(
+            FamilyTreeAgent.family_tree_id == tree_id,
+            FamilyTreeAgent.agent_id.in_(set(agent_ids))
+        )
+    }
+    new_ids = [agent_id for agent_id in dict.fromkeys(agent_ids) if agent_id not in existing]
+    created = insert_returning(
+        db, FamilyTreeAgent, [{"family_tree_id": tree_id, "agent_id": agent_id} for agent_id in new_ids]
+    )
+    db.commit()
+    logger.info(f"Added {len(created)} agents to tree {tree_id}")
+
+    members = {**existing, **{member.agent_id: member for member in created}}
+    return [members[agent_id] for agent_id in agent_ids]
+
+
 def remove_agent_from_tree(
     db: Session,
     tree_id: uuid.UUID,
@@ -218,6 +276,29 @@ def create_relationship(
     return db_rel
 
 
+def create_relationships_bulk(
+    db: Session,
+    tree_id: uuid.UUID,
+    user_id: uuid.UUID,
+    rels_data: Sequence[schemas.RelationshipCreate]
+) -> List[RelationshipAgent]:
+    """Создаёт родственные связи одной вставкой (INSERT ... RETURNING) и одним commit"""
+    created = insert_returning(db, RelationshipAgent, [
+        {
+            "type_relative": rel_data.type_relative,
+            "is_blood_relative": rel_data.is_blood_relative,
+            "agent_from": rel_data.agent_from,
+            "agent_to": rel_data.agent_to,
+            "family_tree_id": tree_id,
+            "user_id": user_id,
+        }
+        for rel_data in rels_data
+    ])
+    db.commit()
+    logger.info(f"Created {len(created)} relationships in tree {tree_id}")
+    return created
+
+
 def get_tree_relationships(
     db: Session,
     tree_id: uuid.UUID
@@ -8,6 +8,9 @@ import uvicorn
 import logging
 
 from .config import config
+from database.engine import all_engines
+from database.query_stats import QueryStatsMiddleware
+from shared.tracing import install_tracing
 from .routers import family_router, health_router
 
 # Настройка логирования
@@ -47,6 +50,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Счётчик SQL-выражений на запрос (X-DB-Statements) и журнал медленных запросов
+app.add_middleware(QueryStatsMiddleware)
+
+# Сквозная трассировка (traceparent / X-Request-ID, SQL span'ы)
+install_tracing(app, "family", *all_engines())
+
 # Подключаем роутеры
 app.include_router(family_router)
 app.include_router(health_router)
@@ -6,14 +6,17 @@ from sqlalchemy.orm import Session
 from typing import Optional
 import uuid
 
-from database.session import get_db
+from database.pagination import InvalidCursor
+from database.session import get_db, get_read_db
+from shared.bulk import BulkRequest, item_error, validate_items
 from .. import schemas
 from ..crud import (
     create_family_tree, get_user_trees, get_user_tree_by_id, get_tree_by_id,
     update_family_tree, delete_family_tree,
     get_public_trees, get_public_tree_by_id,
-    add_agent_to_tree, remove_agent_from_tree, get_tree_agents,
-    create_relationship, get_tree_relationships, get_relationship_by_id,
+    add_agent_to_tree, add_agents_to_tree_bulk, remove_agent_from_tree, get_tree_agents,
+    select_existing_agent_ids,
+    create_relationship, create_relationships_bulk, get_tree_relationships, get_relationship_by_id,
     update_relationship, delete_relationship
 )
 from ..dependencies import get_current_user_id, get_optional_user_id
@@ -42,20 +45,25 @@ def create_tree(
 
 @router.get("/tree/my", response_model=schemas.FamilyTreeListResponse)
 def get_my_trees(
-    skip: int = Query(0, ge=0, description="Смещение"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Лимит"),
+    with_total: bool = Query(False, description="Вернуть оценку общего количества"),
     user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
-    """Список древ текущего пользователя (с пагинацией)"""
+    """Список древ текущего пользователя (keyset-пагинация)"""
     try:
-        trees, total = get_user_trees(db=db, user_id=user_id, skip=skip, limit=limit)
+        trees, next_cursor, total = get_user_trees(
+            db=db, user_id=user_id, cursor=cursor, limit=limit, with_total=with_total
+        )
         return schemas.FamilyTreeListResponse(
             trees=[schemas.FamilyTreeResponse.from_orm(t) for t in trees],
             total=total,
-            page=(skip // limit) + 1 if limit > 0 else 1,
+            next_cursor=next_cursor,
             page_size=limit
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,19 +77,24 @@ def get_my_trees(
 
 @router.get("/tree/public", response_model=schemas.PublicFamilyTreeListResponse)
 def get_public_trees_list(
-    skip: int = Query(0, ge=0, description="Смещение"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Лимит"),
-    db: Session = Depends(get_db)
+    with_total: bool = Query(False, description="Вернуть оценку общего количества"),
+    db: Session = Depends(get_read_db)
 ):
     """Список публичных древ (для всех пользователей)"""
     try:
-        trees, total = get_public_trees(db=db, skip=skip, limit=limit)
+        trees, next_cursor, total = get_public_trees(
+            db=db, cursor=cursor, limit=limit, with_total=with_total
+        )
         return schemas.PublicFamilyTreeListResponse(
             trees=[schemas.PublicFamilyTreeResponse.from_orm(t) for t in trees],
             total=total,
-            page=(skip // limit) + 1 if limit > 0 else 1,
+            next_cursor=next_cursor,
             page_size=limit
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -92,7 +105,7 @@ def get_public_trees_list(
 @router.get("/tree/public/{tree_id}", response_model=schemas.PublicFamilyTreeFullResponse)
 def get_public_tree(
     tree_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Просмотр конкретного публичного древа (для всех пользователей)"""
     try:
@@ -244,6 +257,46 @@ def add_agent(
         )
 
 
+@router.post("/tree/{tree_id}/agent/bulk", response_model=schemas.FamilyTreeAgentBulkResponse)
+def add_agents_bulk(
+    tree_id: uuid.UUID,
+    request: BulkRequest,
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Добавить пакет агентов в древо одной транзакцией.
+    Элементы - как в POST /tree/{tree_id}/agent; ошибки - по индексу элемента
+    """
+    db_tree = get_user_tree_by_id(db=db, tree_id=tree_id, user_id=user_id)
+    if not db_tree:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Family tree not found or access denied"
+        )
+
+    valid, errors = validate_items(request.items, schemas.AddAgentRequest)
+    existing = select_existing_agent_ids(db, [item.agent_id for _, item in valid])
+    accepted = []
+    for index, item in valid:
+        if item.agent_id in existing:
+            accepted.append(item.agent_id)
+        else:
+            errors.append(item_error(index, "Agent not found", loc=("agent_id",)))
+
+    try:
+        members = add_agents_to_tree_bulk(db=db, tree_id=tree_id, agent_ids=accepted) if accepted else []
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to add agents to tree: {str(e)}"
+        )
+    return schemas.FamilyTreeAgentBulkResponse(
+        created=[schemas.FamilyTreeAgentResponse.from_orm(m) for m in members],
+        errors=sorted(errors, key=lambda error: error.index)
+    )
+
+
 @router.delete("/tree/{tree_id}/agent/{agent_id}", response_model=schemas.DeleteResponse)
 def remove_agent(
     tree_id: uuid.UUID,
@@ -337,6 +390,49 @@ def create_relationship_endpoint(
         )
 
 
+@router.post("/tree/{tree_id}/relationship/bulk", response_model=schemas.RelationshipBulkResponse)
+def create_relationships_bulk_endpoint(
+    tree_id: uuid.UUID,
+    request: BulkRequest,
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Создать пакет родственных связей одной транзакцией.
+    Элементы - как в POST /tree/{tree_id}/relationship; ошибки - по индексу элемента
+    """
+    db_tree = get_user_tree_by_id(db=db, tree_id=tree_id, user_id=user_id)
+    if not db_tree:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Family tree not found or access denied"
+        )
+
+    valid, errors = validate_items(request.items, schemas.RelationshipCreate)
+    existing = select_existing_agent_ids(
+        db, [agent_id for _, rel in valid for agent_id in (rel.agent_from, rel.agent_to)]
+    )
+    accepted = []
+    for index, rel in valid:
+        missing = [field for field in ("agent_from", "agent_to") if getattr(rel, field) not in existing]
+        if missing:
+            errors.append(item_error(index, "Agent not found", loc=(missing[0],)))
+        else:
+            accepted.append(rel)
+
+    try:
+        rels = create_relationships_bulk(db=db, tree_id=tree_id, user_id=user_id, rels_data=accepted) if accepted else []
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create relationships: {str(e)}"
+        )
+    return schemas.RelationshipBulkResponse(
+        created=[schemas.RelationshipResponse.from_orm(r) for r in rels],
+        errors=sorted(errors, key=lambda error: error.index)
+    )
+
+
 @router.put("/tree/{tree_id}/relationship/{rel_id}", response_model=schemas.RelationshipResponse)
 def update_relationship_endpoint(
     tree_id: uuid.UUID,
@@ -2,6 +2,7 @@
 Health-check для сервиса Family Tree
 """
 from fastapi import APIRouter
+from database.engine import engines_status
 from datetime import datetime, timezone
 
 router = APIRouter(tags=["health"])
@@ -14,4 +15,10 @@ async def health_check():
         "status": "healthy",
         "service": "family-tree",
         "timestamp": datetime.now(timezone.utc).isoformat()
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/health/db")
+async def db_pool_health():
+    """Пулы соединений БД: ожидание выдачи, занятые и overflow-соединения"""
+    return engines_status()
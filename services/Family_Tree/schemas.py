@@ -6,6 +6,8 @@ from typing import Optional, List, Any
 from datetime import datetime
 import uuid
 
+from shared.bulk import BulkItemError
+
 
 # ========== Базовые схемы ==========
 
@@ -48,8 +50,8 @@ class FamilyTreeResponse(FamilyTreeBase):
 class FamilyTreeListResponse(BaseModel):
     """Схема списка древ"""
     trees: List[FamilyTreeResponse]
-    total: int
-    page: int = 1
+    total: Optional[int] = None  # оценка, только при with_total=true
+    next_cursor: Optional[str] = None
     page_size: int = 20
 
 
@@ -70,6 +72,12 @@ class AddAgentRequest(BaseModel):
     agent_id: uuid.UUID = Field(..., description="ID агента")
 
 
+class FamilyTreeAgentBulkResponse(BaseModel):
+    """Результат пакетного добавления агентов в древо"""
+    created: List[FamilyTreeAgentResponse] = []
+    errors: List[BulkItemError] = []
+
+
 # ========== Связи между агентами ==========
 
 class RelationshipBase(BaseModel):
@@ -115,6 +123,12 @@ class RelationshipResponse(RelationshipBase):
         orm_mode = True
 
 
+class RelationshipBulkResponse(BaseModel):
+    """Результат пакетного создания связей"""
+    created: List[RelationshipResponse] = []
+    errors: List[BulkItemError] = []
+
+
 class RelationshipListResponse(BaseModel):
     """Схема списка связей"""
     relationships: List[RelationshipResponse]
@@ -144,8 +158,8 @@ class PublicFamilyTreeResponse(FamilyTreeBase):
 class PublicFamilyTreeListResponse(BaseModel):
     """Схема списка публичных древ"""
     trees: List[PublicFamilyTreeResponse]
-    total: int
-    page: int = 1
+    total: Optional[int] = None  # оценка, только при with_total=true
+    next_cursor: Optional[str] = None
     page_size: int = 20
 
 
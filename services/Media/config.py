@@ -12,6 +12,9 @@ from config import config as base_config
 
 load_dotenv()
 
+# Пул соединений БД этого сервиса: MEDIA_DB_POOL_SIZE и др. (database/pool.py)
+os.environ.setdefault("DB_SERVICE", "media")
+
 class MediaConfig:
     """Конфигурация сервиса медиа"""
     
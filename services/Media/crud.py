@@ -3,12 +3,13 @@ CRUD операции для работы с медиафайлами
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, asc
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timedelta, timezone
 import os
 
 from database.models.media import MediaBD
+from database.pagination import after_cursor, estimated_count, split_page
 from . import schemas
 from .config import config
 
@@ -145,10 +146,11 @@ def search_media(
     page_id: Optional[uuid.UUID] = None,
     media_type: Optional[str] = None,
     is_temp: Optional[bool] = None,
-    skip: int = 0,
-    limit: int = 100
-) -> List[MediaBD]:
-    """Поиск медиа с фильтрами"""
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    with_total: bool = False
+) -> Tuple[List[MediaBD], Optional[str], Optional[int]]:
+    """Поиск медиа с фильтрами: (страница по курсору (updated_at, id), следующий курсор, оценка количества)"""
     query = db.query(MediaBD)
     
     if user_id:
@@ -163,4 +165,12 @@ def search_media(
     if is_temp is not None:
         query = query.filter(MediaBD.is_temp == is_temp)
     
-    return query.offset(skip).limit(limit).all()
\ No newline at end of file
+    total = estimated_count(db, query.statement) if with_total else None
+    
+    sort_key = (MediaBD.updated_at, MediaBD.id_media)
+    condition = after_cursor(sort_key, cursor)
+    if condition is not None:
+        query = query.filter(condition)
+    rows = query.order_by(*(desc(column) for column in sort_key)).limit(limit + 1).all()
+    media, next_cursor = split_page(rows, limit, lambda m: (m.updated_at, m.id_media))
+    return media, next_cursor, total
\ No newline at end of file
@@ -13,6 +13,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
 from config import config as base_config
 from .config import config
+from database.engine import all_engines
+from database.query_stats import QueryStatsMiddleware
+from shared.tracing import install_tracing
 from .routers import media, health
 from .utils import ensure_base_directories
 
@@ -51,6 +54,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Счётчик SQL-выражений на запрос (X-DB-Statements) и журнал медленных запросов
+app.add_middleware(QueryStatsMiddleware)
+
+# Сквозная трассировка (traceparent / X-Request-ID, SQL span'ы)
+install_tracing(app, "media", *all_engines())
+
 # Подключаем роутеры
 app.include_router(media.router)
 app.include_router(health.router)
@@ -6,6 +6,8 @@ from fastapi.responses import FileResponse
 import os
 from pathlib import Path
 
+from database.engine import engines_status
+
 from ..config import config
 
 router = APIRouter(tags=["health"])
@@ -21,6 +23,12 @@ async def health_check():
     }
 
 
+@router.get("/health/db")
+async def db_pool_health():
+    """Пулы соединений БД: ожидание выдачи, занятые и overflow-соединения"""
+    return engines_status()
+
+
 @router.get("/temp/{user_id}/{filename}")
 async def serve_temp_file(user_id: str, filename: str):
     """Отдача временных файлов (без page_id)"""
@@ -62,4 +70,4 @@ async def serve_permanent_file_with_page(user_id: str, page_id: str, filename: s
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Файл не найден")
     
-    return FileResponse(file_path)
\ No newline at end of file
+    return FileResponse(file_path)
@@ -10,7 +10,8 @@ from typing import Optional, List
 from datetime import datetime, timedelta, timezone
 import magic
 
-from database.session import get_db
+from database.pagination import InvalidCursor
+from database.session import get_db, get_read_db
 from .. import schemas
 from ..crud import (
     create_media, get_media_by_id, get_media_by_user, get_temp_media_by_user,
@@ -155,33 +156,29 @@ def list_media(
     page_id: Optional[uuid.UUID] = None,
     media_type: Optional[str] = None,
     is_temp: Optional[bool] = None,
-    page: int = 1,
+    cursor: Optional[str] = None,
     page_size: int = 20,
-    db: Session = Depends(get_db)
+    with_total: bool = False,
+    db: Session = Depends(get_read_db)
 ):
-    """Получение списка медиа с фильтрами"""
+    """Получение списка медиа с фильтрами (keyset-пагинация по next_cursor)"""
     if page_size > config.MAX_PAGE_SIZE:
         page_size = config.MAX_PAGE_SIZE
     
-    skip = (page - 1) * page_size
-    
-    # Поиск медиа
-    media_list = search_media(
-        db, user_id=user_id, page_id=page_id,
-        media_type=media_type, is_temp=is_temp,
-        skip=skip, limit=page_size
-    )
-    
-    # Получаем общее количество
-    total = len(search_media(
-        db, user_id=user_id, page_id=page_id,
-        media_type=media_type, is_temp=is_temp
-    ))
+    # Поиск медиа; общее количество - оценка и только по запросу
+    try:
+        media_list, next_cursor, total = search_media(
+            db, user_id=user_id, page_id=page_id,
+            media_type=media_type, is_temp=is_temp,
+            cursor=cursor, limit=page_size, with_total=with_total
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return schemas.MediaListResponse(
         media=media_list,
         total=total,
-        page=page,
+        next_cursor=next_cursor,
         page_size=page_size
     )
 
@@ -197,7 +194,6 @@ def get_my_temp_media(
     return schemas.MediaListResponse(
         media=temp_media,
         total=len(temp_media),
-        page=1,
         page_size=len(temp_media)
     )
 
@@ -367,6 +363,5 @@ def get_page_media(
     return schemas.MediaListResponse(
         media=media_list,
         total=len(media_list),
-        page=1,
         page_size=len(media_list)
     )
\ No newline at end of file
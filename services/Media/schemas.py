@@ -71,8 +71,8 @@ class MediaResponse(BaseModel):
 class MediaListResponse(BaseModel):
     """Схема ответа со списком медиа"""
     media: List[MediaResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # в списке с фильтрами - оценка, только при with_total=true
+    next_cursor: Optional[str] = None
     page_size: int
 
 
@@ -13,6 +13,9 @@ from config import config as base_config
 
 load_dotenv()
 
+# Пул соединений БД этого сервиса: MEMORY_DB_POOL_SIZE и др. (database/pool.py)
+os.environ.setdefault("DB_SERVICE", "memory")
+
 class MemoryConfig:
     """Конфигурация сервиса памяти"""
     
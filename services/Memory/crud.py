@@ -1,55 +1,111 @@
 """
 CRUD операции для сервиса памяти
+
+Все функции асинхронные (AsyncSession из database.session.get_async_db):
+роутеры сервиса - async def, и запросы к БД не должны блокировать event loop.
 """
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.dialects import postgresql
-from sqlalchemy import and_, or_, desc, asc
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, select, update
+from sqlalchemy.orm import contains_eager, load_only
 
-from typing import Optional, List, Dict, Any
+from typing import Dict, Optional, List, Sequence, Tuple
 import uuid
 from . import schemas
+from database import access_dashboard
+from database.access_events import access_change_key, publish_access_changes_async
+from database.bulk import insert_returning_async
 from database.models.memory import AgentBD, PageBD
-#from config import, PageBD, MemoryTitles
+from database.pagination import after_cursor, estimated_count_async, split_page
 
-# ========== CRUD FOR AGENT ==========
-def select_memory_agent_list_by_user(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 50) -> schemas.AgentListResponse:
-    """Получает список агентов памяти пользователя в нужном формате"""
-    # Получаем агентов из БД
-    agents = db.query(AgentBD)\
-        .filter(AgentBD.user_id == user_id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+# Колонки, которые читают схемы ответов (schemas_new) GET-эндпоинтов; остальные
+# не загружаются, а обращение к ним - ошибка (raiseload), а не скрытый запрос
+AGENT_LIST_FIELDS = (
+    AgentBD.id_agent, AgentBD.full_name, AgentBD.gender, AgentBD.birth_date, AgentBD.death_date,
+    AgentBD.place_of_birth, AgentBD.place_of_death, AgentBD.avatar_url, AgentBD.is_human,
+)  # AgentInListResponse
+AGENT_FIELDS = AGENT_LIST_FIELDS + (AgentBD.user_id, AgentBD.created_at, AgentBD.updated_at)  # AgentResponse
+PAGE_LIST_FIELDS = (
+    PageBD.id_page, PageBD.epitaph, PageBD.biography, PageBD.is_public, PageBD.is_draft, PageBD.updated_at,
+)  # PageInListResponse
+PUBLIC_PAGE_FIELDS = PAGE_LIST_FIELDS + (PageBD.agent_id, PageBD.created_at)  # PublicPageResponse
+PAGE_FIELDS = PUBLIC_PAGE_FIELDS + (PageBD.user_id,)  # PageResponse
 
-    return agents
+# Опции загрузки собираются один раз: построение load_only на каждый запрос
+# заметно дороже самого запроса
+AGENT_LIST_LOAD = load_only(*AGENT_LIST_FIELDS, raiseload=True)
+PAGE_LIST_LOAD = load_only(*PAGE_LIST_FIELDS, raiseload=True)
+PUBLIC_MEMORY_PAGE_LOAD = (AGENT_LIST_LOAD, load_only(*PUBLIC_PAGE_FIELDS, raiseload=True))
+AGENT_WITH_PAGES_LOAD = (
+    load_only(*AGENT_FIELDS, raiseload=True),
+    contains_eager(AgentBD.pages).load_only(*PAGE_FIELDS, raiseload=True),
+)
 
-def select_memory_agent_by_user(db: Session, user_id: uuid.UUID, agent_id: uuid.UUID) -> Optional[AgentBD]:
-    """Получает агента памяти по ID"""
-    res =  db.query(AgentBD).filter(and_(AgentBD.id_agent == agent_id, AgentBD.user_id == user_id)).first()
 
-    return res
+def _agents_with_pages(condition):
+    """
+    Агенты с их страницами одним запросом: LEFT JOIN pages собирается в
+    agent.pages (contains_eager) за один упорядоченный проход по строкам.
+    """
+    return (
+        select(AgentBD)
+        .outerjoin(AgentBD.pages)
+        .where(condition)
+        .options(*AGENT_WITH_PAGES_LOAD)
+        .order_by(AgentBD.id_agent, desc(PageBD.updated_at))
+    )
 
-def create_memory_agent(
-    db: Session, 
+# ========== CRUD FOR AGENT ==========
+async def select_memory_agent_list_by_user(db: AsyncSession, user_id: uuid.UUID, skip: int = 0, limit: int = 50) -> List[AgentBD]:
+    """Получает список агентов памяти пользователя"""
+    result = await db.execute(
+        select(AgentBD)
+        .filter(AgentBD.user_id == user_id)
+        .options(AGENT_LIST_LOAD)
+        .order_by(AgentBD.id_agent)
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def select_memory_agent_by_user(db: AsyncSession, user_id: uuid.UUID, agent_id: uuid.UUID) -> Optional[AgentBD]:
+    """Получает агента памяти по ID"""
+    result = await db.execute(
+        select(AgentBD).filter(and_(AgentBD.id_agent == agent_id, AgentBD.user_id == user_id))
+    )
+    return result.scalars().first()
+
+async def create_memory_agent(
+    db: AsyncSession,
     agent_data: schemas.AgentCreate,  # Теперь без user_id
     user_id: uuid.UUID
 ) -> AgentBD:
     """Создает нового агента памяти"""
     db_agent = AgentBD(**agent_data.model_dump(), user_id=user_id)
     db.add(db_agent)
-    db.commit()
-    db.refresh(db_agent)
+    await db.commit()
+    await db.refresh(db_agent)
     return db_agent  # Возвращаем объект SQLAlchemy
 
-def update_memory_agent(
-    db: Session,
+async def create_memory_agents_bulk(
+    db: AsyncSession,
+    agents_data: Sequence[schemas.AgentCreate],
+    user_id: uuid.UUID
+) -> List[AgentBD]:
+    """Создает агентов памяти одной вставкой (INSERT ... RETURNING) и одним commit"""
+    agents = await insert_returning_async(
+        db, AgentBD, [{**agent_data.model_dump(), "user_id": user_id} for agent_data in agents_data]
+    )
+    await db.commit()
+    return agents
+
+async def update_memory_agent(
+    db: AsyncSession,
     agent_id: uuid.UUID,
     agent_update: schemas.AgentUpdate,
     user_id: uuid.UUID
 ) -> Optional[AgentBD]:
     """Обновляет агента памяти"""
-    db_agent = select_memory_agent_by_user(db, user_id, agent_id)
+    db_agent = await select_memory_agent_by_user(db, user_id, agent_id)
 
     if not db_agent or db_agent.user_id != user_id:
         return None
@@ -58,29 +114,35 @@ def update_memory_agent(
     for field, value in update_data.items():
         if value is not None:  # Обновляем только если значение не None
             setattr(db_agent, field, value)
+
+    # Имя агента показывается в списках доступов к его страницам
+    await access_dashboard.update_agent_async(
+        db, agent_id, full_name=update_data.get('full_name'), is_human=update_data.get('is_human')
+    )
     
-    db.commit()
-    db.refresh(db_agent)
+    await db.commit()
+    await db.refresh(db_agent)
     return db_agent  # Возвращаем объект SQLAlchemy
 
-def delete_memory_agent(
-    db: Session,
+async def delete_memory_agent(
+    db: AsyncSession,
     agent_id: uuid.UUID,
     user_id: uuid.UUID
 ) -> bool:
     """Удаляет агента памяти"""
-    db_agent = select_memory_agent_by_user(db, user_id, agent_id)
+    db_agent = await select_memory_agent_by_user(db, user_id, agent_id)
     if not db_agent or db_agent.user_id != user_id:
         return False
     
-    db.delete(db_agent)
-    db.commit()
+    await db.delete(db_agent)
+    await access_dashboard.delete_agent_async(db, agent_id)
+    await db.commit()
     return True
 
 
 # ========== CRUD FOR PAGE ==========
-def _demote_other_main_pages(
-    db: Session,
+async def _demote_other_main_pages(
+    db: AsyncSession,
     agent_id: uuid.UUID,
     user_id: uuid.UUID,
     current_page_id: uuid.UUID
@@ -90,75 +152,133 @@ def _demote_other_main_pages(
     Делает все ДРУГИЕ опубликованные страницы агента черновиками.
     
     Устанавливает is_draft=True для всех страниц агента с is_draft=False,
-    кроме текущей (указанной по ID).
+    кроме текущей (указанной по ID). Один UPDATE вместо загрузки страниц.
     """
-    # Находим все опубликованные страницы агента, кроме текущей
-    other_published_pages = db.query(PageBD).filter(
-        PageBD.agent_id == agent_id,
-        PageBD.id_page != current_page_id,
-        PageBD.user_id == user_id,
-        PageBD.is_draft == False  # Только опубликованные страницы
-    ).all()
+    demoted = await db.execute(
+        update(PageBD)
+        .where(
+            PageBD.agent_id == agent_id,
+            PageBD.id_page != current_page_id,
+            PageBD.user_id == user_id,
+            PageBD.is_draft == False  # Только опубликованные страницы
+        )
+        .values(is_draft=True, is_public=False)
+        .returning(PageBD.id_page)
+        .execution_options(synchronize_session=False)
+    )
+    page_ids = demoted.scalars().all()
     
-    # Делаем их черновиками
-    for page in other_published_pages:
-        page.is_draft = True
-        page.is_public= False
-        print(f"Страница {page.id_page} стала черновиком")
-    
-    if other_published_pages:
-        db.commit()
-        print(f"Обновлено {len(other_published_pages)} страниц в черновики")
+    if page_ids:
+        await access_dashboard.update_pages_async(db, page_ids, is_public=False, is_draft=True)
+        await publish_access_changes_async(db, map(access_change_key, page_ids))
+        await db.commit()
+        print(f"Обновлено {len(page_ids)} страниц в черновики")
 
-def select_page_list(db: Session, agent_id: uuid.UUID, skip: int = 0, limit: int = 50) -> schemas.PageListResponse:
+async def select_page_list(db: AsyncSession, agent_id: uuid.UUID, skip: int = 0, limit: int = 50) -> List[PageBD]:
     """
     Получает список страниц
     Возвращает список (page)
     """
     
     try:
-        result = db.query(PageBD) \
-            .filter(PageBD.agent_id == agent_id)\
-            .order_by(desc(PageBD.updated_at))\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
-
-        return result
+        result = await db.execute(
+            select(PageBD)
+            .filter(PageBD.agent_id == agent_id)
+            .options(PAGE_LIST_LOAD)
+            .order_by(desc(PageBD.updated_at))
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.scalars().all()
     except Exception as e:
-        print(f"ERROR in select_public_memory_page_list: {e}")
+        print(f"ERROR in select_page_list: {e}")
         return []
     
-def select_page_by_user(db: Session, user_id: uuid.UUID, page_id: uuid.UUID) -> Optional[PageBD]:
-    """Получает агента памяти по ID"""
-    res =  db.query(PageBD).filter(and_(PageBD.id_page == page_id, PageBD.user_id == user_id)).first()
-
-    return res
+async def select_page_by_user(db: AsyncSession, user_id: uuid.UUID, page_id: uuid.UUID) -> Optional[PageBD]:
+    """Получает страницу памяти по ID"""
+    result = await db.execute(
+        select(PageBD).filter(and_(PageBD.id_page == page_id, PageBD.user_id == user_id))
+    )
+    return result.scalars().first()
 
-def create_page(
-    db: Session,
+async def create_page(
+    db: AsyncSession,
     page_data: schemas.PageCreate,  # Теперь без user_id
     user_id: uuid.UUID
 ) -> PageBD:
     """Создает новую страницу памяти"""
-    page= PageBD(**page_data.model_dump(), user_id=user_id)
+    page = PageBD(**page_data.model_dump(), user_id=user_id)
     db.add(page)
-    db.commit()
-    db.refresh(page)
+    await db.commit()
+    await db.refresh(page)
 
     if not page_data.is_draft:  # Если создали опубликованную
-        _demote_other_main_pages(db, page.agent_id, user_id, page.id_page)
+        await _demote_other_main_pages(db, page.agent_id, user_id, page.id_page)
 
     return page  # Возвращаем объект SQLAlchemy
 
-def update_page_db(
-    db: Session,
+async def select_owned_agent_ids(db: AsyncSession, user_id: uuid.UUID, agent_ids: Sequence[uuid.UUID]) -> set:
+    """Какие из agent_ids принадлежат пользователю (один запрос)"""
+    if not agent_ids:
+        return set()
+    result = await db.execute(
+        select(AgentBD.id_agent).where(AgentBD.user_id == user_id, AgentBD.id_agent.in_(set(agent_ids)))
+    )
+    return set(result.scalars().all())
+
+async def create_pages_bulk(
+    db: AsyncSession,
+    pages_data: Sequence[schemas.PageCreate],
+    user_id: uuid.UUID
+) -> List[PageBD]:
+    """
+    Создает страницы одной вставкой и одним commit.
+
+    Правило "одна опубликованная страница у агента" как при создании по
+    одной: из опубликованных страниц пакета остаётся последняя страница
+    агента, прежние опубликованные страницы агентов снимаются одним UPDATE.
+    Принадлежность агентов пользователю проверяет вызывающий код
+    (select_owned_agent_ids).
+    """
+    rows = [{**page_data.model_dump(), "user_id": user_id} for page_data in pages_data]
+
+    published: Dict[uuid.UUID, dict] = {}
+    for row in rows:
+        if not row["is_draft"]:
+            previous = published.get(row["agent_id"])
+            if previous is not None:
+                previous.update(is_draft=True, is_public=False)
+            published[row["agent_id"]] = row
+
+    pages = await insert_returning_async(db, PageBD, rows)
+
+    if published:
+        demoted = await db.execute(
+            update(PageBD)
+            .where(
+                PageBD.agent_id.in_(published.keys()),
+                PageBD.user_id == user_id,
+                PageBD.is_draft == False,
+                PageBD.id_page.notin_([page.id_page for page in pages]),
+            )
+            .values(is_draft=True, is_public=False)
+            .returning(PageBD.id_page)
+            .execution_options(synchronize_session=False)
+        )
+        demoted_ids = demoted.scalars().all()
+        await access_dashboard.update_pages_async(db, demoted_ids, is_public=False, is_draft=True)
+        await publish_access_changes_async(db, map(access_change_key, demoted_ids))
+    await db.commit()
+    return pages
+
+async def update_page_db(
+    db: AsyncSession,
     page_id: uuid.UUID,
     page_update: schemas.PageUpdate,
     user_id: uuid.UUID
-) -> PageBD:
-    """Обновляет агента памяти"""
-    page = select_page_by_user(db, user_id, page_id)
+) -> Optional[PageBD]:
+    """Обновляет страницу памяти"""
+    page = await select_page_by_user(db, user_id, page_id)
 
     if not page or page.user_id != user_id:
         return None
@@ -167,55 +287,72 @@ def update_page_db(
     for field, value in update_data.items():
         if value is not None:  # Обновляем только если значение не None
             setattr(page, field, value)
+
+    # Видимость страницы меняет права на неё (кэш и списки сервиса доступа)
+    if update_data.get('is_public') is not None or update_data.get('is_draft') is not None:
+        await access_dashboard.update_pages_async(
+            db, [page.id_page], is_public=page.is_public, is_draft=page.is_draft
+        )
+        await publish_access_changes_async(db, [access_change_key(page.id_page)])
     
-    db.commit()
-    db.refresh(page)
+    await db.commit()
+    await db.refresh(page)
 
     if not page_update.is_draft:  # Если создали опубликованную
-        _demote_other_main_pages(db, page.agent_id, user_id, page.id_page)
+        await _demote_other_main_pages(db, page.agent_id, user_id, page.id_page)
 
     return page  # Возвращаем объект SQLAlchemy
 
-def delete_page(db: Session,page_id: uuid.UUID, user_id: uuid.UUID) -> bool:
-    """Удаляет агента памяти"""
-    page = select_page_by_user(db, user_id, page_id)
+async def delete_page(db: AsyncSession, page_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+    """Удаляет страницу памяти"""
+    page = await select_page_by_user(db, user_id, page_id)
     
     if not page or page.user_id != user_id:
         return False
     
-    db.delete(page)
-    db.commit()
+    await db.delete(page)
+    await access_dashboard.delete_pages_async(db, [page.id_page])
+    await publish_access_changes_async(db, [access_change_key(page.id_page)])
+    await db.commit()
     return True
 
 
 # ========== CRUD FOR MEMORY PAGE ==========
-def select_public_memory_page_list(
-    db: Session,
-    skip: int = 0,
-    limit: int = 50
-) -> List[tuple]:
+async def select_public_memory_page_list(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    with_total: bool = False
+) -> Tuple[List[tuple], Optional[str], Optional[int]]:
     """
-    Получает список публичных страниц памяти с информацией об агентах
-    Возвращает список кортежей (agent, page)
+    Получает страницу публичных страниц памяти с информацией об агентах
+    (keyset-пагинация по (updated_at, id_page)).
+    Возвращает (список кортежей (agent, page), курсор следующей страницы, оценку количества)
     """
-    
+    sort_key = (PageBD.updated_at, PageBD.id_page)
+    condition = after_cursor(sort_key, cursor)  # InvalidCursor - до try, это ошибка клиента
+    query = (
+        select(AgentBD, PageBD)
+        .join(AgentBD, AgentBD.id_agent == PageBD.agent_id)
+        .filter(PageBD.is_public == True)
+        .options(*PUBLIC_MEMORY_PAGE_LOAD)
+    )
+
     try:
-        # Этот запрос возвращает кортежи (PageBD, AgentBD)
-        result = db.query(AgentBD, PageBD) \
-            .join(AgentBD, AgentBD.id_agent == PageBD.agent_id)\
-            .filter(PageBD.is_public == True)\
-            .order_by(desc(PageBD.updated_at))\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
-        
-        return result
+        total = await estimated_count_async(db, query) if with_total else None
+        if condition is not None:
+            query = query.filter(condition)
+        result = await db.execute(
+            query.order_by(*(desc(column) for column in sort_key)).limit(limit + 1)
+        )
+        rows, next_cursor = split_page(result.all(), limit, lambda row: (row[1].updated_at, row[1].id_page))
+        return rows, next_cursor, total
     except Exception as e:
         print(f"ERROR in select_public_memory_page_list: {e}")
-        return []
+        return [], None, None
 
-def select_public_memory_page(
-    db: Session,
+async def select_public_memory_page(
+    db: AsyncSession,
     agent_id: uuid.UUID
 ) -> Optional[tuple]:
     """
@@ -223,52 +360,52 @@ def select_public_memory_page(
     Возвращает кортеж (agent, page)
     """
     try:
-        # Этот запрос возвращает кортежи (PageBD, AgentBD)
-        result = db.query(AgentBD, PageBD) \
-            .join(AgentBD, AgentBD.id_agent == PageBD.agent_id)\
-            .filter(and_(AgentBD.id_agent == agent_id, PageBD.is_public == True))\
-            .first()
-
-        return result
+        result = await db.execute(
+            select(AgentBD, PageBD)
+            .join(AgentBD, AgentBD.id_agent == PageBD.agent_id)
+            .filter(and_(AgentBD.id_agent == agent_id, PageBD.is_public == True))
+            .options(*PUBLIC_MEMORY_PAGE_LOAD)
+        )
+        return result.first()
     except Exception as e:
         print(f"ERROR in select_public_memory_page: {e}")
         return None
 
-def select_memory_page_list_by_user(
-    db: Session,
+async def select_memory_page_list_by_user(
+    db: AsyncSession,
     user_id: uuid.UUID,
     skip: int = 0,
     limit: int = 50,
     is_draft: Optional[bool] = None,
     is_public: Optional[bool] = None
-) -> List[PageBD]:
-    """Получает список страниц памяти пользователя"""
+) -> List[AgentBD]:
+    """
+    Получает агентов пользователя с их страницами (agent.pages).
+    skip/limit считают агентов, а не строки JOIN: агент со многими
+    страницами не делится между страницами списка.
+    """
+    agent_ids = (
+        select(AgentBD.id_agent)
+        .filter(AgentBD.user_id == user_id)
+        .order_by(AgentBD.id_agent)
+        .offset(skip)
+        .limit(limit)
+        .scalar_subquery()
+    )
     try:
-        # Этот запрос возвращает кортежи (PageBD, AgentBD)
-        result = db.query(AgentBD, PageBD) \
-            .outerjoin(PageBD, AgentBD.id_agent == PageBD.agent_id)\
-            .filter(AgentBD.user_id == user_id)\
-            .order_by(AgentBD.id_agent)\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
-
-        return result
+        result = await db.execute(_agents_with_pages(AgentBD.id_agent.in_(agent_ids)))
+        return result.unique().scalars().all()
     except Exception as e:
-        print(f"ERROR in get_public_memory_pages_with_agents: {e}")
+        print(f"ERROR in select_memory_page_list_by_user: {e}")
         return []
 
-def select_memory_page_by_user(db: Session, user_id: uuid.UUID, agent_id: uuid.UUID) -> Optional[tuple]:
-    """Получает список страниц памяти пользователя"""
+async def select_memory_page_by_user(db: AsyncSession, user_id: uuid.UUID, agent_id: uuid.UUID) -> Optional[AgentBD]:
+    """Получает агента пользователя со всеми его страницами (agent.pages)"""
     try:
-        # Этот запрос возвращает кортежи (PageBD, AgentBD)
-        result = db.query(AgentBD, PageBD) \
-            .outerjoin(PageBD, AgentBD.id_agent == PageBD.agent_id)\
-            .filter(and_(AgentBD.user_id == user_id, AgentBD.id_agent == agent_id))\
-            .order_by(AgentBD.id_agent)\
-            .all()
-
-        return result
+        result = await db.execute(
+            _agents_with_pages(and_(AgentBD.user_id == user_id, AgentBD.id_agent == agent_id))
+        )
+        return result.unique().scalars().first()
     except Exception as e:
         print(f"ERROR in select_memory_page_by_user: {e}")
-        return []
\ No newline at end of file
+        return None
@@ -5,6 +5,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from .config import config
+from database.engine import all_engines
+from database.query_stats import QueryStatsMiddleware
+from shared.tracing import install_tracing
 import logging
 
 from .routers import agents, pages, memory_pages, health  # Изменено здесь  pages
@@ -48,6 +51,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Счётчик SQL-выражений на запрос (X-DB-Statements) и журнал медленных запросов
+app.add_middleware(QueryStatsMiddleware)
+
+# Сквозная трассировка (traceparent / X-Request-ID, SQL span'ы)
+install_tracing(app, "memory", *all_engines())
+
 # Подключаем роутеры
 app.include_router(agents.router)
 app.include_router(memory_pages.router)
@@ -2,17 +2,18 @@
 Роутер для работы с агентами памяти (memory_agent)
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import uuid
 
 # Простые относительные импорты - они будут работать, так как файл в папке routers
-from database.session import get_db
+from database.session import get_async_db
+from shared.bulk import BulkRequest, validate_items
 #from .. import schemas
 from .. import schemas_new as schemas
 from ..crud import (
     select_memory_agent_by_user, select_memory_agent_list_by_user, create_memory_agent,
-    update_memory_agent, delete_memory_agent
+    create_memory_agents_bulk, update_memory_agent, delete_memory_agent
 )
 # Используем локальную зависимость из Memory/dependencies.py
 from ..dependencies import get_current_user_id
@@ -25,10 +26,10 @@ async def get_agents(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получение списка агентов памяти текущего пользователя"""
-    agents = select_memory_agent_list_by_user(db=db, user_id=user_id, skip=skip, limit=limit)
+    agents = await select_memory_agent_list_by_user(db=db, user_id=user_id, skip=skip, limit=limit)
     res = schemas.AgentListResponse.from_agents(user_id=user_id, agents=agents)
 
     return res
@@ -37,10 +38,10 @@ async def get_agents(
 async def get_agent(
     agent_id: uuid.UUID,
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получение агента памяти по ID"""
-    agent = select_memory_agent_by_user(db, user_id, agent_id)
+    agent = await select_memory_agent_by_user(db, user_id, agent_id)
     
     if not agent or agent.user_id != user_id:
         raise HTTPException(
@@ -54,25 +55,39 @@ async def get_agent(
 async def create_agent(
     agent_data: schemas.AgentCreate,  # Без user_id
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создание нового агента памяти"""
-    agent = create_memory_agent(
+    agent = await create_memory_agent(
         db=db,
         agent_data=agent_data,
         user_id=user_id
     )
     return agent.to_dict()  # Возвращаем объект SQLAlchemy
 
+@router.post("/agent/bulk", response_model=schemas.AgentBulkResponse)
+async def create_agents_bulk(
+    request: BulkRequest,
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетное создание агентов (импорт семьи): валидные элементы создаются
+    одной транзакцией, невалидные возвращаются в errors с индексом
+    """
+    valid, errors = validate_items(request.items, schemas.AgentCreate)
+    agents = await create_memory_agents_bulk(db, [agent_data for _, agent_data in valid], user_id) if valid else []
+    return schemas.AgentBulkResponse(created=[agent.to_dict() for agent in agents], errors=errors)
+
 @router.put("/agent/update/{agent_id}", response_model=schemas.AgentResponse)
 async def update_agent(
     agent_id: uuid.UUID,
     agent_update: schemas.AgentUpdate,
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновление агента памяти"""
-    agent = update_memory_agent(
+    agent = await update_memory_agent(
         db=db,
         agent_id=agent_id,
         agent_update=agent_update,
@@ -91,10 +106,10 @@ async def update_agent(
 async def delete_agent(
     agent_id: uuid.UUID,
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Удаление агента памяти"""
-    success = delete_memory_agent(
+    success = await delete_memory_agent(
         db=db,
         agent_id=agent_id,
         user_id=user_id
@@ -2,11 +2,12 @@
 Роутер для работы со страницами памяти (memory_page)
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import uuid
 
-from database.session import get_db
+from database.pagination import InvalidCursor
+from database.session import get_async_db, get_async_read_db
 from .. import schemas_new as schemas
 from ..crud import (
     select_memory_page_list_by_user, select_public_memory_page_list, select_public_memory_page, select_memory_page_by_user)  #get_memory_page
@@ -18,26 +19,33 @@ router = APIRouter(tags=["memory_page"])
 
 @router.get("/public_memory_page_list", response_model=schemas.PublicMemoryPageListResponse)
 async def get_public_memory_pages_with_agents_list(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor)"),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    with_total: bool = Query(False, description="Вернуть оценку общего количества"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    res = select_public_memory_page_list(db, skip=skip, limit=limit)
-    res = schemas.PublicMemoryPageListResponse.from_public_memory_pages(res)
+    try:
+        rows, next_cursor, total = await select_public_memory_page_list(
+            db, cursor=cursor, limit=limit, with_total=with_total
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    res = schemas.PublicMemoryPageListResponse.from_public_memory_pages(rows, next_cursor, total)
     
     return res
 
 @router.get("/public_memory_page/{agent_id}", response_model=schemas.PublicMemoryPageResponse)
 async def get_public_memory_page_with_agent(
     agent_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получение публичной страницы памяти по ID
     Только не черновик (is_draft=False) и публичная (is_public=True)
     """
 
-    result = select_public_memory_page(db, agent_id)
+    result = await select_public_memory_page(db, agent_id)
     
     if not result:
         raise HTTPException(
@@ -64,14 +72,14 @@ async def get_user_memory_pages(
     limit: int = Query(50, ge=1, le=100),
     is_draft: Optional[bool] = Query(None, description="Фильтр по черновикам"),
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение списка страниц памяти текущего пользователя
     По умолчанию возвращаются только не черновики (is_draft=False)
     """
     
-    res = select_memory_page_list_by_user(
+    res = await select_memory_page_list_by_user(
         db=db,
         user_id=user_id,
         skip=skip,
@@ -86,28 +94,20 @@ async def get_user_memory_pages(
 async def get_user_memory_page(
     agent_id: uuid.UUID,
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение страницы памяти по ID (для владельца)
     Владелец может получить даже черновик
     """
-    res = select_memory_page_by_user(db, user_id, agent_id)
+    agent = await select_memory_page_by_user(db, user_id, agent_id)
     
-    if not res:
+    if not agent:
         raise HTTPException(
             status_code=404,
             detail="Публичная страница памяти не найдена или недоступна"
         )
 
-    first_agent, first_page = res[0]
-    agent = first_agent  
-
-    # Собираем все страницы агента
-    pages = []
-    for agent_record, page_record in res:
-        if page_record:  # Проверяем, что страница существует (может быть NULL при LEFT JOIN)
-            pages.append(page_record)
-
-    res = schemas.MemoryPageResponse.from_models(agent, pages)
+    # Страницы агента уже загружены тем же запросом (agent.pages)
+    res = schemas.MemoryPageResponse.from_models(agent, agent.pages)
     return res
@@ -2,14 +2,16 @@
 Роутер для работы со страницами памяти (memory_page)
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import uuid
 
-from database.session import get_db
+from database.session import get_async_db
+from shared.bulk import BulkRequest, item_error, validate_items
 from .. import schemas_new as schemas
 from ..crud import (
-    select_page_list, select_page_by_user, create_page, update_page_db, delete_page)  #get_memory_page
+    select_page_list, select_page_by_user, create_page, create_pages_bulk, select_owned_agent_ids,
+    update_page_db, delete_page)  #get_memory_page
 from ..dependencies import get_current_user_id
 
 router = APIRouter(tags=["pages"])
@@ -20,10 +22,10 @@ async def get_pages(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)):
+    db: AsyncSession = Depends(get_async_db)):
     """Получение списка страниц памяти текущего пользователя"""
 
-    res = select_page_list(db=db, agent_id=agent_id, skip=skip, limit=limit)
+    res = await select_page_list(db=db, agent_id=agent_id, skip=skip, limit=limit)
 
     if not res:
         raise HTTPException(
@@ -41,9 +43,9 @@ async def get_pages(
     return res
 
 @router.get("/page/{page_id}", response_model=schemas.PageResponse)
-async def get_page(page_id: uuid.UUID, user_id: uuid.UUID = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def get_page(page_id: uuid.UUID, user_id: uuid.UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """Получение страницы памяти по ID"""
-    page = select_page_by_user(db, user_id, page_id)
+    page = await select_page_by_user(db, user_id, page_id)
     
     if not page:
         raise HTTPException(
@@ -65,10 +67,10 @@ async def get_page(page_id: uuid.UUID, user_id: uuid.UUID = Depends(get_current_
 async def add_agent(
     page_data: schemas.PageCreate,  # Без user_id
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создание новой страницы"""
-    page = create_page(
+    page = await create_page(
         db=db,
         page_data=page_data,
         user_id=user_id
@@ -76,12 +78,38 @@ async def add_agent(
 
     return page.to_dict()  # Возвращаем объект SQLAlchemy
 
+@router.post("/page/bulk", response_model=schemas.PageBulkResponse)
+async def add_pages_bulk(
+    request: BulkRequest,
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетное создание страниц: валидные элементы создаются одной транзакцией,
+    невалидные и страницы чужих агентов возвращаются в errors с индексом
+    """
+    valid, errors = validate_items(request.items, schemas.PageCreate)
+
+    owned = await select_owned_agent_ids(db, user_id, [page_data.agent_id for _, page_data in valid])
+    accepted = []
+    for index, page_data in valid:
+        if page_data.agent_id in owned:
+            accepted.append(page_data)
+        else:
+            errors.append(item_error(index, "Agent not found or access denied", loc=("agent_id",)))
+
+    pages = await create_pages_bulk(db, accepted, user_id) if accepted else []
+    return schemas.PageBulkResponse(
+        created=[page.to_dict() for page in pages],
+        errors=sorted(errors, key=lambda error: error.index),
+    )
+
 @router.put("/page/update/{page_id}", response_model=schemas.PageResponse)
 async def update_page(
     page_id: uuid.UUID,
     page_update: schemas.PageUpdate,
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновление страницы памяти"""
 
@@ -90,7 +118,7 @@ async def update_page(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Публичные страницы не могут быть черновиком")
 
-    page = update_page_db(
+    page = await update_page_db(
         db=db,
         page_id=page_id,
         page_update=page_update,
@@ -114,10 +142,10 @@ async def update_page(
 async def del_page(
     page_id: uuid.UUID,
     user_id: uuid.UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Удаление страницы памяти"""
-    success = delete_page(
+    success = await delete_page(
         db=db,
         page_id=page_id,
         user_id=user_id
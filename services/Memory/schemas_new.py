@@ -4,9 +4,10 @@ Pydantic схемы для валидации данных Memory Service.
 from pydantic import BaseModel, Field, Json, validator
 from typing import Optional, List, Any, Dict
 from datetime import date, datetime
-from collections import defaultdict
 import uuid
 
+from shared.bulk import BulkItemError
+
 # ========== BASE SCHEMAS ==========
 class MemoryBase(BaseModel):
     """Базовый класс для всех схем Memory Service"""
@@ -184,6 +185,12 @@ class AgentResponse(AgentInListResponse):
     updated_at: Optional[datetime] = None
 
 
+class AgentBulkResponse(MemoryBase):
+    """Результат пакетного создания агентов"""
+    created: List[AgentResponse] = []
+    errors: List[BulkItemError] = []
+
+
 class AgentListResponse(MemoryBase):
     """Схема списка агентов"""
     user_id: uuid.UUID
@@ -259,6 +266,12 @@ class PageResponse(PageInListResponse):
     created_at: datetime
 
 
+class PageBulkResponse(MemoryBase):
+    """Результат пакетного создания страниц"""
+    created: List[PageResponse] = []
+    errors: List[BulkItemError] = []
+
+
 class PageListResponse(MemoryBase):
     """Схема списка страниц"""
     user_id: uuid.UUID
@@ -337,15 +350,22 @@ class PublicMemoryPageResponse(PublicAgentResponse):
 class PublicMemoryPageListResponse(MemoryBase):
     """Схема списка публичных страниц памяти"""
     memory_page_list: List[PublicMemoryPageResponse] = []
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # оценка, только при with_total=true
     
     @classmethod
-    def from_public_memory_pages(cls, memory_pages: List[Any]) -> "PublicMemoryPageListResponse":
+    def from_public_memory_pages(
+        cls,
+        memory_pages: List[Any],
+        next_cursor: Optional[str] = None,
+        total: Optional[int] = None
+    ) -> "PublicMemoryPageListResponse":
         """Создает список публичных страниц памяти"""
         memory_page_list = [
             PublicMemoryPageResponse.from_agent_and_page(agent, page)
             for agent, page in memory_pages
         ]
-        return cls(memory_page_list=memory_page_list)
+        return cls(memory_page_list=memory_page_list, next_cursor=next_cursor, total=total)
 
 class MemoryPageResponse(MemoryBase):
     """Объединенная схема агента и его страниц (для авторизованных пользователей)"""
@@ -357,7 +377,6 @@ class MemoryPageResponse(MemoryBase):
     def from_models(cls, agent: Any, pages: List[Any]) -> "MemoryPageResponse":
         """Создает объект из модели агента и списка его страниц"""
         # Сначала создаем AgentResponse
-        print(agent.is_human)
         agent_response = AgentResponse(
             id_agent=agent.id_agent,
             full_name=agent.full_name,
@@ -405,28 +424,17 @@ class MemoryPageListResponse(MemoryBase):
     memory_page_list: List[MemoryPageResponse] = []
     
     @classmethod
-    def from_memory_pages(cls, user_id: uuid.UUID, memory_pages: List[tuple]) -> "MemoryPageListResponse":
+    def from_memory_pages(cls, user_id: uuid.UUID, agents: List[Any]) -> "MemoryPageListResponse":
         """
-        Создает список из объектов, содержащих агента и его страницы
+        Создает список из агентов с уже загруженными страницами
         
         Args:
             user_id: ID пользователя
-            memory_pages: Список кортежей (agent, page)
+            agents: Агенты с agent.pages (crud.select_memory_page_list_by_user)
         """
-        # Группируем страницы по агентам
-        pages_by_agent = defaultdict(list)
-        agents_by_id = {}
-        
-        for agent, page in memory_pages:
-            agent_id = agent.id_agent
-            agents_by_id[agent_id] = agent  # Последний агент перезапишет предыдущего
-            #if page:
-            pages_by_agent[agent_id].append(page)
-        
-        # Создаем ответы в одном цикле
         memory_page_list = [
-            MemoryPageResponse.from_models(agents_by_id[agent_id], pages)
-            for agent_id, pages in pages_by_agent.items()
+            MemoryPageResponse.from_models(agent, agent.pages)
+            for agent in agents
         ]
         
         return cls(user_id=user_id, memory_page_list=memory_page_list)
\ No newline at end of file
@@ -0,0 +1,110 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import database.models.auth  # noqa: F401  (таблица users для внешних ключей)
+from database.base import Base
+from database.models.access import PageAccessDashboard
+from database.models.memory import AgentBD, PageBD
+from services.Memory import crud, schemas
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def run_with_session(scenario):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                AgentBD.__table__, PageBD.__table__, PageAccessDashboard.__table__
+            ])
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_publishing_page_demotes_other_published_pages_of_agent():
+    user_id = uuid.uuid4()
+
+    async def scenario(db):
+        agent = await crud.create_memory_agent(db, schemas.AgentCreate(full_name="Иван Петров", gender="M"), user_id)
+        first = await crud.create_page(db, schemas.PageCreate(agent_id=agent.id_agent, is_draft=False, is_public=True), user_id)
+        second = await crud.create_page(db, schemas.PageCreate(agent_id=agent.id_agent, is_draft=False, is_public=True), user_id)
+        await db.refresh(first)
+        public, _, _ = await crud.select_public_memory_page_list(db)
+        owned = await crud.select_memory_page_by_user(db, user_id, agent.id_agent)
+        return first, second, public, owned
+
+    first, second, public, owned = run_with_session(scenario)
+
+    assert (first.is_draft, first.is_public) == (True, False)
+    assert [page.id_page for _, page in public] == [second.id_page]
+    assert len(owned.pages) == 2
+
+
+def test_public_page_list_cursor_walk_has_no_gaps_or_duplicates():
+    user_id = uuid.uuid4()
+
+    async def scenario(db):
+        created = []
+        for i in range(5):
+            agent = await crud.create_memory_agent(db, schemas.AgentCreate(full_name=f"Агент {i}", gender="F"), user_id)
+            page = await crud.create_page(db, schemas.PageCreate(agent_id=agent.id_agent, is_draft=False, is_public=True), user_id)
+            created.append(page.id_page)
+        # одинаковый updated_at у всех страниц: порядок внутри решает id_page
+        await db.execute(update(PageBD).values(updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+        pages, cursor = [], None
+        for _ in range(5):
+            rows, cursor, total = await crud.select_public_memory_page_list(db, cursor=cursor, limit=2, with_total=True)
+            pages.append([page.id_page for _, page in rows])
+            if cursor is None:
+                break
+        return created, pages, total
+
+    created, pages, total = run_with_session(scenario)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(sum(pages, [])) == sorted(created)
+    assert total == 5
+
+
+def test_memory_page_list_pages_by_agents_and_loads_only_response_columns():
+    user_id = uuid.uuid4()
+
+    async def scenario(db):
+        agents = []
+        for i, pages in enumerate((3, 0, 1)):
+            agent = await crud.create_memory_agent(db, schemas.AgentCreate(full_name=f"Агент {i}", gender="M"), user_id)
+            for _ in range(pages):
+                await crud.create_page(db, schemas.PageCreate(agent_id=agent.id_agent), user_id)
+            agents.append(agent)
+        db.expunge_all()
+        first = await crud.select_memory_page_list_by_user(db, user_id, limit=2)
+        rest = await crud.select_memory_page_list_by_user(db, user_id, skip=2, limit=2)
+        with pytest.raises(InvalidRequestError, match="raiseload"):
+            first[0].is_user  # не нужна схемам ответа и не загружалась
+        return agents, first, rest
+
+    agents, first, rest = run_with_session(scenario)
+
+    # limit считает агентов: агент с тремя страницами не занимает три места
+    expected = sorted(agents, key=lambda agent: agent.id_agent)
+    assert [agent.id_agent for agent in first + rest] == [agent.id_agent for agent in expected]
+    pages = {agent.id_agent: len(agent.pages) for agent in first + rest}
+    assert pages == {agents[0].id_agent: 3, agents[1].id_agent: 0, agents[2].id_agent: 1}
+    response = schemas.MemoryPageListResponse.from_memory_pages(user_id, first + rest)
+    assert sum(len(item.pages) for item in response.memory_page_list) == 4
@@ -0,0 +1,88 @@
+import asyncio
+import uuid
+
+import httpx
+import jwt
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import database.models.auth  # noqa: F401  (таблица users для внешних ключей)
+from database import get_async_db
+from database.base import Base
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries
+from services.Memory import crud, schemas
+from services.Memory.dependencies import ALGORITHM, SECRET_KEY
+from services.Memory.main import app
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def run_requests(scenario):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[AgentBD.__table__, PageBD.__table__])
+        instrument_queries(engine)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def override():
+            async with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://memory") as client:
+                async with sessions() as db:
+                    return await scenario(client, db)
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def auth(user_id):
+    return {"Authorization": f"Bearer {jwt.encode({'sub': str(user_id)}, SECRET_KEY, algorithm=ALGORITHM)}"}
+
+
+def test_bulk_agents_and_pages_report_partial_failures_in_one_transaction():
+    user_id, stranger_id = uuid.uuid4(), uuid.uuid4()
+
+    async def scenario(client, db):
+        agents = await client.post("/agent/bulk", headers=auth(user_id), json={"items": [
+            {"full_name": "Иван", "gender": "M"},
+            {"gender": "F"},
+            {"full_name": "Мария", "gender": "F"},
+        ]})
+        foreign = await crud.create_memory_agent(db, schemas.AgentCreate(full_name="Чужой", gender="M"), stranger_id)
+        ivan, maria = (agent["id_agent"] for agent in agents.json()["created"])
+        pages = await client.post("/page/bulk", headers=auth(user_id), json={"items": [
+            {"agent_id": ivan, "is_draft": False, "is_public": True},
+            {"agent_id": str(foreign.id_agent), "is_draft": False},
+            {"agent_id": ivan, "is_draft": False, "is_public": True},
+            {"agent_id": maria, "is_draft": True},
+            {"agent_id": "not-a-uuid"},
+        ]})
+        stored = (await db.execute(select(PageBD.agent_id, PageBD.is_draft).where(PageBD.user_id == user_id))).all()
+        return agents, pages, stored
+
+    agents, pages, stored = run_requests(scenario)
+
+    assert agents.status_code == 200
+    assert int(agents.headers["x-db-statements"]) == 1
+    assert [error["index"] for error in agents.json()["errors"]] == [1]
+    assert agents.json()["errors"][0]["errors"][0]["loc"] == ["full_name"]
+
+    body = pages.json()
+    assert [error["index"] for error in body["errors"]] == [1, 4]
+    assert len(body["created"]) == 3
+    # из двух опубликованных страниц агента в пакете опубликована последняя
+    assert [page["is_draft"] for page in body["created"]] == [True, False, True]
+    assert sorted(is_draft for _, is_draft in stored) == [False, True, True]
+    assert int(pages.headers["x-db-statements"]) <= 3
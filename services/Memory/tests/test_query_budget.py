@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+import httpx
+import jwt
+import pytest
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import database.models.auth  # noqa: F401  (таблица users для внешних ключей)
+from database import get_async_db, get_async_read_db
+from database.base import Base
+from database.models.access import PageAccessDashboard
+from database.models.memory import AgentBD, PageBD
+from database.query_stats import instrument_queries
+from services.Memory import crud, schemas
+from services.Memory.dependencies import ALGORITHM, SECRET_KEY
+from services.Memory.main import app
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+USER_ID = uuid.uuid4()
+
+# Бюджет SQL-выражений на эндпоинт: список не должен расти с числом агентов и страниц
+ENDPOINT_BUDGETS = [
+    ("/agent_list", 1),
+    ("/agent/{agent_id}", 1),
+    ("/public_memory_page_list", 1),
+    ("/public_memory_page/{agent_id}", 1),
+    ("/memory_page_list", 1),
+    ("/memory_page/{agent_id}", 1),
+    ("/page_list/{agent_id}", 1),
+    ("/page/{page_id}", 1),
+]
+
+
+def call_endpoints(paths):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                AgentBD.__table__, PageBD.__table__, PageAccessDashboard.__table__
+            ])
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessions() as db:
+            for i in range(5):
+                agent = await crud.create_memory_agent(db, schemas.AgentCreate(full_name=f"Агент {i}", gender="M"), USER_ID)
+                for _ in range(3):
+                    page = await crud.create_page(db, schemas.PageCreate(agent_id=agent.id_agent, is_draft=False, is_public=True), USER_ID)
+        ids = {"agent_id": agent.id_agent, "page_id": page.id_page}
+        instrument_queries(engine)
+
+        async def override():
+            async with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override
+        app.dependency_overrides[get_async_read_db] = override
+        token = jwt.encode({"sub": str(USER_ID)}, SECRET_KEY, algorithm=ALGORITHM)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://memory",
+                                         headers={"Authorization": f"Bearer {token}"}) as client:
+                return [await client.get(path.format(**ids)) for path in paths]
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("path,budget", ENDPOINT_BUDGETS)
+def test_endpoint_stays_within_query_budget(path, budget, query_budget):
+    with query_budget(budget):
+        (resp,) = call_endpoints([path])
+
+    assert resp.status_code == 200, resp.text
+    assert 1 <= int(resp.headers["x-db-statements"]) <= budget
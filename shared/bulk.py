@@ -0,0 +1,45 @@
+"""
+Пакетные (bulk) запросы на создание: общие схемы и валидация.
+
+Тело пакетного запроса - {"items": [...]}, каждый элемент валидируется
+отдельно: невалидные элементы попадают в errors с индексом в исходном
+списке, валидные создаются одной транзакцией.
+"""
+from typing import Any, Dict, List, Sequence, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+MAX_BULK_ITEMS = 1000
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class BulkRequest(BaseModel):
+    """Пакет элементов; схема элемента проверяется по одному (validate_items)"""
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class BulkItemError(BaseModel):
+    """Ошибка элемента пакета"""
+    index: int
+    errors: List[Dict[str, Any]]
+
+
+def item_error(index: int, msg: str, loc: Sequence[Any] = (), type_: str = "value_error") -> BulkItemError:
+    """Ошибка элемента, найденная после валидации схемы (например, чужой agent_id)"""
+    return BulkItemError(index=index, errors=[{"loc": list(loc), "msg": msg, "type": type_}])
+
+
+def validate_items(items: Sequence[Dict[str, Any]], schema: Type[T]) -> Tuple[List[Tuple[int, T]], List[BulkItemError]]:
+    """Валидирует каждый элемент схемой: ([(индекс, объект)], [ошибки])"""
+    valid: List[Tuple[int, T]] = []
+    errors: List[BulkItemError] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            errors.append(BulkItemError(index=index, errors=[
+                {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in e.errors()
+            ]))
+    return valid, errors
@@ -0,0 +1,288 @@
+"""
+Сквозная трассировка запросов (Gateway -> сервисы -> БД)
+
+Контекст трассы передаётся в заголовке W3C `traceparent`
+(00-<trace_id>-<span_id>-01) и дублируется в `X-Request-ID` как
+correlation id для логов. Контекст создаётся и передаётся дальше
+всегда; от экспортёра зависит только запись завершённых span'ов:
+
+  TRACE_EXPORT=off                     - выключено (по умолчанию)
+  TRACE_EXPORT=file:logs/traces.jsonl  - JSON lines в файл
+  TRACE_EXPORT=memory                  - в память процесса (тесты, отладка)
+
+Файловый экспортёр не пишет на диск в потоке запроса: span кладётся в
+ограниченную очередь, сериализацию и запись с ротацией по размеру
+(TRACE_FILE_MAX_BYTES, TRACE_FILE_BACKUP_COUNT) выполняет фоновый поток,
+как у логов Gateway. Не поместившиеся в очередь span'ы отбрасываются.
+
+Разбор критического пути: scripts/trace_report.py.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+TRACEPARENT_HEADER = "traceparent"
+REQUEST_ID_HEADER = "x-request-id"
+MAX_STATEMENT_LENGTH = 500
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    service: str
+    kind: str
+    start: float
+    duration_ms: float = 0.0
+    attributes: Dict = field(default_factory=dict)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class InMemoryExporter:
+    """Последние span'ы в памяти процесса"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class SpanFormatter(logging.Formatter):
+    """Запись очереди -> строка JSON span'а"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(asdict(record.msg), ensure_ascii=False, default=str)
+
+
+class FileExporter:
+    """Span'ы в файл JSON lines с ротацией; запись - в фоновом потоке через ограниченную очередь"""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5,
+                 queue_size: int = 10000):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        handler.setFormatter(SpanFormatter())
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+        atexit.register(self.close)
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(logging.makeLogRecord({"msg": span}))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Дописывает очередь и останавливает фоновый поток"""
+        if self._listener._thread is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+
+
+class Tracer:
+    def __init__(self):
+        self.service = "unknown"
+        self.exporter = None
+
+    def configure(self, service: str, exporter=None):
+        self.service = service
+        if exporter is None:
+            exporter = exporter_from_env()
+        if self.exporter is not None and self.exporter is not exporter and hasattr(self.exporter, "close"):
+            self.exporter.close()
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        """Экспортируются ли span'ы (контекст трассы передаётся в любом случае)"""
+        return self.exporter is not None
+
+    def finish(self, span: Span):
+        span.duration_ms = round((time.time() - span.start) * 1000, 3)
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+
+tracer = Tracer()
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def exporter_from_env():
+    target = os.getenv("TRACE_EXPORT", "off")
+    if target == "off":
+        return None
+    if target == "memory":
+        return InMemoryExporter()
+    return FileExporter(
+        target.split(":", 1)[1] if target.startswith("file:") else target,
+        max_bytes=int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024))),
+        backup_count=int(os.getenv("TRACE_FILE_BACKUP_COUNT", "5")),
+        queue_size=int(os.getenv("TRACE_QUEUE_SIZE", "10000")),
+    )
+
+
+def configure_tracing(service: str, exporter=None):
+    tracer.configure(service, exporter)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """'00-<trace_id>-<span_id>-<flags>' -> (trace_id, span_id)"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def new_span(name: str, kind: str, parent: Optional[Tuple[str, str]] = None, **attributes) -> Span:
+    """Создаёт span - дочерний к parent (trace_id, span_id) или к текущему span'у"""
+    if parent is None:
+        active = current_span.get()
+        if active is not None:
+            parent = (active.trace_id, active.span_id)
+    trace_id, parent_id = parent if parent else (secrets.token_hex(16), None)
+    return Span(
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        name=name,
+        service=tracer.service,
+        kind=kind,
+        start=time.time(),
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", **attributes) -> Iterator[Span]:
+    """Span вокруг блока кода; без экспортёра он только задаёт контекст трассы"""
+    span = new_span(name, kind, **attributes)
+    token = current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.attributes["error"] = repr(e)
+        raise
+    finally:
+        current_span.reset(token)
+        tracer.finish(span)
+
+
+def inject_headers(headers: Dict, span: Optional[Span] = None) -> Dict:
+    """Добавляет контекст трассы в заголовки исходящего HTTP-запроса"""
+    span = span or current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent()
+        headers[REQUEST_ID_HEADER] = span.trace_id
+    return headers
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: продолжает трассу из входящего traceparent (или начинает новую)
+    и записывает server span обработчика. trace id возвращается в X-Request-ID
+    и передаётся в исходящие запросы и логи и при выключенном экспорте.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(TRACEPARENT_HEADER.encode(), b"").decode() or None)
+        span = new_span(f"{scope['method']} {scope['path']}", "server", parent=parent,
+                        method=scope["method"], path=scope["path"])
+        token = current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["status_code"] = message["status"]
+                # Заменяет, а не дублирует X-Request-ID, пришедший из upstream
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = span.trace_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            endpoint = scope.get("endpoint")
+            if endpoint is not None:
+                span.name = f"{scope['method']} {getattr(endpoint, '__name__', endpoint)}"
+            current_span.reset(token)
+            tracer.finish(span)
+
+
+def instrument_engine(engine):
+    """Span на каждый SQL-запрос engine (текст запроса без параметров); AsyncEngine тоже подходит"""
+    from sqlalchemy import event
+
+    engine = getattr(engine, "sync_engine", engine)
+    if getattr(engine, "_tracing_instrumented", False):
+        return
+    engine._tracing_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if tracer.enabled and current_span.get() is not None:
+            context._trace_span = new_span("db.query", "client", statement=statement[:MAX_STATEMENT_LENGTH])
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.attributes["rowcount"] = cursor.rowcount
+            tracer.finish(span)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None) if context is not None else None
+        if span is not None:
+            span.attributes["error"] = repr(exception_context.original_exception)
+            tracer.finish(span)
+
+
+def install_tracing(app, service: str, *engines):
+    """Подключает трассировку к сервису: экспортёр, middleware и SQL span'ы переданных engine"""
+    configure_tracing(service)
+    app.add_middleware(TracingMiddleware)
+    for engine in engines:
+        instrument_engine(engine)
+
+
+def load_spans(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]